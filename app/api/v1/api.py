@@ -19,6 +19,9 @@ from app.api.v1.endpoints.schedule_route import router as schedule_router
 from app.api.v1.endpoints.teacher_review_route import router as teacher_review_router
 from app.api.v1.endpoints.notification_route import router as notification_router
 from app.api.v1.endpoints.report_route import router as report_router
+from app.api.v1.endpoints.job_route import router as job_router
+from app.api.v1.endpoints.payment_route import router as payment_router
+from app.api.v1.endpoints.export_route import router as export_router
 # --- Import các routers đăng ký chuyên biệt ---
 # Router cho việc đăng ký một người dùng duy nhất
 from app.api.v1.endpoints.register_route import router as register_router
@@ -44,6 +47,9 @@ api_router.include_router(schedule_router, prefix="/schedules", tags=["Schedules
 api_router.include_router(teacher_review_router, prefix="/teacher_reviews", tags=["Teacher Reviews"])
 api_router.include_router(notification_router, prefix="/notifications", tags=["Notifications"])
 api_router.include_router(report_router, prefix="/reports", tags=["Reports"])
+api_router.include_router(job_router, prefix="/jobs", tags=["Jobs"])
+api_router.include_router(payment_router, prefix="/payments", tags=["Payments"])
+api_router.include_router(export_router, prefix="/exports", tags=["Exports"])
 # --- Bao gồm các routers đăng ký chuyên biệt ---
 api_router.include_router(register_router, prefix="/register", tags=["Register"])
 api_router.include_router(auth_router, prefix="/auth", tags=["Login"])
\ No newline at end of file
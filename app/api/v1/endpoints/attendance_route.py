@@ -3,7 +3,11 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from app.api import deps
-from app.schemas.attendance_schema import AttendanceRead, AttendanceBatchCreate, AttendanceUpdateLate
+from typing import Optional
+from app.schemas.attendance_schema import (
+    AttendanceRead, AttendanceBatchCreate, AttendanceMultiBatchCreate, AttendanceUpdateLate, AttendanceStats,
+    AttendanceSyncRequest, AttendanceSyncResult,
+)
 from app.services import attendance_service
 from app.api.auth.auth import has_roles, get_current_active_user
 from app.api.deps import get_db
@@ -11,6 +15,7 @@ from app.api.deps import get_db
 
 router = APIRouter()
 TEACHER_ONLY = has_roles(["teacher"])
+ALL_ROLES = has_roles(["manager", "teacher", "student", "parent"])
 
 @router.post(
     "/batch",
@@ -24,6 +29,41 @@ def create_attendance_records_for_class(
 ):
     return attendance_service.create_batch_attendance(db, attendance_data, current_user)
 
+@router.post(
+    "/batch/multi",
+    response_model=list[AttendanceRead],
+    dependencies=[Depends(TEACHER_ONLY)]
+)
+def create_attendance_records_for_sessions(
+    batch: AttendanceMultiBatchCreate,
+    db: Session = Depends(deps.get_db),
+    current_user=Depends(get_current_active_user)
+):
+    """
+    Điểm danh nhiều buổi học trong một request (tối đa 500 buổi).
+    Tất cả buổi được kiểm tra quyền/khung giờ trước; một buổi lỗi thì không ghi buổi nào.
+    """
+    return attendance_service.create_multi_batch_attendance(db, batch, current_user)
+
+@router.post(
+    "/sync",
+    response_model=AttendanceSyncResult,
+    response_model_exclude_none=True,
+    dependencies=[Depends(TEACHER_ONLY)]
+)
+def sync_attendance_from_device(
+    payload: AttendanceSyncRequest,
+    db: Session = Depends(deps.get_db),
+    current_user=Depends(get_current_active_user)
+):
+    """
+    Đồng bộ điểm danh cho thiết bị offline: gửi hàng đợi delta (seq tăng dần theo thiết bị,
+    recorded_at theo đồng hồ thiết bị) kèm watermark lần trước; nhận lại seq đã áp dụng,
+    các delta bị từ chối và change set các lớp mình dạy kể từ watermark.
+    Gửi lại cùng hàng đợi nhiều lần không ghi trùng.
+    """
+    return attendance_service.sync_attendance(db, payload, current_user)
+
 @router.get("/all", response_model=List[AttendanceRead])
 def get_all_attendances_auth_only_test(
     db: Session = Depends(get_db),
@@ -35,6 +75,32 @@ def get_all_attendances_auth_only_test(
     return attendances
 
 
+@router.get(
+    "/stats",
+    response_model=List[AttendanceStats],
+    dependencies=[Depends(ALL_ROLES)]
+)
+def get_attendance_stats(
+    class_id: Optional[int] = None,
+    student_user_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = Query(100, le=1000),
+    db: Session = Depends(deps.get_db),
+    current_user=Depends(get_current_active_user)
+):
+    """
+    Thống kê số buổi có mặt/đi muộn/vắng theo học sinh và lớp (theo quyền của người dùng).
+    """
+    return attendance_service.get_attendance_stats(
+        db,
+        current_user=current_user,
+        class_id=class_id,
+        student_user_id=student_user_id,
+        skip=skip,
+        limit=limit,
+    )
+
+
 @router.get(
     "/{schedule_id}",
     response_model=List[AttendanceRead],
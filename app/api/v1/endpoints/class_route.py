@@ -1,5 +1,6 @@
 # app/api/endpoints/class.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime, timezone
@@ -7,7 +8,10 @@ from app.api.deps import get_db
 from app.api.auth.auth import AuthenticatedUser, get_current_active_user, has_roles
 from app.crud import class_crud
 from app.schemas import class_schema
-from app.services.excel_services.export_class import export_class
+from app.services.excel_services.export_transcripts import export_transcripts
+from app.services import transcript_service, response_cache_service
+from app.services.test_service import validate_teacher_class
+from app.schemas.transcript_schema import Transcript
 from app.api import deps
 from app.schemas import teacher_schema
 from app.crud import teacher_crud
@@ -22,6 +26,13 @@ MANAGER_OR_TEACHER = has_roles(["manager", "teacher"])
 
 MANAGER_OR_TEACHER_OR_STUDENT = has_roles(["manager","teacher", "student"])
 
+_CLASS_VIEW = TypeAdapter(class_schema.ClassView)
+_CLASS_VIEW_LIST = TypeAdapter(List[class_schema.ClassView])
+# Danh sách/chi tiết lớp gồm tên môn, sĩ số -> phụ thuộc cả môn học và ghi danh
+_CLASS_TAGS = (
+    response_cache_service.CLASSES, response_cache_service.SUBJECTS, response_cache_service.ENROLLMENTS
+)
+
 # Tạo lớp học mới
 @router.post(
     "",
@@ -109,6 +120,7 @@ def delete_existing_class(
     dependencies=[Depends(MANAGER_OR_TEACHER_OR_STUDENT)]
 )
 def get_all_classes(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
@@ -123,15 +135,19 @@ def get_all_classes(
     Quyền truy cập: **manager**, **teacher**, **student**
     """
     if "manager" in current_user.roles:
-        classes = class_crud.get_all_classes(db, skip=skip, limit=limit)
+        scope = "manager"
+        load = lambda: class_crud.get_all_classes(db, skip=skip, limit=limit)
     elif "teacher" in current_user.roles:
-        classes = class_crud.get_classes_by_teacher_user_id(db, teacher_user_id=current_user.user_id, skip=skip, limit=limit)
+        scope = f"teacher:{current_user.user_id}"
+        load = lambda: class_crud.get_classes_by_teacher_user_id(db, teacher_user_id=current_user.user_id, skip=skip, limit=limit)
     elif "student" in current_user.roles:
-        classes = class_crud.get_active_classes_by_student_user_id(db, student_user_id=current_user.user_id, skip=skip, limit=limit)
+        scope = f"student:{current_user.user_id}"
+        load = lambda: class_crud.get_active_classes_by_student_user_id(db, student_user_id=current_user.user_id, skip=skip, limit=limit)
     else:
-        classes = []
+        scope = "none"
+        load = lambda: []
 
-    return classes
+    return response_cache_service.cached_json(request, db, load, _CLASS_VIEW_LIST, tags=_CLASS_TAGS, scope=scope)
 
 # Lấy thông tin của một lớp học
 @router.get(
@@ -140,27 +156,33 @@ def get_all_classes(
     summary="Lấy thông tin của một lớp học"
 )
 def get_class(
+    request: Request,
     class_id: int,
     db: Session = Depends(get_db),
     current_user: AuthenticatedUser = Depends(MANAGER_OR_TEACHER)
 ):
     """
-    Lấy thông tin của một lớp học cụ thể bằng ID.
+    Lấy thông tin của một lớp học cụ thể bằng ID (cache + ETag).
     
     Quyền truy cập: **manager**, **teacher**
     """
-    db_class = class_crud.get_class(db, class_id=class_id)
-    if db_class is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Lớp học không tìm thấy."
-        )
-    return db_class
+    def load():
+        db_class = class_crud.get_class(db, class_id=class_id)
+        if db_class is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Lớp học không tìm thấy."
+            )
+        return db_class
+
+    return response_cache_service.cached_json(request, db, load, _CLASS_VIEW, tags=_CLASS_TAGS)
 
 # Xuất danh sách lớp học ra file Excel
 @router.get(
     "/export/{class_id}",
-    summary="Xuất danh sách lớp học ra file Excel"
+    status_code=status.HTTP_410_GONE,
+    summary="Xuất danh sách lớp học ra file Excel (đã chuyển sang job nền)",
+    deprecated=True
 )
 def export_class_excel(
     class_id: int,
@@ -168,11 +190,18 @@ def export_class_excel(
     current_user: AuthenticatedUser = Depends(MANAGER_OR_TEACHER)
 ):
     """
-    Xuất danh sách sinh viên của một lớp học ra file Excel.
-    
+    Không còn xuất trực tiếp: dùng `POST /jobs/class-export/{class_id}`,
+    file tải qua `/jobs/{job_id}/result` khi job hoàn tất. GET không tạo job.
+
     Quyền truy cập: **manager**, **teacher**
     """
-    return export_class(db, class_id)
+    if not class_crud.get_class(db, class_id=class_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Class with id {class_id} not found.")
+    validate_teacher_class(db, current_user, class_id)
+    raise HTTPException(
+        status_code=status.HTTP_410_GONE,
+        detail=f"Dùng POST /jobs/class-export/{class_id} để xuất danh sách lớp."
+    )
 
 @router.get(
     "/{class_id}/students",
@@ -195,4 +224,31 @@ def get_students_of_class(
     if not students:
         # không raise 404 mà trả [] cho client dễ xử lý hơn
         return []
-    return students
\ No newline at end of file
+    return students
+
+
+@router.get(
+    "/{class_id}/transcripts",
+    response_model=List[Transcript],
+    summary="Bảng điểm của mọi học sinh trong lớp"
+)
+def get_class_transcripts(
+    class_id: int,
+    format: str = Query("json", pattern="^(json|xlsx)$", description="json hoặc xlsx"),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_OR_TEACHER)
+):
+    """
+    Bảng điểm đầy đủ (mọi lớp đang học) của từng học sinh trong lớp `class_id`,
+    tính chung một lượt cho cả lớp. `format=xlsx` trả về file Excel dạng bảng.
+
+    Quyền truy cập: **manager**, **teacher** (lớp mình dạy)
+    """
+    if not class_crud.get_class(db, class_id=class_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lớp học không tìm thấy.")
+    validate_teacher_class(db, current_user, class_id)
+
+    transcripts = transcript_service.get_class_transcripts(db, class_id)
+    if format == "xlsx":
+        return export_transcripts(transcripts, f"class_{class_id}_transcripts.xlsx")
+    return transcripts
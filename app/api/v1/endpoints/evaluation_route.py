@@ -6,7 +6,7 @@ from app.api.auth.auth import has_roles, get_current_active_user
 from app.crud import evaluation_crud, teacher_crud, student_crud
 from app.schemas import evaluation_schema
 from app.api import deps
-from app.services import evaluation_service
+from app.services import evaluation_service, fast_json_service
 from app.schemas.auth_schema import AuthenticatedUser
 
 router = APIRouter()
@@ -62,6 +62,11 @@ def get_evaluations_by_role(
     skip: int = 0,
     limit: int = 100
 ):
+    evaluations = _evaluations_by_role(db, current_user, skip, limit)
+    return fast_json_service.list_response(evaluation_schema.EvaluationView, evaluations)
+
+
+def _evaluations_by_role(db: Session, current_user: AuthenticatedUser, skip: int, limit: int):
     # Manager: all
     if "manager" in current_user.roles:
         return evaluation_service.get_all_evaluations_with_names(db, skip=skip, limit=limit)
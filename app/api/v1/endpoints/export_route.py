@@ -0,0 +1,50 @@
+# app/api/v1/endpoints/export_route.py
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.api.auth.auth import AuthenticatedUser, has_roles
+from app.services import export_service
+from app.services.export_service import ExportDataset, ExportFormat
+
+router = APIRouter()
+
+BASE_USERS = has_roles(["manager", "teacher", "student", "parent"])
+
+
+@router.get(
+    "/{dataset}",
+    summary="Xuất dữ liệu dạng luồng (NDJSON/CSV)",
+    response_class=StreamingResponse,
+)
+def export_dataset(
+    dataset: ExportDataset,
+    format: ExportFormat = Query(ExportFormat.ndjson, description="ndjson hoặc csv"),
+    from_date: Optional[date] = Query(None, description="Từ ngày (bao gồm)"),
+    to_date: Optional[date] = Query(None, description="Đến ngày (bao gồm)"),
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(BASE_USERS)
+):
+    """
+    Xuất toàn bộ `tests`, `evaluations`, `tuitions` hoặc `attendances` trong phạm vi người dùng được xem,
+    lọc theo ngày (ngày thi, ngày đánh giá, hạn nộp học phí, ngày điểm danh).
+    Dữ liệu được gửi dần từng lô trong khi truy vấn vẫn đang đọc, thay cho phân trang `limit=100`.
+
+    Quyền truy cập: **manager** (toàn bộ), **teacher** (lớp mình dạy), **student**, **parent** (của mình/của con)
+    """
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="from_date phải nhỏ hơn hoặc bằng to_date."
+        )
+
+    stmt = export_service.build_export_query(dataset, current_user, from_date, to_date)
+    return StreamingResponse(
+        export_service.stream_export(db.get_bind(), stmt, format),
+        media_type=export_service.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset.value}.{format.value}"'},
+    )
@@ -0,0 +1,208 @@
+import os
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.api.auth.auth import has_roles, get_current_active_user
+from app.crud import class_crud, job_crud
+from app.models.job_model import JobStatus
+from app.schemas import job_schema
+from app.schemas.auth_schema import AuthenticatedUser
+from app.services import job_service
+from app.services.test_service import validate_teacher_class
+
+router = APIRouter()
+
+# Dependency cho quyền truy cập
+MANAGER_ONLY = has_roles(["manager"])
+MANAGER_OR_TEACHER = has_roles(["manager", "teacher"])
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def _submitted(db_job) -> job_schema.JobSubmitted:
+    return job_schema.JobSubmitted(job_id=db_job.job_id, status=db_job.status)
+
+
+def _get_own_job(db: Session, job_id: str, current_user: AuthenticatedUser):
+    """Manager xem được mọi job; người dùng khác chỉ xem job do mình tạo."""
+    db_job = job_crud.get_job(db, job_id)
+    if not db_job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    if "manager" not in current_user.roles and db_job.created_by != current_user.user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Bạn không có quyền xem job này")
+    return db_job
+
+
+@router.post(
+    "/users-import",
+    response_model=job_schema.JobSubmitted,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Import người dùng từ file Excel (chạy nền)"
+)
+def submit_users_import(
+    file: UploadFile = File(...),
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_ONLY)
+):
+    """
+    Lưu file upload và tạo job import người dùng.
+
+    Quyền truy cập: **manager**
+    """
+    path = job_service.save_upload(file)
+    return _submitted(job_service.submit_job(db, "users_import", current_user, input_file=path))
+
+
+@router.post(
+    "/tests-import",
+    response_model=job_schema.JobSubmitted,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Import điểm kiểm tra từ file Excel (chạy nền)"
+)
+def submit_tests_import(
+    class_id: int = Query(..., description="ID của lớp cần import bài kiểm tra"),
+    file: UploadFile = File(...),
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_OR_TEACHER)
+):
+    """
+    Kiểm tra lớp và quyền ngay trong request, sau đó tạo job import điểm.
+
+    Quyền truy cập: **manager**, **teacher**
+    """
+    if not class_crud.get_class(db, class_id=class_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Class with id {class_id} not found.")
+    validate_teacher_class(db, current_user, class_id)
+
+    path = job_service.save_upload(file)
+    return _submitted(job_service.submit_job(
+        db, "tests_import", current_user, params={"class_id": class_id}, input_file=path
+    ))
+
+
+@router.post(
+    "/tuitions-generate",
+    response_model=job_schema.JobSubmitted,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Sinh học phí cho tất cả học sinh (chạy nền)"
+)
+def submit_tuitions_generate(
+    term: int = Query(..., gt=0, description="Kỳ học để tạo học phí"),
+    due_date: date = Query(..., description="Hạn thanh toán"),
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_ONLY)
+):
+    """
+    Quyền truy cập: **manager**
+    """
+    return _submitted(job_service.submit_job(
+        db, "tuitions_generate", current_user, params={"term": term, "due_date": due_date}
+    ))
+
+
+@router.post(
+    "/payrolls-run",
+    response_model=job_schema.JobSubmitted,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Tính lương tháng cho tất cả giáo viên (chạy nền)"
+)
+def submit_payrolls_run(
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_ONLY)
+):
+    """
+    Quyền truy cập: **manager**
+    """
+    return _submitted(job_service.submit_job(db, "payrolls_run", current_user))
+
+
+@router.post(
+    "/class-export/{class_id}",
+    response_model=job_schema.JobSubmitted,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Xuất danh sách lớp học ra file Excel (chạy nền)"
+)
+def submit_class_export(
+    class_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_OR_TEACHER)
+):
+    """
+    File kết quả tải qua `/jobs/{job_id}/result` khi job hoàn tất.
+
+    Quyền truy cập: **manager**, **teacher**
+    """
+    if not class_crud.get_class(db, class_id=class_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Class with id {class_id} not found.")
+    validate_teacher_class(db, current_user, class_id)
+    return _submitted(job_service.submit_job(db, "class_export", current_user, params={"class_id": class_id}))
+
+
+@router.post(
+    "/class-reports-export",
+    response_model=job_schema.JobSubmitted,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Xuất báo cáo nhiều lớp vào một file Excel (chạy nền)"
+)
+def submit_class_reports_export(
+    class_ids: Optional[List[int]] = Query(None, description="Lọc theo danh sách lớp (bỏ trống: tất cả)"),
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_OR_TEACHER)
+):
+    """
+    Mỗi lớp một sheet kèm sheet tổng hợp; tiến độ xem qua `/jobs/{job_id}`.
+
+    Quyền truy cập: **manager** (mọi lớp), **teacher** (các lớp mình dạy)
+    """
+    params = {"class_ids": class_ids}
+    if "manager" not in current_user.roles:
+        params["teacher_id"] = current_user.user_id
+    return _submitted(job_service.submit_job(db, "class_reports_export", current_user, params=params))
+
+
+@router.get(
+    "/{job_id}",
+    response_model=job_schema.Job,
+    summary="Xem trạng thái và tiến độ của job"
+)
+def get_job_status(
+    job_id: str,
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
+):
+    """
+    Quyền truy cập: **manager** hoặc người tạo job.
+    """
+    return _get_own_job(db, job_id, current_user)
+
+
+@router.get(
+    "/{job_id}/result",
+    summary="Tải kết quả của job đã hoàn tất"
+)
+def get_job_result(
+    job_id: str,
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
+):
+    """
+    Trả về file kết quả (nếu job sinh file) hoặc kết quả JSON.
+
+    Quyền truy cập: **manager** hoặc người tạo job.
+    """
+    db_job = _get_own_job(db, job_id, current_user)
+    if db_job.status != JobStatus.succeeded:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job chưa hoàn tất (trạng thái: {db_job.status.value})"
+        )
+    if db_job.result_file:
+        if not os.path.exists(db_job.result_file):
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail="File kết quả không còn tồn tại")
+        filename = (db_job.result or {}).get("filename") or os.path.basename(db_job.result_file)
+        return FileResponse(db_job.result_file, media_type=XLSX_MEDIA_TYPE, filename=filename)
+    return db_job.result
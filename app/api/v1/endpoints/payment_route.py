@@ -0,0 +1,167 @@
+from datetime import date
+from decimal import Decimal
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.api import deps
+from app.api.auth.auth import has_roles
+from app.crud import balance_crud, tuition_payment_crud, student_crud
+from app.schemas import payment_schema
+from app.schemas.auth_schema import AuthenticatedUser
+from app.services import payment_service
+
+router = APIRouter()
+
+# Dependency cho quyền truy cập
+MANAGER_ONLY = has_roles(["manager"])
+MANAGER_OR_PARENT = has_roles(["manager", "parent"])
+MANAGER_PARENT_OR_STUDENT = has_roles(["manager", "parent", "student"])
+
+
+@router.post(
+    "",
+    response_model=payment_schema.Payment,
+    status_code=status.HTTP_201_CREATED,
+    summary="Ghi nhận một khoản thu hoặc hoàn học phí"
+)
+def create_payment(
+    payment_in: payment_schema.PaymentCreate,
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_ONLY)
+):
+    """
+    Thu một phần/toàn bộ học phí hoặc hoàn tiền; công nợ và doanh thu được cập nhật ngay.
+
+    Quyền truy cập: **manager**
+    """
+    return payment_service.record_payment(db, payment_in, current_user)
+
+
+@router.get(
+    "",
+    response_model=List[payment_schema.Payment],
+    summary="Lấy danh sách các khoản thu/hoàn học phí"
+)
+def list_payments(
+    tuition_id: Optional[int] = None,
+    student_user_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_PARENT_OR_STUDENT)
+):
+    """
+    Quyền truy cập: **manager** (tất cả), **parent** (của con mình), **student** (của mình).
+    """
+    if "manager" in current_user.roles:
+        return tuition_payment_crud.get_payments(
+            db, tuition_id=tuition_id, student_user_id=student_user_id, skip=skip, limit=limit
+        )
+    if "parent" in current_user.roles:
+        return tuition_payment_crud.get_payments(
+            db, tuition_id=tuition_id, student_user_id=student_user_id,
+            parent_user_id=current_user.user_id, skip=skip, limit=limit
+        )
+    return tuition_payment_crud.get_payments(
+        db, tuition_id=tuition_id, student_user_id=current_user.user_id, skip=skip, limit=limit
+    )
+
+
+@router.get(
+    "/aging",
+    response_model=payment_schema.AgingReport,
+    summary="Công nợ học phí theo tuổi nợ",
+    dependencies=[Depends(MANAGER_ONLY)]
+)
+def get_aging_report(
+    as_of: Optional[date] = Query(None, description="Ngày chốt, mặc định hôm nay"),
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Quyền truy cập: **manager**
+    """
+    return payment_service.get_aging_report(db, as_of)
+
+
+@router.get(
+    "/revenue",
+    response_model=List[payment_schema.RevenueMonth],
+    summary="Doanh thu học phí thực thu theo tháng",
+    dependencies=[Depends(MANAGER_ONLY)]
+)
+def get_revenue_monthly(
+    year: Optional[int] = Query(None, description="Lọc theo năm"),
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Quyền truy cập: **manager**
+    """
+    return balance_crud.get_revenue_monthly(db, year)
+
+
+@router.get(
+    "/balances/parents",
+    response_model=List[payment_schema.ParentBalance],
+    summary="Danh sách công nợ theo phụ huynh",
+    dependencies=[Depends(MANAGER_ONLY)]
+)
+def list_parent_balances(
+    only_outstanding: bool = True,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Quyền truy cập: **manager**
+    """
+    return balance_crud.get_parent_balances(db, skip=skip, limit=limit, only_outstanding=only_outstanding)
+
+
+@router.get(
+    "/balances/parents/{parent_user_id}",
+    response_model=payment_schema.ParentBalance,
+    summary="Công nợ học phí của một phụ huynh"
+)
+def get_parent_balance(
+    parent_user_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_OR_PARENT)
+):
+    """
+    Quyền truy cập: **manager**, **parent** (của chính mình)
+    """
+    if "manager" not in current_user.roles and parent_user_id != current_user.user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Bạn không có quyền xem công nợ này")
+    balance = balance_crud.get_parent_balance(db, parent_user_id)
+    if not balance:
+        return payment_schema.ParentBalance(
+            parent_user_id=parent_user_id, total_billed=Decimal(0), total_paid=Decimal(0), outstanding=Decimal(0)
+        )
+    return balance
+
+
+@router.get(
+    "/balances/students/{student_user_id}",
+    response_model=payment_schema.StudentBalance,
+    summary="Công nợ học phí của một học sinh"
+)
+def get_student_balance(
+    student_user_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_PARENT_OR_STUDENT)
+):
+    """
+    Quyền truy cập: **manager**, **student** (của mình), **parent** (của con mình)
+    """
+    if "manager" not in current_user.roles and student_user_id != current_user.user_id:
+        if "parent" not in current_user.roles or not student_crud.is_child_of_parent(
+            db, student_user_id, current_user.user_id
+        ):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Bạn không có quyền xem công nợ này")
+    balance = balance_crud.get_student_balance(db, student_user_id)
+    if not balance:
+        return payment_schema.StudentBalance(
+            student_user_id=student_user_id, total_billed=Decimal(0), total_paid=Decimal(0), outstanding=Decimal(0)
+        )
+    return balance
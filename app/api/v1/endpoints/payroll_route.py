@@ -3,9 +3,9 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from app.crud import payroll_crud, teacher_crud
-from app.schemas import payroll_schema
+from app.schemas import payroll_schema, job_schema
 from app.api import deps
-from app.services import payroll_service
+from app.services import payroll_service, job_service
 from app.api.auth.auth import get_current_active_user, has_roles
 from app.api.v1.endpoints.evaluation_route import MANAGER_OR_TEACHER
 from app.schemas.auth_schema import AuthenticatedUser
@@ -74,20 +74,21 @@ def get_all_payrolls(
 
 @router.post(
     "/run_payrolls",
-    response_model=List[payroll_schema.Payroll], 
-    dependencies=[Depends(MANAGER_ONLY)]
+    response_model=job_schema.JobSubmitted,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Tính lương tháng cho tất cả giáo viên (chạy nền)"
 )
 def run_payrolls(
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_ONLY)
 ):
-    try:
-        results = payroll_service.run_monthly_payroll(db)
-        return results # Trả về list of payroll objects
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"An error occurred during payroll processing: {str(e)}"
-        )
+    """
+    Tính lương chạy qua job runner; danh sách bảng lương nằm trong kết quả của `/jobs/{job_id}`.
+
+    Quyền truy cập: **manager**
+    """
+    db_job = job_service.submit_job(db, "payrolls_run", current_user)
+    return job_schema.JobSubmitted(job_id=db_job.job_id, status=db_job.status)
 
 @router.get("/{payroll_id}", response_model=payroll_schema.PayrollView)
 def get_payroll(
@@ -1,17 +1,20 @@
 ﻿# app/api/routes/report_router.py
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
+from fastapi.responses import StreamingResponse
 from datetime import datetime
 from app.api.auth.auth import has_roles, get_current_active_user
 from app.api import deps
 from app.schemas.auth_schema import AuthenticatedUser
-from app.schemas.report_schema import TeacherOverview,ClassReport,TeacherReport
+from app.schemas.report_schema import TeacherOverview,ClassReport,TeacherReport,FinanceReport
 from app.services import report_service
 from app.api.deps import get_db
 
 router = APIRouter() 
 TEACHER_ONLY = has_roles(["teacher"])
+MANAGER_ONLY = has_roles(["manager"])
+MANAGER_OR_TEACHER = has_roles(["manager", "teacher"])
 
 @router.get("/teacher-overview", response_model=TeacherOverview, dependencies=[Depends(TEACHER_ONLY)])
 def get_teacher_overview(
@@ -43,6 +46,26 @@ def get_class_report(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/class-reports")
+def stream_class_reports(
+    class_ids: Optional[List[int]] = Query(None, description="Lọc theo danh sách lớp (bỏ trống: tất cả)"),
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_OR_TEACHER)
+):
+    """
+    Báo cáo hàng loạt dạng NDJSON: mỗi dòng là một báo cáo lớp (cùng cấu trúc ClassReport).
+    Các lớp được tính theo lô bằng vài câu lệnh set-based thay vì gọi /class-report từng lớp.
+    Muốn file Excel nhiều sheet thì dùng job `POST /jobs/class-reports-export`.
+
+    Quyền truy cập: **manager** (mọi lớp), **teacher** (các lớp mình dạy)
+    """
+    teacher_id = None if "manager" in current_user.roles else current_user.user_id
+    ids = report_service.get_report_class_ids(db, teacher_id=teacher_id, class_ids=class_ids)
+    return StreamingResponse(
+        report_service.stream_class_reports_ndjson(ids), media_type="application/x-ndjson"
+    )
+
+
 @router.get("/teacher-report", response_model=TeacherReport)
 def teacher_report(
     teacher_id: int = Query(..., description="ID của giáo viên"),
@@ -54,4 +77,19 @@ def teacher_report(
         report = report_service.get_teacher_report(db, teacher_id, year)
         return report
     except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/finance", response_model=FinanceReport, dependencies=[Depends(MANAGER_ONLY)])
+def finance_report(
+    year: int = Query(datetime.now().year, description="Năm muốn xem báo cáo"),
+    month: Optional[int] = Query(None, ge=1, le=12, description="Lọc theo tháng (bỏ trống: cả năm)"),
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Báo cáo thu học phí / chi lương theo tháng, chi lương theo giáo viên và theo môn.
+    Đọc từ cube tài chính tính sẵn (finance_monthly, payroll_monthly).
+
+    Quyền truy cập: **manager**
+    """
+    return report_service.get_finance_report(db, year, month)
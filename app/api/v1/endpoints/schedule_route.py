@@ -13,7 +13,7 @@ from app.api import deps
 from app.api.auth.auth import AuthenticatedUser, get_current_active_user, has_roles
 
 # Services
-from app.services import schedule_service, user_service
+from app.services import schedule_service, user_service, fast_json_service
 from app.api.v1.endpoints.enrollment_route import MANAGER_ONLY
 
 router = APIRouter()
@@ -54,7 +54,7 @@ def get_all_schedules_route(
     """
     Lấy danh sách tất cả lịch trình, có phân trang.
     """
-    return schedule_crud.search_schedules(
+    schedules = schedule_crud.search_schedules(
         db=db,
         skip=skip,
         limit=limit,
@@ -65,6 +65,7 @@ def get_all_schedules_route(
         date=None,
         room=None
     )
+    return fast_json_service.list_response(schedule_schema.ScheduleView, schedules)
 
 @router.get("/search", response_model=List[schedule_schema.ScheduleView])
 def search_schedules_route(
@@ -79,7 +80,7 @@ def search_schedules_route(
     """
     Tìm kiếm lịch trình với nhiều điều kiện lọc.
     """
-    return schedule_service.search_schedules_by_user_role(
+    schedules = schedule_service.search_schedules_by_user_role(
         db=db,
         current_user=current_user,
         class_id=class_id,
@@ -88,6 +89,7 @@ def search_schedules_route(
         date=date,
         room=room
     )
+    return fast_json_service.list_response(schedule_schema.ScheduleView, schedules)
 
 
 @router.get("/{schedule_id}", response_model=schedule_schema.ScheduleView)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
@@ -9,11 +9,14 @@ from app.crud import student_crud, user_crud, user_role_crud
 from app.schemas.user_role_schema import UserRoleCreate
 from app.schemas import student_schema
 from app.schemas import class_schema
-from app.schemas.stats_schema import StudentStats
+from app.schemas.stats_schema import StudentStats, StudentStatsItem
 from app.crud import parent_crud
 from app.models.user_model import User
 from app.schemas.teacher_schema import TeacherView
 from app.schemas.auth_schema import AuthenticatedUser
+from app.schemas.transcript_schema import Transcript
+from app.services import transcript_service
+from app.services.excel_services.export_transcripts import export_transcripts
 
 router = APIRouter()
 
@@ -77,12 +80,14 @@ def assign_student(
 def get_all_students(
     skip: int = 0,
     limit: int = 100,
+    with_stats: bool = Query(False, description="Kèm thống kê (GPA, điểm, số lớp) của từng học sinh trong trang"),
     db: Session = Depends(deps.get_db),
     current_user: AuthenticatedUser = Depends(get_current_active_user) # Lấy user hiện tại
 ):
     """
     - **Manager**: Trả về tất cả học sinh.
     - **Teacher**: Chỉ trả về học sinh thuộc các lớp do giáo viên đó dạy.
+    - `with_stats=true`: thống kê của cả trang được tính trong một query.
 """
     teacher_user_id: Optional[int] = None
 
@@ -102,10 +107,40 @@ def get_all_students(
     if not students_view and teacher_user_id:
         # Có thể trả về 200 [] hoặc 404 tùy ý, 200 là tốt hơn cho danh sách rỗng
         return [] 
+
+    if with_stats and students_view:
+        stats = student_crud.get_students_stats(db, [s.student_user_id for s in students_view])
+        for s in students_view:
+            s.stats = stats.get(s.student_user_id)
         
     return students_view
 
 
+# --- GET stats của nhiều học sinh (khai báo trước /{student_user_id}) ---
+@router.get(
+    "/stats",
+    response_model=List[StudentStatsItem],
+    summary="Lấy thống kê của nhiều học sinh theo danh sách id",
+)
+def get_students_stats(
+    ids: List[int] = Query(..., description="Danh sách student_user_id"),
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_OR_TEACHER)
+):
+    """
+    Thống kê (GPA, điểm học tập/kỷ luật, số lớp) của nhiều học sinh trong một query.
+    Id không tồn tại bị bỏ qua.
+
+    Quyền truy cập: **manager**, **teacher** (chỉ học sinh trong lớp mình dạy)
+    """
+    teacher_user_id = current_user.user_id if "manager" not in current_user.roles else None
+    stats = student_crud.get_students_stats(db, ids, teacher_user_id=teacher_user_id)
+    return [
+        StudentStatsItem(student_user_id=sid, **stats[sid].model_dump())
+        for sid in dict.fromkeys(ids) if sid in stats
+    ]
+
+
 # --- GET student by ID ---
 @router.get(
     "/{student_user_id}",
@@ -160,15 +195,10 @@ def delete_student(user_id: int, db: Session = Depends(deps.get_db)):
     # dependencies=[Depends(MANAGER_OR_TEACHER)] # Hoặc tùy chỉnh quyền truy cập
 )
 def get_student_stats(user_id: int, db: Session = Depends(deps.get_db)):
-    # 1. Kiểm tra học sinh tồn tại
-    db_student = student_crud.get_student(db, student_user_id=user_id)
-    if not db_student:
-        raise HTTPException(status_code=404, detail="Học sinh không tìm thấy.")
-    
-    # 2. Lấy thống kê
-    # Vì hàm CRUD không còn là async, ta gọi trực tiếp
+    # Một query: trả về None nếu không phải học sinh
     stats = student_crud.get_student_stats(db, student_user_id=user_id)
-    
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Học sinh không tìm thấy.")
     return stats
 
 @router.get(
@@ -251,4 +281,40 @@ def get_student_teachers_endpoint(
     teachers_list = student_crud.get_student_teachers(db, student_user_id=student_user_id)
     
     # 3. Trả về kết quả
-    return teachers_list
\ No newline at end of file
+    return teachers_list
+
+
+@router.get(
+    "/{student_user_id}/transcript",
+    response_model=Transcript,
+    summary="Bảng điểm của học sinh (điểm kiểm tra, GPA, đánh giá, chuyên cần theo lớp)",
+)
+def get_student_transcript(
+    student_user_id: int,
+    format: str = Query("json", pattern="^(json|xlsx)$", description="json hoặc xlsx"),
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(BASE_USERS)
+):
+    """
+    Toàn bộ bảng điểm được tính bằng một bộ query cố định và cache theo version dữ liệu lớp.
+    `format=xlsx` trả về file Excel dạng bảng.
+
+    Quyền truy cập: **manager** (tất cả), **teacher** (học sinh trong lớp mình dạy),
+    **student** (của mình), **parent** (của con).
+    """
+    roles = current_user.roles
+    allowed = (
+        "manager" in roles
+        or ("student" in roles and current_user.user_id == student_user_id)
+        or ("parent" in roles and student_crud.is_child_of_parent(db, student_user_id, current_user.user_id))
+        or ("teacher" in roles and student_crud.is_taught_by_teacher(db, student_user_id, current_user.user_id))
+    )
+    if not allowed:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Bạn không có quyền xem bảng điểm này.")
+
+    transcript = transcript_service.get_transcript(db, student_user_id)
+    if not transcript:
+        raise HTTPException(status_code=404, detail="Học sinh không tìm thấy.")
+    if format == "xlsx":
+        return export_transcripts([transcript], f"transcript_{student_user_id}.xlsx")
+    return transcript
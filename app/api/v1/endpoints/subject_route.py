@@ -1,5 +1,6 @@
 # app/api/v1/endpoints/subject_route.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
@@ -10,6 +11,7 @@ from app.api.auth.auth import has_roles
 from app.crud import subject_crud
 from app.schemas import subject_schema
 from app.api import deps
+from app.services import response_cache_service
 
 router = APIRouter()
 
@@ -19,6 +21,9 @@ MANAGER_ONLY = has_roles(["manager"])
 # Dependency cho quyền truy cập của Manager hoặc Teacher
 MANAGER_OR_TEACHER = has_roles(["manager", "teacher"])
 
+_SUBJECT = TypeAdapter(subject_schema.Subject)
+_SUBJECT_LIST = TypeAdapter(List[subject_schema.Subject])
+
 @router.post(
     "/", 
     response_model=subject_schema.Subject, 
@@ -51,17 +56,23 @@ def create_new_subject(
     summary="Lấy danh sách tất cả môn học",
 )
 def get_all_subjects(
+    request: Request,
     skip: int = 0, 
     limit: int = 100, 
     db: Session = Depends(deps.get_db)
 ):
     """
-    Lấy danh sách tất cả môn học.
+    Lấy danh sách tất cả môn học (cache + ETag, hỗ trợ If-None-Match -> 304).
     
     Quyền truy cập: **manager**, **teacher**
     """
-    subjects = subject_crud.get_all_subjects(db, skip=skip, limit=limit)
-    return subjects
+    return response_cache_service.cached_json(
+        request,
+        db,
+        lambda: subject_crud.get_all_subjects(db, skip=skip, limit=limit),
+        _SUBJECT_LIST,
+        tags=(response_cache_service.SUBJECTS,),
+    )
 
 @router.get(
     "/{subject_id}", 
@@ -70,21 +81,27 @@ def get_all_subjects(
     dependencies=[Depends(MANAGER_OR_TEACHER)] # Manager và teacher có thể xem
 )
 def get_subject(
+    request: Request,
     subject_id: int, 
     db: Session = Depends(deps.get_db)
 ):
     """
-    Lấy thông tin của một môn học cụ thể bằng ID.
+    Lấy thông tin của một môn học cụ thể bằng ID (cache + ETag).
     
     Quyền truy cập: **manager**, **teacher**
     """
-    db_subject = subject_crud.get_subject(db, subject_id=subject_id)
-    if db_subject is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Môn học không tìm thấy."
-        )
-    return db_subject
+    def load():
+        db_subject = subject_crud.get_subject(db, subject_id=subject_id)
+        if db_subject is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Môn học không tìm thấy."
+            )
+        return db_subject
+
+    return response_cache_service.cached_json(
+        request, db, load, _SUBJECT, tags=(response_cache_service.SUBJECTS,)
+    )
 
 @router.put(
     "/{subject_id}", 
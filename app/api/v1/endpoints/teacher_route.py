@@ -1,11 +1,11 @@
 # app/api/v1/endpoints/teacher_route.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 # CRUD
-from app.crud import teacher_crud
+from app.crud import teacher_crud, teacher_rating_crud
 from app.crud import user_crud
 from app.crud import user_role_crud # cần import CRUD user_role
 
@@ -18,7 +18,8 @@ from app.api import deps
 # Import dependency factory
 from app.api.auth.auth import get_current_active_user, has_roles
 from app.schemas.auth_schema import AuthenticatedUser
-from app.schemas import student_schema, class_schema
+from app.schemas import student_schema, class_schema, teacher_review_schema
+from app.services import teacher_metrics_service
 
 router = APIRouter()
 
@@ -99,6 +100,84 @@ def get_all_teachers(
     return teacher_crud.get_all_teachers(db, skip=skip, limit=limit)
 
 
+# Khai báo trước /{teacher_user_id} để "metrics" không bị hiểu là id
+@router.get(
+    "/metrics",
+    response_model=List[teacher_schema.TeacherMetrics],
+    summary="Số liệu của nhiều giáo viên (trang danh sách)",
+    dependencies=[Depends(MANAGER_OR_TEACHER)]
+)
+def get_teachers_metrics(
+    ids: Optional[List[int]] = Query(
+        None, max_length=500, description="Danh sách teacher_user_id (tối đa 500); bỏ trống để lấy theo trang"
+    ),
+    skip: int = 0,
+    limit: int = Query(100, le=500),
+    fresh: bool = Query(False, description="Bỏ qua cache (mặc định cache vài chục giây)"),
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Số lớp, buổi học, học sinh, điểm đánh giá trung bình, GPA và đánh giá của nhiều giáo viên,
+    tính chung trong một câu lệnh GROUP BY teacher_user_id thay vì gọi `/{id}/stats` từng người.
+
+    Quyền truy cập: **manager**, **teacher**
+    """
+    teacher_ids = ids or teacher_crud.get_teacher_page_ids(db, skip=skip, limit=limit)
+    return teacher_metrics_service.get_teachers_metrics(db, teacher_ids, use_cache=not fresh)
+
+
+@router.get(
+    "/top",
+    response_model=List[teacher_review_schema.TeacherRating],
+    summary="Xếp hạng giáo viên theo đánh giá của học sinh",
+    dependencies=[Depends(get_current_active_user)]
+)
+def get_top_teachers(
+    limit: int = Query(10, ge=1, le=100),
+    min_reviews: int = Query(1, ge=1, description="Số lượt đánh giá tối thiểu để được xếp hạng"),
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Đọc từ bảng tổng hợp teacher_rating_stats (không quét teacher_reviews).
+
+    Quyền truy cập: người dùng đã đăng nhập
+    """
+    return [
+        teacher_review_schema.TeacherRating(
+            teacher_user_id=stats.teacher_user_id,
+            teacher_name=full_name,
+            review_count=stats.review_count,
+            average_rating=stats.average_rating,
+            distribution=stats.distribution,
+        )
+        for stats, full_name in teacher_rating_crud.get_top_teachers(db, limit=limit, min_reviews=min_reviews)
+    ]
+
+
+@router.get(
+    "/{teacher_user_id}/rating",
+    response_model=teacher_review_schema.TeacherRating,
+    summary="Tổng hợp đánh giá (điểm trung bình, phân bố sao) của một giáo viên",
+    dependencies=[Depends(get_current_active_user)]
+)
+def get_teacher_rating(
+    teacher_user_id: int,
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Quyền truy cập: người dùng đã đăng nhập
+    """
+    if not teacher_crud.get_teacher(db, teacher_user_id=teacher_user_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Giáo viên không tìm thấy.")
+    stats = teacher_rating_crud.get_rating_stats(db, teacher_user_id)
+    return teacher_review_schema.TeacherRating(
+        teacher_user_id=teacher_user_id,
+        review_count=stats.review_count if stats else 0,
+        average_rating=stats.average_rating if stats else 0.0,
+        distribution=stats.distribution if stats else {i: 0 for i in range(1, 6)},
+    )
+
+
 @router.get(
     "/{teacher_user_id}", 
     response_model=teacher_schema.Teacher,
@@ -195,13 +274,13 @@ def get_teacher_stats(
 
     Quyền truy cập: **manager**, **teacher**
     """
-    db_teacher = teacher_crud.get_teacher(db, teacher_user_id=teacher_user_id)
-    if not db_teacher:
+    stats = teacher_crud.get_teacher_stats(db, teacher_user_id=teacher_user_id)
+    if stats is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Giáo viên không tìm thấy."
         )
-    return teacher_crud.get_teacher_stats(db, teacher_user_id=teacher_user_id)
+    return stats
 
 @router.get(
     "/{teacher_user_id}/classes",
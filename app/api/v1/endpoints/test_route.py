@@ -10,7 +10,9 @@ from app.schemas import test_schema
 from app.api import deps
 # Import dependency factory
 from app.api.auth.auth import has_roles, get_current_active_user
-from app.services.excel_services.import_tests import import_tests_from_excel
+from app.services import fast_json_service, job_service
+from app.services.test_service import validate_teacher_class
+from app.schemas import job_schema
 
 router = APIRouter()
 
@@ -67,7 +69,8 @@ def get_all_tests(
     Trả về danh sách bài kiểm tra đã được lọc theo vai trò của người dùng hiện tại (Manager/Teacher/Student/Parent).
     """
     print("Current user roles:", current_user.roles)
-    return test_crud.get_all_tests(db, current_user, skip=skip, limit=limit)
+    tests = test_crud.get_all_tests(db, current_user, skip=skip, limit=limit)
+    return fast_json_service.list_response(test_schema.TestBase, tests)
 
 
 @router.get(
@@ -195,7 +198,9 @@ def delete_existing_test(
 
 @router.post(
     "/import",
-    summary="Import danh sách điểm kiểm tra từ file Excel vào DB",
+    response_model=job_schema.JobSubmitted,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Import danh sách điểm kiểm tra từ file Excel vào DB (chạy nền)",
     dependencies=[MANAGER_OR_TEACHER] # ĐÃ SỬA: Sử dụng trực tiếp biến dependency
 )
 def import_tests_endpoint(
@@ -206,19 +211,21 @@ def import_tests_endpoint(
 ):
     """
     Import danh sách điểm kiểm tra từ file Excel vào DB.
+    Lớp và quyền được kiểm tra ngay, phần import chạy qua job runner; theo dõi tại `/jobs/{job_id}`.
     
     Quyền truy cập: **manager**, **teacher**
     """
-    try:
-        # Kiểm tra sự tồn tại của class_id trước khi import
-        db_class = class_crud.get_class(db, class_id=class_id)
-        if not db_class:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Class with id {class_id} not found."
-            )
-            
-        result = import_tests_from_excel(db, file, class_id, current_user)
-        return {"message": "Import thành công", "result": result}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    # Kiểm tra sự tồn tại của class_id trước khi import
+    db_class = class_crud.get_class(db, class_id=class_id)
+    if not db_class:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Class with id {class_id} not found."
+        )
+    validate_teacher_class(db, current_user, class_id)
+
+    path = job_service.save_upload(file)
+    db_job = job_service.submit_job(
+        db, "tests_import", current_user, params={"class_id": class_id}, input_file=path
+    )
+    return job_schema.JobSubmitted(job_id=db_job.job_id, status=db_job.status)
@@ -1,5 +1,5 @@
 from datetime import date
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -10,7 +10,7 @@ from app.schemas.tuition_schema import (
     TuitionRead,
     TuitionView,
 )
-from app.services import tuition_service
+from app.services import tuition_service, job_service
 from app.api.auth.auth import has_roles, get_current_active_user
 from app.crud import tuition_crud
 from app.schemas.auth_schema import AuthenticatedUser
@@ -206,15 +206,16 @@ def delete_tuition(
     dependencies=[Depends(MANAGER_ONLY)]
 )
 def generate_tuition_for_all_students_route(
-    background_tasks: BackgroundTasks,
     term: int = Query(..., gt=0, description="Kỳ học để tạo học phí"),
     due_date: date = Query(..., description="Hạn thanh toán"),
-    db: Session = Depends(deps.get_db),  # dùng session từ FastAPI
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
 ):
-    background_tasks.add_task(
-        tuition_service.create_tuition_for_all_students,
-        db=db,           # truyền session vào
-        due_date=due_date,
-        term=term
+    # Chạy qua job runner (session riêng), theo dõi tiến độ tại /jobs/{job_id}
+    db_job = job_service.submit_job(
+        db, "tuitions_generate", current_user, params={"term": term, "due_date": due_date}
     )
-    return {"message": "Đã chấp nhận yêu cầu. Quá trình tạo học phí đang chạy ngầm."}
+    return {
+        "message": "Đã chấp nhận yêu cầu. Quá trình tạo học phí đang chạy ngầm.",
+        "job_id": db_job.job_id,
+    }
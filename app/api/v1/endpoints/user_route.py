@@ -1,16 +1,16 @@
-from typing import Dict, List
-import logging
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from app.api import deps
-from app.services.excel_services import import_users
 # Import dependency factory
 from app.api.auth.auth import has_roles
-from app.schemas.user_schema import UserCreate, UserUpdate, UserOut, UserView, UserViewDetails
+from app.schemas.user_schema import UserCreate, UserUpdate, UserOut, UserView, UserViewDetails, UserSearchPage
 from app.crud import user_crud
+from app.services import user_service, job_service
+from app.schemas import job_schema
 from app.api.auth.auth import get_current_active_user
 from app.schemas.auth_schema import AuthenticatedUser
 from app.database import get_db
@@ -56,6 +56,28 @@ def get_users(skip: int = 0, limit: int = 100, db: Session = Depends(deps.get_db
     """
     return user_crud.get_users(db, skip=skip, limit=limit)
 
+# Khai báo trước "/{user_id}" để "search" không bị hiểu là user_id
+@router.get(
+    "/search",
+    response_model=UserSearchPage,
+    summary="Tìm kiếm người dùng theo tên, email, số điện thoại"
+)
+def search_users(
+    q: str = Query(..., min_length=1, max_length=100, description="Từ khóa (tên không cần dấu)"),
+    role: Optional[str] = Query(None, pattern="^(manager|teacher|student|parent)$", description="Lọc theo vai trò"),
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước"),
+    db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_OR_TEACHER)
+):
+    """
+    Tìm kiếm gần đúng (trigram) theo họ tên không phân biệt dấu, email, số điện thoại,
+    sắp xếp theo độ tương đồng, phân trang bằng cursor (dùng cho ô gợi ý khi gõ).
+
+    Quyền truy cập: **manager** (toàn bộ), **teacher** (học sinh các lớp mình dạy)
+    """
+    return user_service.search_users(db, current_user, q, role=role, limit=limit, cursor=cursor)
+
 @router.get(
     "/{user_id}",
     response_model=UserViewDetails,
@@ -130,29 +152,26 @@ def delete_user_info(user_id: int, db: Session = Depends(deps.get_db)):
         )
     return deleted_user
 
-class ImportUsersResponse(BaseModel):
-    status: str
-    imported: Dict[str, dict]
-
 @router.post(
     "/import-users",
-    response_model=ImportUsersResponse,
-    summary="Import người dùng từ file Excel",
-    dependencies=[Depends(MANAGER_ONLY)]
+    response_model=job_schema.JobSubmitted,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Import người dùng từ file Excel (chạy nền)"
 )
 def import_users_from_sheet(
     file: UploadFile = File(...),
     db: Session = Depends(deps.get_db),
+    current_user: AuthenticatedUser = Depends(MANAGER_ONLY)
 ):
     """
     Import thông tin người dùng từ một file Excel.
+    File được lưu lại và xử lý qua job runner; theo dõi kết quả tại `/jobs/{job_id}`.
+
+    Quyền truy cập: **manager**
     """
-    try:
-        result = import_users.import_users(file, db)
-        return {"status": "success", "imported": result}
-    except Exception as e:
-        logging.exception("Import failed")
-        raise HTTPException(status_code=400, detail=f"Import failed: {str(e)}")
+    path = job_service.save_upload(file)
+    db_job = job_service.submit_job(db, "users_import", current_user, input_file=path)
+    return job_schema.JobSubmitted(job_id=db_job.job_id, status=db_job.status)
 
 class UpdatePasswordRequest(BaseModel):
     old_password: str
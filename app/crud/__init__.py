@@ -11,7 +11,15 @@ from . import tuition_crud
 from . import enrollment_crud
 from . import class_crud
 from . import attendance_crud
+from . import attendance_rollup_crud
 from . import evaluation_crud
+from . import evaluation_rollup_crud
 from . import schedule_crud
 from . import teacher_review_crud
 from . import notification_crud
+from . import job_crud
+from . import tuition_payment_crud
+from . import balance_crud
+from . import finance_crud
+from . import teacher_rating_crud
+from . import device_sync_crud
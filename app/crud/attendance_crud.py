@@ -1,51 +1,85 @@
-from datetime import time
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import insert, and_, select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import and_, or_, case, select, tuple_
+from app.models.class_model import Class
 from app.models.student_model import Student
 from app.models.attendance_model import Attendance, AttendanceStatus
-from app.schemas.attendance_schema import AttendanceBatchCreate, AttendanceRecordCreate
+from app.schemas.attendance_schema import AttendanceBatchCreate
+from app.crud import class_crud, attendance_rollup_crud
+from app.crud.crud_helper import upsert_insert
 
-def create_initial_attendance_records(db: Session, attendance_data: AttendanceBatchCreate) -> List[Attendance]:
+def upsert_attendance_records(
+    db: Session, records: List[dict]
+) -> Tuple[List[Attendance], Dict[int, AttendanceStatus]]:
     """
-    Tạo bản ghi điểm danh ban đầu cho tất cả học sinh trong một lớp.
-    """
-    try:
-        student_user_ids_to_create = [record.student_user_id for record in attendance_data.records or []]
+    Ghi điểm danh theo khóa (student_user_id, schedule_id, attendance_date) bằng một câu
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING, nên gửi lại cả buổi không bị lỗi trùng.
+    Các bản ghi có thể thuộc nhiều lịch học/lớp. Trạng thái cũ lấy từ previous_status do chính
+    câu upsert ghi (không đọc trước), nên hai lần gửi đồng thời cùng một buổi không bị tính là mới hai lần.
 
-        # Kiểm tra tồn tại trong Student
-        existing_students = db.query(Student).filter(
-            Student.user_id.in_(student_user_ids_to_create)
-        ).all()
-        existing_student_user_ids = {student.user_id for student in existing_students}
+    Trả về (các bản ghi sau khi ghi, {attendance_id: trạng thái cũ} của bản ghi đã tồn tại)
+    để tầng service tính hệ quả theo chênh lệch trạng thái.
+    Đồng bộ attendance_rollups và data_version của các lớp có thay đổi. Không commit.
+    """
+    if not records:
+        return [], {}
+    student_user_ids = {record["student_user_id"] for record in records}
+    existing_student_user_ids = set(db.execute(
+        select(Student.user_id).where(Student.user_id.in_(student_user_ids))
+    ).scalars())
+    non_existent_ids = sorted(student_user_ids - existing_student_user_ids)
+    if non_existent_ids:
+        raise ValueError(f"Students with user_ids {non_existent_ids} not found.")
 
-        non_existent_ids = [s_id for s_id in student_user_ids_to_create if s_id not in existing_student_user_ids]
-        if non_existent_ids:
-            raise ValueError(f"Students with user_ids {non_existent_ids} not found.")
+    stmt = upsert_insert(db, Attendance).values(records)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Attendance.student_user_id, Attendance.schedule_id, Attendance.attendance_date],
+        set_={
+            # Vế phải của SET đọc dòng hiện có (đã khóa bởi chính câu lệnh): trạng thái trước khi ghi
+            "previous_status": Attendance.status,
+            "status": stmt.excluded.status,
+            "checkin_time": stmt.excluded.checkin_time,
+            # Gửi lại giống hệt không đẩy watermark đồng bộ
+            "updated_at": case(
+                (or_(
+                    Attendance.status != stmt.excluded.status,
+                    Attendance.checkin_time.is_distinct_from(stmt.excluded.checkin_time),
+                ), datetime.utcnow()),
+                else_=Attendance.updated_at,
+            ),
+        },
+    ).returning(Attendance)
+    result = db.execute(stmt, execution_options={"populate_existing": True}).scalars().all()
 
-        attendance_records = []
-        for record in attendance_data.records:
-            attendance_records.append({
-                "schedule_id": attendance_data.schedule_id,
-                "class_id": attendance_data.class_id,
-                "attendance_date": attendance_data.attendance_date,
-                "status": record.status,  # enum trực tiếp
-                "checkin_time": record.checkin_time,
-                "student_user_id": record.student_user_id
-            })
+    previous = {}
+    added, removed = [], []
+    for r in result:
+        old_status = r.previous_status
+        if old_status is not None:
+            previous[r.attendance_id] = old_status
+        if old_status != r.status:
+            added.append((r.student_user_id, r.class_id, r.status))
+            if old_status is not None:
+                removed.append((r.student_user_id, r.class_id, old_status))
+    attendance_rollup_crud.apply_attendance_changes(db, added=added, removed=removed)
+    class_crud.bump_data_versions(db, {class_id for _, class_id, _ in added})
+    return result, previous
 
-        stmt = insert(Attendance).values(attendance_records).returning(Attendance)
-        result = db.execute(stmt).scalars().all()
-        db.commit()
-        return result
 
-    except IntegrityError:
-        db.rollback()
-        raise ValueError("Một hoặc nhiều bản ghi điểm danh đã tồn tại. Không thể tạo bản ghi trùng lặp.")
-    except Exception as e:
-        db.rollback()
-        raise e
+def attendance_rows(attendance_data: AttendanceBatchCreate) -> List[dict]:
+    """Chuyển payload điểm danh một buổi thành các dòng cho upsert_attendance_records."""
+    return [
+        {
+            "schedule_id": attendance_data.schedule_id,
+            "class_id": attendance_data.class_id,
+            "attendance_date": attendance_data.attendance_date,
+            "status": record.status,  # enum trực tiếp
+            "checkin_time": record.checkin_time,
+            "student_user_id": record.student_user_id
+        }
+        for record in attendance_data.records or []
+    ]
 
 
 def get_attendance_record_by_student_and_date(
@@ -65,41 +99,6 @@ def get_attendance_record_by_student_and_date(
     return db.execute(stmt).scalar_one_or_none()
 
 
-def update_attendance_status(
-    db: Session, db_record: Attendance, new_status: AttendanceStatus, checkin_time: Optional[time] = None
-) -> Optional[Attendance]:
-    """
-    Cập nhật trạng thái và thời gian check-in của một bản ghi điểm danh.
-    """
-    if db_record:
-        db_record.status = new_status
-        db_record.checkin_time = checkin_time
-        db.commit()
-        db.refresh(db_record)
-        return db_record
-    return None
-
-
-def update_attendance_record(
-    db: Session, student_user_id: int, schedule_id: int, class_id: int, attendance_date: str, update_data: AttendanceRecordCreate
-) -> Optional[Attendance]:
-    """
-    Cập nhật bản ghi điểm danh.
-    """
-    db_record = get_attendance_record_by_student_and_date(
-        db, student_user_id, schedule_id, class_id, attendance_date
-    )
-    if not db_record:
-        return None
-
-    return update_attendance_status(
-        db,
-        db_record=db_record,
-        new_status=update_data.status,
-        checkin_time=update_data.checkin_time
-    )
-
-
 def get_absent_attendance_for_student_in_class(
     db: Session, student_user_id: int, schedule_id: int, class_id: int
 ) -> Optional[Attendance]:
@@ -115,3 +114,26 @@ def get_absent_attendance_for_student_in_class(
         )
     )
     return db.execute(stmt).scalar_one_or_none()
+
+
+def get_attendance_changes(
+    db: Session,
+    teacher_user_id: int,
+    until: datetime,
+    since: Optional[Tuple[datetime, int]] = None,
+    limit: int = 1000,
+) -> List[Attendance]:
+    """
+    Bản ghi điểm danh của các lớp giáo viên dạy đã thay đổi sau watermark `since`
+    (keyset theo (updated_at, attendance_id)) và không muộn hơn `until`, tăng dần theo watermark.
+    """
+    stmt = (
+        select(Attendance)
+        .join(Class, Class.class_id == Attendance.class_id)
+        .where(Class.teacher_user_id == teacher_user_id, Attendance.updated_at <= until)
+        .order_by(Attendance.updated_at, Attendance.attendance_id)
+        .limit(limit)
+    )
+    if since is not None:
+        stmt = stmt.where(tuple_(Attendance.updated_at, Attendance.attendance_id) > tuple_(*since))
+    return db.execute(stmt).scalars().all()
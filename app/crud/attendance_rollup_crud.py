@@ -0,0 +1,109 @@
+from collections import defaultdict
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import select, delete, insert, func, case
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+
+from app.models.attendance_model import Attendance, AttendanceStatus
+from app.models.attendance_rollup_model import AttendanceRollup
+from app.crud.crud_helper import upsert_insert
+
+# (student_user_id, class_id, status)
+AttendanceKey = Tuple[int, int, AttendanceStatus]
+
+_STATUS_COLUMNS = {
+    AttendanceStatus.present: "present_count",
+    AttendanceStatus.late: "late_count",
+    AttendanceStatus.absent: "absent_count",
+}
+_COUNTER_COLUMNS = ("present_count", "late_count", "absent_count", "total_count")
+
+
+def apply_attendance_changes(
+    db: Session,
+    added: Iterable[AttendanceKey] = (),
+    removed: Iterable[AttendanceKey] = (),
+) -> None:
+    """
+    Cộng/trừ bộ đếm điểm danh trong attendance_rollups bằng một câu upsert.
+    Không commit: gọi trong cùng transaction với thao tác ghi attendances.
+    Đổi trạng thái một bản ghi = removed(trạng thái cũ) + added(trạng thái mới).
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(_COUNTER_COLUMNS, 0))
+    for sign, items in ((1, added), (-1, removed)):
+        for student_user_id, class_id, status in items:
+            acc = deltas[(student_user_id, class_id)]
+            acc[_STATUS_COLUMNS[AttendanceStatus(status)]] += sign
+            acc["total_count"] += sign
+
+    rows = [
+        {"student_user_id": student_user_id, "class_id": class_id, **values}
+        for (student_user_id, class_id), values in deltas.items()
+        if any(values.values())
+    ]
+    if not rows:
+        return
+
+    stmt = upsert_insert(db, AttendanceRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AttendanceRollup.student_user_id, AttendanceRollup.class_id],
+        set_={
+            **{col: getattr(AttendanceRollup, col) + getattr(stmt.excluded, col) for col in _COUNTER_COLUMNS},
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt, rows)
+
+
+def get_attendance_rollups(
+    db: Session,
+    class_id: Optional[int] = None,
+    student_user_id: Optional[int] = None,
+    scope: Optional[ColumnElement] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[AttendanceRollup]:
+    """
+    Lấy bộ đếm điểm danh theo lớp/học sinh.
+    `scope`: predicate phân quyền (policy_service.row_scope), None = không giới hạn.
+    """
+    stmt = select(AttendanceRollup)
+    if scope is not None:
+        stmt = stmt.where(scope)
+    if class_id is not None:
+        stmt = stmt.where(AttendanceRollup.class_id == class_id)
+    if student_user_id is not None:
+        stmt = stmt.where(AttendanceRollup.student_user_id == student_user_id)
+    stmt = stmt.order_by(AttendanceRollup.class_id, AttendanceRollup.student_user_id).offset(skip).limit(limit)
+    return db.execute(stmt).scalars().all()
+
+
+def rebuild_attendance_rollups(db: Session, class_id: Optional[int] = None) -> int:
+    """
+    Dựng lại attendance_rollups từ bảng attendances (sửa sai lệch).
+    class_id=None: dựng lại toàn bộ. Trả về số dòng rollup được tạo.
+    """
+    delete_stmt = delete(AttendanceRollup)
+    source = select(
+        Attendance.student_user_id,
+        Attendance.class_id,
+        func.sum(case((Attendance.status == AttendanceStatus.present, 1), else_=0)),
+        func.sum(case((Attendance.status == AttendanceStatus.late, 1), else_=0)),
+        func.sum(case((Attendance.status == AttendanceStatus.absent, 1), else_=0)),
+        func.count(Attendance.attendance_id),
+        func.now(),
+    ).where(Attendance.status.isnot(None)).group_by(Attendance.student_user_id, Attendance.class_id)
+
+    if class_id is not None:
+        delete_stmt = delete_stmt.where(AttendanceRollup.class_id == class_id)
+        source = source.where(Attendance.class_id == class_id)
+
+    db.execute(delete_stmt)
+    result = db.execute(
+        insert(AttendanceRollup).from_select(
+            ["student_user_id", "class_id", *_COUNTER_COLUMNS, "updated_at"],
+            source,
+        )
+    )
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,207 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import select, delete, insert, update, func, case, extract, literal, true
+from sqlalchemy.orm import Session
+
+from app.models.tuition_model import Tuition
+from app.models.tuition_payment_model import TuitionPayment, PaymentEntryType
+from app.models.student_model import Student
+from app.models.balance_model import StudentBalance, ParentBalance, RevenueMonthly
+from app.crud.crud_helper import upsert_insert
+
+# (student_user_id, billed_delta, paid_delta)
+BalanceChange = Tuple[int, Decimal, Decimal]
+
+_BALANCE_COLUMNS = ("total_billed", "total_paid")
+_REVENUE_COLUMNS = ("collected_amount", "refunded_amount", "payment_count")
+
+
+def _upsert_balances(db: Session, model, key_column, rows: List[dict]) -> None:
+    if not rows:
+        return
+    stmt = upsert_insert(db, model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key_column],
+        set_={
+            **{col: getattr(model, col) + getattr(stmt.excluded, col) for col in _BALANCE_COLUMNS},
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt, rows)
+
+
+def apply_balance_changes(db: Session, changes: Iterable[BalanceChange]) -> None:
+    """
+    Cộng dồn thay đổi công nợ vào student_balances và parent_balances (upsert).
+    Không commit: gọi trong cùng transaction với thao tác ghi học phí/sổ thanh toán.
+    """
+    deltas = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    for student_user_id, billed, paid in changes:
+        acc = deltas[student_user_id]
+        acc[0] += Decimal(billed or 0)
+        acc[1] += Decimal(paid or 0)
+    deltas = {sid: d for sid, d in deltas.items() if any(d)}
+    if not deltas:
+        return
+
+    _upsert_balances(db, StudentBalance, StudentBalance.student_user_id, [
+        {"student_user_id": sid, "total_billed": billed, "total_paid": paid}
+        for sid, (billed, paid) in deltas.items()
+    ])
+
+    # Gộp theo phụ huynh hiện tại của học sinh (1 query)
+    parent_deltas = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    for sid, parent_id in db.execute(
+        select(Student.user_id, Student.parent_id).where(
+            Student.user_id.in_(deltas), Student.parent_id.isnot(None)
+        )
+    ):
+        parent_deltas[parent_id][0] += deltas[sid][0]
+        parent_deltas[parent_id][1] += deltas[sid][1]
+
+    _upsert_balances(db, ParentBalance, ParentBalance.parent_user_id, [
+        {"parent_user_id": pid, "total_billed": billed, "total_paid": paid}
+        for pid, (billed, paid) in parent_deltas.items()
+    ])
+
+
+def apply_billing_from_tuitions(db: Session, *criteria) -> None:
+    """
+    Bản set-based của apply_balance_changes cho các học phí vừa tạo hàng loạt:
+    INSERT ... SELECT SUM(amount) ... ON CONFLICT DO UPDATE, lọc tuitions theo criteria.
+    """
+    student_src = (
+        select(
+            Tuition.student_user_id,
+            func.sum(Tuition.amount),
+            literal(0, StudentBalance.total_paid.type),
+            func.now(),
+        )
+        .where(true(), *criteria)
+        .group_by(Tuition.student_user_id)
+    )
+    parent_src = (
+        select(
+            Student.parent_id,
+            func.sum(Tuition.amount),
+            literal(0, ParentBalance.total_paid.type),
+            func.now(),
+        )
+        .join(Student, Student.user_id == Tuition.student_user_id)
+        .where(Student.parent_id.isnot(None), *criteria)
+        .group_by(Student.parent_id)
+    )
+    for model, key_column, src in (
+        (StudentBalance, "student_user_id", student_src),
+        (ParentBalance, "parent_user_id", parent_src),
+    ):
+        stmt = upsert_insert(db, model).from_select(
+            [key_column, "total_billed", "total_paid", "updated_at"], src
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[key_column],
+            set_={"total_billed": model.total_billed + stmt.excluded.total_billed, "updated_at": func.now()},
+        )
+        db.execute(stmt)
+
+
+def apply_revenue_change(db: Session, paid_at: date, entry_type: PaymentEntryType, amount: Decimal) -> None:
+    """Cộng một bút toán vào revenue_monthly của tháng thu tiền. Không commit."""
+    is_payment = entry_type == PaymentEntryType.payment
+    row = {
+        "year": paid_at.year,
+        "month": paid_at.month,
+        "collected_amount": amount if is_payment else 0,
+        "refunded_amount": 0 if is_payment else amount,
+        "payment_count": 1 if is_payment else 0,
+    }
+    stmt = upsert_insert(db, RevenueMonthly)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RevenueMonthly.year, RevenueMonthly.month],
+        set_={
+            **{col: getattr(RevenueMonthly, col) + getattr(stmt.excluded, col) for col in _REVENUE_COLUMNS},
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt, [row])
+
+
+def get_student_balance(db: Session, student_user_id: int) -> Optional[StudentBalance]:
+    return db.get(StudentBalance, student_user_id)
+
+
+def get_parent_balance(db: Session, parent_user_id: int) -> Optional[ParentBalance]:
+    return db.get(ParentBalance, parent_user_id)
+
+
+def get_parent_balances(db: Session, skip: int = 0, limit: int = 100, only_outstanding: bool = True) -> List[ParentBalance]:
+    """Danh sách công nợ theo phụ huynh, nợ nhiều nhất trước."""
+    outstanding = ParentBalance.total_billed - ParentBalance.total_paid
+    stmt = select(ParentBalance)
+    if only_outstanding:
+        stmt = stmt.where(outstanding > 0)
+    stmt = stmt.order_by(outstanding.desc(), ParentBalance.parent_user_id).offset(skip).limit(limit)
+    return db.execute(stmt).scalars().all()
+
+
+def get_revenue_monthly(db: Session, year: Optional[int] = None) -> List[RevenueMonthly]:
+    stmt = select(RevenueMonthly)
+    if year is not None:
+        stmt = stmt.where(RevenueMonthly.year == year)
+    return db.execute(stmt.order_by(RevenueMonthly.year, RevenueMonthly.month)).scalars().all()
+
+
+def rebuild_balances(db: Session) -> int:
+    """
+    Dựng lại tuitions.paid_amount, student_balances, parent_balances và revenue_monthly
+    từ sổ tuition_payments và bảng tuitions (sửa sai lệch). Trả về số dòng snapshot học sinh.
+    """
+    signed = case(
+        (TuitionPayment.entry_type == PaymentEntryType.payment, TuitionPayment.amount),
+        else_=-TuitionPayment.amount,
+    )
+    paid_by_tuition = (
+        select(func.coalesce(func.sum(signed), 0))
+        .where(TuitionPayment.tuition_id == Tuition.tuition_id)
+        .scalar_subquery()
+    )
+    db.execute(update(Tuition).values(paid_amount=paid_by_tuition))
+
+    db.execute(delete(StudentBalance))
+    db.execute(delete(ParentBalance))
+    db.execute(delete(RevenueMonthly))
+
+    result = db.execute(insert(StudentBalance).from_select(
+        ["student_user_id", "total_billed", "total_paid", "updated_at"],
+        select(
+            Tuition.student_user_id, func.sum(Tuition.amount), func.sum(Tuition.paid_amount), func.now()
+        ).group_by(Tuition.student_user_id),
+    ))
+    db.execute(insert(ParentBalance).from_select(
+        ["parent_user_id", "total_billed", "total_paid", "updated_at"],
+        select(
+            Student.parent_id, func.sum(Tuition.amount), func.sum(Tuition.paid_amount), func.now()
+        )
+        .join(Student, Student.user_id == Tuition.student_user_id)
+        .where(Student.parent_id.isnot(None))
+        .group_by(Student.parent_id),
+    ))
+
+    pay_year = extract("year", TuitionPayment.paid_at)
+    pay_month = extract("month", TuitionPayment.paid_at)
+    is_payment = TuitionPayment.entry_type == PaymentEntryType.payment
+    db.execute(insert(RevenueMonthly).from_select(
+        ["year", "month", *_REVENUE_COLUMNS, "updated_at"],
+        select(
+            pay_year,
+            pay_month,
+            func.sum(case((is_payment, TuitionPayment.amount), else_=0)),
+            func.sum(case((is_payment, 0), else_=TuitionPayment.amount)),
+            func.sum(case((is_payment, 1), else_=0)),
+            func.now(),
+        ).group_by(pay_year, pay_month),
+    ))
+    db.commit()
+    return result.rowcount
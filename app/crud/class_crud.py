@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import select, join
+from sqlalchemy import select, join, update
 from typing import List
 
 from app.models.class_model import Class
@@ -8,6 +8,8 @@ from app.models.subject_model import Subject
 from app.models.enrollment_model import Enrollment
 from app.schemas.class_schema import ClassCreate, ClassUpdate, ClassView, Student
 from app.models.enrollment_model import EnrollmentStatus
+from app.services import stats_service, response_cache_service, fast_json_service
+from app.services.session_index_service import invalidate_session_index
 
 def get_class_with_teacher_name_query():
     return (
@@ -47,7 +49,7 @@ def get_classes_by_teacher_user_id(db: Session, teacher_user_id: int, skip: int
         .limit(limit)
     )
     results = db.execute(query).all()
-    return [ClassView.model_validate(row._asdict()) for row in results]
+    return fast_json_service.rows_to_models(ClassView, results)
 
 def get_active_classes_by_student_user_id(db: Session, student_user_id: int, skip: int = 0, limit: int = 100) -> List[ClassView]:
     query = (
@@ -61,18 +63,20 @@ def get_active_classes_by_student_user_id(db: Session, student_user_id: int, ski
         .limit(limit)
     )
     results = db.execute(query).all()
-    return [ClassView.model_validate(row._asdict()) for row in results]
+    return fast_json_service.rows_to_models(ClassView, results)
 
 def get_all_classes(db: Session, skip: int = 0, limit: int = 100) -> List[ClassView]:
     query = get_class_with_teacher_name_query().offset(skip).limit(limit)
     results = db.execute(query).all()
-    return [ClassView.model_validate(row._asdict()) for row in results]
+    return fast_json_service.rows_to_models(ClassView, results)
 
 def create_class(db: Session, class_data: ClassCreate):
     db_class = Class(**class_data.model_dump())
     db.add(db_class)
+    response_cache_service.invalidate_tags(db, response_cache_service.CLASSES)
     db.commit()
     db.refresh(db_class)
+    stats_service.invalidate_stats()
     return db_class
 
 def update_class(db: Session, class_id: int, class_update: ClassUpdate):
@@ -82,8 +86,13 @@ def update_class(db: Session, class_id: int, class_update: ClassUpdate):
         for key, value in update_data.items():
             setattr(db_class, key, value)
         db.add(db_class)
+        # Tên lớp / giáo viên nằm trong báo cáo lớp đã cache
+        bump_data_version(db, class_id)
+        response_cache_service.invalidate_tags(db, response_cache_service.CLASSES)
         db.commit()
         db.refresh(db_class)
+        # Đổi giáo viên phụ trách -> quyền điểm danh thay đổi
+        invalidate_session_index()
     return db_class
 
 def delete_class(db: Session, class_id: int):
@@ -92,7 +101,10 @@ def delete_class(db: Session, class_id: int):
         return None
     deleted_data = db_class
     db.delete(db_class)
+    response_cache_service.invalidate_tags(db, response_cache_service.CLASSES)
     db.commit()
+    stats_service.invalidate_stats()
+    invalidate_session_index()
     return deleted_data
 
 def get_students_list(db: Session, class_id: int, skip: int = 0, limit: int = 100) -> List[Student]:
@@ -130,3 +142,29 @@ def get_students_list(db: Session, class_id: int, skip: int = 0, limit: int = 10
     results = db.execute(query).all()
     return [Student.model_validate(row._asdict()) for row in results]
 
+
+
+def bump_data_version(db: Session, class_id: int) -> None:
+    """
+    Tăng data_version của lớp để vô hiệu hóa các báo cáo đã cache.
+    Không commit: gọi trong cùng transaction với thao tác ghi dữ liệu của lớp.
+    """
+    db.execute(
+        update(Class)
+        .where(Class.class_id == class_id)
+        .values(data_version=Class.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def bump_data_versions(db: Session, class_ids) -> None:
+    """Như bump_data_version nhưng cho nhiều lớp trong một câu UPDATE. Không commit."""
+    class_ids = sorted(set(class_ids))
+    if not class_ids:
+        return
+    db.execute(
+        update(Class)
+        .where(Class.class_id.in_(class_ids))
+        .values(data_version=Class.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,26 @@
+# app/crud/crud_helper.py
+from sqlalchemy import func, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+
+def upsert_insert(db: Session, model):
+    """
+    Trả về câu lệnh INSERT hỗ trợ ON CONFLICT theo dialect đang dùng
+    (PostgreSQL khi chạy thật, SQLite trong test/benchmark).
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+def json_object(db: Session, **fields):
+    """
+    Biểu thức SQL dựng JSON object từ các cột/giá trị (dùng trong INSERT ... SELECT):
+    json_build_object trên PostgreSQL, json_object trên SQLite.
+    """
+    fn = func.json_object if db.get_bind().dialect.name == "sqlite" else func.json_build_object
+    args = []
+    for key, value in fields.items():
+        args.extend([literal(key), value])
+    return fn(*args)
@@ -0,0 +1,34 @@
+from datetime import datetime
+from sqlalchemy import select, case
+from sqlalchemy.orm import Session
+
+from app.models.device_sync_state_model import DeviceSyncState
+from app.crud.crud_helper import upsert_insert
+
+
+def get_last_seq(db: Session, teacher_user_id: int, device_id: str) -> int:
+    """seq cuối đã áp dụng của thiết bị (0 nếu thiết bị chưa đồng bộ lần nào); khóa dòng tới khi commit."""
+    last_seq = db.execute(
+        select(DeviceSyncState.last_seq)
+        .where(DeviceSyncState.teacher_user_id == teacher_user_id, DeviceSyncState.device_id == device_id)
+        .with_for_update()
+    ).scalar()
+    return last_seq or 0
+
+
+def save_last_seq(db: Session, teacher_user_id: int, device_id: str, last_seq: int) -> None:
+    """Ghi seq đã áp dụng; không bao giờ lùi seq (hai lần đồng bộ đầu tiên chạy song song). Không commit."""
+    stmt = upsert_insert(db, DeviceSyncState).values(
+        teacher_user_id=teacher_user_id, device_id=device_id, last_seq=last_seq, updated_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DeviceSyncState.teacher_user_id, DeviceSyncState.device_id],
+        set_={
+            "last_seq": case(
+                (stmt.excluded.last_seq > DeviceSyncState.last_seq, stmt.excluded.last_seq),
+                else_=DeviceSyncState.last_seq,
+            ),
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt)
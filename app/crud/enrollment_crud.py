@@ -1,5 +1,5 @@
 # backend/app/crud/student_class_crud.py
-from typing import List, Optional
+from typing import List, Optional, Set, Tuple
 from fastapi import HTTPException
 from sqlalchemy import select, insert, delete
 from sqlalchemy.orm import Session
@@ -7,6 +7,8 @@ from app.schemas.enrollment_schema import EnrollmentCreate, EnrollmentView
 from app.models.enrollment_model import Enrollment, EnrollmentStatus
 from app.models.user_model import User
 from app.models.class_model import Class # Import Class model
+from app.crud import class_crud
+from app.services import response_cache_service
 
 def get_enrollment(db: Session, student_user_id: int, class_id: int) -> Optional[EnrollmentView]:
     """Lấy bản ghi enrollment dựa trên student_user_id và class_id và trả về dưới dạng EnrollmentView."""
@@ -102,6 +104,19 @@ def get_active_enrollments_by_class_id(
         for row in results
     ]
 
+def get_active_enrollment_pairs(db: Session, student_user_ids) -> Set[Tuple[int, int]]:
+    """Các cặp (student_user_id, class_id) đang học của các học sinh cho trước (1 query)."""
+    student_user_ids = set(student_user_ids)
+    if not student_user_ids:
+        return set()
+    return set(db.execute(
+        select(Enrollment.student_user_id, Enrollment.class_id).where(
+            Enrollment.student_user_id.in_(student_user_ids),
+            Enrollment.enrollment_status == EnrollmentStatus.active,
+        )
+    ).tuples())
+
+
 def get_all_enrollments(db: Session, skip: int = 0, limit: int = 100) -> List[EnrollmentView]:
     """Lấy danh sách tất cả các enrollments và trả về dưới dạng EnrollmentView."""
     stmt = (
@@ -153,6 +168,8 @@ def create_enrollment(db: Session, enrollment_in: EnrollmentCreate) -> Enrollmen
         enrollment_status=EnrollmentStatus.active
     )
     db.add(db_enrollment)
+    class_crud.bump_data_version(db, db_enrollment.class_id)
+    response_cache_service.invalidate_tags(db, response_cache_service.ENROLLMENTS)
     db.commit()
     db.refresh(db_enrollment)
     return db_enrollment
@@ -165,6 +182,7 @@ def set_enrollment_inactive(db: Session, student_user_id: int, class_id: int) ->
         return None
 
     db_enrollment.enrollment_status = EnrollmentStatus.inactive.value
+    response_cache_service.invalidate_tags(db, response_cache_service.ENROLLMENTS)
     db.commit()
     db.refresh(db_enrollment)
 
@@ -179,6 +197,8 @@ def update_enrollment(
     if db_enrollment:
         for key, value in enrollment_update.items():
             setattr(db_enrollment, key, value)
+        class_crud.bump_data_version(db, db_enrollment.class_id)
+        response_cache_service.invalidate_tags(db, response_cache_service.ENROLLMENTS)
         db.commit()
         db.refresh(db_enrollment)
     return db_enrollment
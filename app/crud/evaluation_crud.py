@@ -1,6 +1,17 @@
 from sqlalchemy.orm import Session
 from app.models.evaluation_model import Evaluation
 from app.schemas.evaluation_schema import EvaluationCreate, EvaluationUpdate
+from app.crud import class_crud, evaluation_rollup_crud
+
+
+def _points(db_evaluation: Evaluation):
+    """Khóa rollup + điểm của một evaluation."""
+    return (
+        db_evaluation.student_user_id,
+        db_evaluation.class_id,
+        db_evaluation.study_point,
+        db_evaluation.discipline_point,
+    )
 
 
 def create_evaluation(db: Session, evaluation: EvaluationCreate, teacher_user_id: int):
@@ -17,6 +28,8 @@ def create_evaluation(db: Session, evaluation: EvaluationCreate, teacher_user_id
         teacher_user_id=teacher_user_id
     )
     db.add(db_evaluation)
+    evaluation_rollup_crud.apply_evaluation_changes(db, added=[_points(db_evaluation)])
+    class_crud.bump_data_version(db, db_evaluation.class_id)
     db.commit()
     db.refresh(db_evaluation)
     return db_evaluation
@@ -31,8 +44,13 @@ def update_evaluation(db: Session, evaluation_id: int, evaluation_update: Evalua
     db_evaluation = get_evaluation(db, evaluation_id)
     if not db_evaluation:
         return None
+    old_points = _points(db_evaluation)
     for field, value in evaluation_update.dict(exclude_unset=True).items():
         setattr(db_evaluation, field, value)
+    evaluation_rollup_crud.apply_evaluation_changes(
+        db, added=[_points(db_evaluation)], removed=[old_points]
+    )
+    class_crud.bump_data_version(db, db_evaluation.class_id)
     db.commit()
     db.refresh(db_evaluation)
     return db_evaluation
@@ -42,6 +60,8 @@ def delete_evaluation(db: Session, evaluation_id: int):
     db_evaluation = get_evaluation(db, evaluation_id)
     if not db_evaluation:
         return {"message": "Evaluation not found."}
+    evaluation_rollup_crud.apply_evaluation_changes(db, removed=[_points(db_evaluation)])
+    class_crud.bump_data_version(db, db_evaluation.class_id)
     db.delete(db_evaluation)
     db.commit()
     return {"message": "Đã xóa thành công"}
@@ -0,0 +1,109 @@
+from collections import defaultdict
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import select, delete, insert, func, case
+from sqlalchemy.orm import Session
+
+from app.models.evaluation_model import Evaluation
+from app.models.evaluation_rollup_model import EvaluationRollup
+from app.crud.crud_helper import upsert_insert
+
+# (student_user_id, class_id, study_point, discipline_point)
+EvaluationPoints = Tuple[int, int, int, int]
+
+_COUNTER_COLUMNS = (
+    "evaluation_count",
+    "total_study_point",
+    "total_discipline_point",
+    "study_plus_count",
+    "study_minus_count",
+    "discipline_plus_count",
+    "discipline_minus_count",
+)
+
+
+def _contribution(study_point: int, discipline_point: int) -> dict:
+    """Phần đóng góp của một evaluation vào rollup."""
+    return {
+        "evaluation_count": 1,
+        "total_study_point": study_point,
+        "total_discipline_point": discipline_point,
+        "study_plus_count": 1 if study_point > 0 else 0,
+        "study_minus_count": 1 if study_point < 0 else 0,
+        "discipline_plus_count": 1 if discipline_point > 0 else 0,
+        "discipline_minus_count": 1 if discipline_point < 0 else 0,
+    }
+
+
+def apply_evaluation_changes(
+    db: Session,
+    added: Iterable[EvaluationPoints] = (),
+    removed: Iterable[EvaluationPoints] = (),
+) -> None:
+    """
+    Cộng/trừ phần đóng góp của các evaluation vào evaluation_rollups bằng một câu upsert.
+    Không commit: gọi trong cùng transaction với thao tác ghi evaluations.
+    Update một evaluation = removed(giá trị cũ) + added(giá trị mới).
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(_COUNTER_COLUMNS, 0))
+    for sign, items in ((1, added), (-1, removed)):
+        for student_user_id, class_id, study_point, discipline_point in items:
+            acc = deltas[(student_user_id, class_id)]
+            for key, value in _contribution(study_point, discipline_point).items():
+                acc[key] += sign * value
+
+    rows = [
+        {"student_user_id": student_user_id, "class_id": class_id, **values}
+        for (student_user_id, class_id), values in deltas.items()
+        if any(values.values())
+    ]
+    if not rows:
+        return
+
+    stmt = upsert_insert(db, EvaluationRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EvaluationRollup.student_user_id, EvaluationRollup.class_id],
+        set_={
+            **{col: getattr(EvaluationRollup, col) + getattr(stmt.excluded, col) for col in _COUNTER_COLUMNS},
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt, rows)
+
+
+def get_rollup(db: Session, student_user_id: int, class_id: int) -> Optional[EvaluationRollup]:
+    """Đọc rollup theo khóa chính (student_user_id, class_id)."""
+    return db.get(EvaluationRollup, (student_user_id, class_id))
+
+
+def rebuild_evaluation_rollups(db: Session, class_id: Optional[int] = None) -> int:
+    """
+    Dựng lại evaluation_rollups từ bảng evaluations (sửa sai lệch).
+    class_id=None: dựng lại toàn bộ. Trả về số dòng rollup được tạo.
+    """
+    delete_stmt = delete(EvaluationRollup)
+    source = select(
+        Evaluation.student_user_id,
+        Evaluation.class_id,
+        func.count(Evaluation.evaluation_id),
+        func.sum(Evaluation.study_point),
+        func.sum(Evaluation.discipline_point),
+        func.sum(case((Evaluation.study_point > 0, 1), else_=0)),
+        func.sum(case((Evaluation.study_point < 0, 1), else_=0)),
+        func.sum(case((Evaluation.discipline_point > 0, 1), else_=0)),
+        func.sum(case((Evaluation.discipline_point < 0, 1), else_=0)),
+        func.now(),
+    ).group_by(Evaluation.student_user_id, Evaluation.class_id)
+
+    if class_id is not None:
+        delete_stmt = delete_stmt.where(EvaluationRollup.class_id == class_id)
+        source = source.where(Evaluation.class_id == class_id)
+
+    db.execute(delete_stmt)
+    result = db.execute(
+        insert(EvaluationRollup).from_select(
+            ["student_user_id", "class_id", *_COUNTER_COLUMNS, "updated_at"],
+            source,
+        )
+    )
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,202 @@
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select, delete, insert, func, case, extract, distinct
+from sqlalchemy.orm import Session
+
+from app.models.tuition_model import Tuition, PaymentStatus
+from app.models.tuition_payment_model import TuitionPayment, PaymentEntryType
+from app.models.payroll_model import Payroll
+from app.models.class_model import Class
+from app.models.subject_model import Subject
+from app.models.user_model import User
+from app.models.finance_model import FinanceMonthly, PayrollMonthly
+from app.crud.crud_helper import upsert_insert
+
+# (year, month)
+Period = Tuple[int, int]
+
+_CENT = Decimal("0.01")
+
+
+def _month_range(year: int, month: int) -> Tuple[date, date]:
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def period_of(d: Optional[date]) -> Optional[Period]:
+    return (d.year, d.month) if d else None
+
+
+def _allocate_payroll(db: Session, year: int, month: int, payroll_totals: dict) -> List[dict]:
+    """Phân bổ lương từng giáo viên cho các môn theo tỷ lệ số lớp của môn đó."""
+    if not payroll_totals:
+        return []
+    class_counts = defaultdict(list)
+    for teacher_id, subject_id, count in db.execute(
+        select(Class.teacher_user_id, Class.subject_id, func.count(Class.class_id))
+        .where(Class.teacher_user_id.in_(payroll_totals))
+        .group_by(Class.teacher_user_id, Class.subject_id)
+        .order_by(Class.teacher_user_id, Class.subject_id)
+    ):
+        class_counts[teacher_id].append((subject_id, count))
+
+    rows = []
+    for teacher_id, total in payroll_totals.items():
+        subjects = class_counts.get(teacher_id)
+        if not subjects:
+            rows.append({"year": year, "month": month, "teacher_user_id": teacher_id,
+                         "subject_id": None, "amount": total})
+            continue
+        n_classes = sum(count for _, count in subjects)
+        remaining = total
+        for i, (subject_id, count) in enumerate(subjects):
+            # Môn cuối nhận phần dư để tổng phân bổ khớp đúng tổng lương
+            share = remaining if i == len(subjects) - 1 else (total * count / n_classes).quantize(_CENT, ROUND_HALF_UP)
+            remaining -= share
+            rows.append({"year": year, "month": month, "teacher_user_id": teacher_id,
+                         "subject_id": subject_id, "amount": share})
+    return rows
+
+
+def refresh_finance_month(db: Session, year: int, month: int) -> None:
+    """
+    Tính lại cube của một tháng (finance_monthly + payroll_monthly) từ dữ liệu gốc.
+    Chỉ quét dữ liệu trong khoảng ngày của tháng (range predicate, dùng được index).
+    Không commit: gọi trong cùng transaction với thao tác ghi liên quan.
+    """
+    start, end = _month_range(year, month)
+
+    billed, tuition_count, overdue = db.execute(
+        select(
+            func.coalesce(func.sum(Tuition.amount), 0),
+            func.count(Tuition.tuition_id),
+            func.coalesce(func.sum(case(
+                (Tuition.status == PaymentStatus.overdue, Tuition.amount - Tuition.paid_amount), else_=0
+            )), 0),
+        ).where(Tuition.due_date >= start, Tuition.due_date < end)
+    ).one()
+
+    collected = db.execute(
+        select(func.coalesce(func.sum(case(
+            (TuitionPayment.entry_type == PaymentEntryType.payment, TuitionPayment.amount),
+            else_=-TuitionPayment.amount,
+        )), 0)).where(TuitionPayment.paid_at >= start, TuitionPayment.paid_at < end)
+    ).scalar()
+
+    # Payroll.month là tháng lương, năm lấy theo sent_at
+    payroll_totals = {
+        teacher_id: Decimal(str(total or 0)).quantize(_CENT)
+        for teacher_id, total in db.execute(
+            select(Payroll.teacher_user_id, func.sum(Payroll.total))
+            .where(
+                Payroll.sent_at >= datetime(year, 1, 1),
+                Payroll.sent_at < datetime(year + 1, 1, 1),
+                Payroll.month == month,
+            )
+            .group_by(Payroll.teacher_user_id)
+        )
+    }
+
+    values = {
+        "tuition_billed": billed,
+        "tuition_count": tuition_count,
+        "tuition_overdue": overdue,
+        "tuition_collected": collected,
+        "payroll_total": sum(payroll_totals.values(), Decimal(0)),
+        "payroll_count": len(payroll_totals),
+    }
+    stmt = upsert_insert(db, FinanceMonthly).values(year=year, month=month, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FinanceMonthly.year, FinanceMonthly.month],
+        set_={**{col: getattr(stmt.excluded, col) for col in values}, "updated_at": func.now()},
+    )
+    db.execute(stmt)
+
+    db.execute(delete(PayrollMonthly).where(PayrollMonthly.year == year, PayrollMonthly.month == month))
+    rows = _allocate_payroll(db, year, month, payroll_totals)
+    if rows:
+        db.execute(insert(PayrollMonthly), rows)
+
+
+def refresh_finance_months(db: Session, periods: Iterable[Optional[Period]]) -> None:
+    """Tính lại cube cho các tháng bị ảnh hưởng (bỏ trùng, bỏ None). Không commit."""
+    for year, month in sorted({p for p in periods if p}):
+        refresh_finance_month(db, year, month)
+
+
+def _open_periods(db: Session) -> Set[Period]:
+    """Các tháng còn học phí chưa thanh toán (trạng thái overdue có thể thay đổi theo ngày)."""
+    return {
+        (int(y), int(m)) for y, m in db.execute(
+            select(distinct(extract("year", Tuition.due_date)), extract("month", Tuition.due_date))
+            .where(Tuition.status != PaymentStatus.paid)
+        )
+    }
+
+
+def refresh_open_finance_months(db: Session) -> int:
+    """Tác vụ hằng đêm: tính lại tháng hiện tại và các tháng còn công nợ, rồi commit."""
+    today = date.today()
+    periods = _open_periods(db) | {(today.year, today.month)}
+    refresh_finance_months(db, periods)
+    db.commit()
+    return len(periods)
+
+
+def rebuild_finance(db: Session) -> int:
+    """Dựng lại toàn bộ cube tài chính từ dữ liệu gốc. Trả về số tháng được tính."""
+    periods: Set[Period] = set()
+    for column in (Tuition.due_date, TuitionPayment.paid_at):
+        periods |= {
+            (int(y), int(m)) for y, m in db.execute(
+                select(extract("year", column), extract("month", column)).distinct()
+            )
+        }
+    periods |= {
+        (int(y), int(m)) for y, m in db.execute(
+            select(extract("year", Payroll.sent_at), Payroll.month).distinct()
+        )
+    }
+    db.execute(delete(FinanceMonthly))
+    db.execute(delete(PayrollMonthly))
+    refresh_finance_months(db, periods)
+    db.commit()
+    return len(periods)
+
+
+def get_finance_months(db: Session, year: int, month: Optional[int] = None) -> List[FinanceMonthly]:
+    stmt = select(FinanceMonthly).where(FinanceMonthly.year == year)
+    if month is not None:
+        stmt = stmt.where(FinanceMonthly.month == month)
+    return db.execute(stmt.order_by(FinanceMonthly.month)).scalars().all()
+
+
+def get_payroll_by_teacher(db: Session, year: int, month: Optional[int] = None):
+    """Tổng chi lương theo giáo viên trong kỳ, đọc từ payroll_monthly."""
+    stmt = (
+        select(PayrollMonthly.teacher_user_id, User.full_name, func.sum(PayrollMonthly.amount).label("amount"))
+        .join(User, User.user_id == PayrollMonthly.teacher_user_id)
+        .where(PayrollMonthly.year == year)
+        .group_by(PayrollMonthly.teacher_user_id, User.full_name)
+        .order_by(func.sum(PayrollMonthly.amount).desc())
+    )
+    if month is not None:
+        stmt = stmt.where(PayrollMonthly.month == month)
+    return db.execute(stmt).all()
+
+
+def get_payroll_by_subject(db: Session, year: int, month: Optional[int] = None):
+    """Tổng chi lương theo môn học trong kỳ, đọc từ payroll_monthly."""
+    stmt = (
+        select(PayrollMonthly.subject_id, Subject.name, func.sum(PayrollMonthly.amount).label("amount"))
+        .outerjoin(Subject, Subject.subject_id == PayrollMonthly.subject_id)
+        .where(PayrollMonthly.year == year)
+        .group_by(PayrollMonthly.subject_id, Subject.name)
+        .order_by(func.sum(PayrollMonthly.amount).desc())
+    )
+    if month is not None:
+        stmt = stmt.where(PayrollMonthly.month == month)
+    return db.execute(stmt).all()
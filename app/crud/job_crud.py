@@ -0,0 +1,71 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from app.models.job_model import Job, JobStatus
+
+
+def create_job(
+    db: Session,
+    job_type: str,
+    params: Optional[Dict[str, Any]] = None,
+    created_by: Optional[int] = None,
+    input_file: Optional[str] = None,
+    worker_id: Optional[str] = None,
+) -> Job:
+    db_job = Job(
+        job_type=job_type,
+        status=JobStatus.queued,
+        params=params,
+        created_by=created_by,
+        input_file=input_file,
+        worker_id=worker_id,
+        heartbeat_at=datetime.utcnow(),
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+
+def get_job(db: Session, job_id: str) -> Optional[Job]:
+    return db.get(Job, job_id)
+
+
+def update_job(db: Session, job_id: str, **values) -> None:
+    """Cập nhật trạng thái/tiến độ job bằng một câu UPDATE và commit ngay để client polling thấy."""
+    db.execute(update(Job).where(Job.job_id == job_id).values(**values))
+    db.commit()
+
+
+def touch_jobs(db: Session, worker_id: str) -> int:
+    """Gia hạn heartbeat cho các job queued/running do tiến trình `worker_id` giữ."""
+    result = db.execute(
+        update(Job)
+        .where(Job.worker_id == worker_id, Job.status.in_([JobStatus.queued, JobStatus.running]))
+        .values(heartbeat_at=datetime.utcnow())
+    )
+    db.commit()
+    return result.rowcount
+
+
+def fail_stale_jobs(db: Session, stale_before: datetime) -> int:
+    """
+    Đánh dấu failed các job còn queued/running mà heartbeat cuối cùng cũ hơn `stale_before`
+    (tiến trình giữ job đã tắt/crash). Job của các worker khác còn sống không bị động tới.
+    """
+    result = db.execute(
+        update(Job)
+        .where(
+            Job.status.in_([JobStatus.queued, JobStatus.running]),
+            func.coalesce(Job.heartbeat_at, Job.created_at) < stale_before,
+        )
+        .values(
+            status=JobStatus.failed,
+            error="Job bị gián đoạn do server khởi động lại",
+            finished_at=datetime.utcnow(),
+        )
+    )
+    db.commit()
+    return result.rowcount
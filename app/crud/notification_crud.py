@@ -1,6 +1,7 @@
-from typing import Optional
+from typing import Optional, List
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
-from app.models.notification_model import Notification, NotificationType
+from app.models.notification_model import Notification, NotificationType, NotificationRefType
 from app.schemas.notification_schema import NotificationCreate, NotificationUpdate
 from datetime import datetime, timezone
 
@@ -51,18 +52,35 @@ def delete_notification(db: Session, notification_id: int):
         db.commit()
     return db_notification
 
-def get_notification_by_content_and_receiver(
-    db: Session, 
-    content: str, 
-    receiver_id: int
-) -> Optional[Notification]:
+def get_notifications_by_ref(
+    db: Session,
+    ref_type: NotificationRefType,
+    ref_id: int,
+    receiver_ids: Optional[List[int]] = None,
+) -> List[Notification]:
     """
-    Tìm thông báo dựa trên nội dung và người nhận.
+    Tìm các thông báo tham chiếu tới một đối tượng nghiệp vụ (dùng index ix_notifications_ref).
     """
-    return db.query(Notification).filter(
-        Notification.content == content,
-        Notification.receiver_id == receiver_id
-    ).first()
+    query = db.query(Notification).filter(
+        Notification.ref_type == ref_type,
+        Notification.ref_id == ref_id,
+    )
+    if receiver_ids is not None:
+        query = query.filter(Notification.receiver_id.in_(receiver_ids))
+    return query.all()
+
+
+def delete_notifications_by_ref(db: Session, ref_type: NotificationRefType, ref_id: int) -> int:
+    """
+    Xóa các thông báo tham chiếu tới một đối tượng nghiệp vụ.
+    Không commit: hàm gọi chịu trách nhiệm commit cùng transaction.
+    """
+    result = db.execute(
+        delete(Notification)
+        .where(Notification.ref_type == ref_type, Notification.ref_id == ref_id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
 
 
 def update_is_read_status(db: Session, notification_id: int, is_read: bool):
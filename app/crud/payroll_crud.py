@@ -2,10 +2,16 @@ from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from app.models import Payroll
 from app.schemas.payroll_schema import PayrollCreate, PayrollUpdate
-from app.crud import notification_crud
+from app.crud import notification_crud, finance_crud
 from app.models.user_model import User
 from app.models.teacher_model import Teacher
 from app.models.tuition_model import PaymentStatus
+from app.models.notification_model import NotificationRefType
+
+
+def _payroll_period(db_payroll: Payroll):
+    """Kỳ (năm, tháng) của bảng lương: năm theo sent_at, tháng theo cột month."""
+    return (db_payroll.sent_at.year, db_payroll.month) if db_payroll.sent_at else None
 
 def create_payroll_record(db: Session, payroll_in: PayrollCreate):
     db_payroll = Payroll(
@@ -17,6 +23,8 @@ def create_payroll_record(db: Session, payroll_in: PayrollCreate):
         status=PaymentStatus.pending,
     )
     db.add(db_payroll)
+    db.flush()
+    finance_crud.refresh_finance_months(db, [_payroll_period(db_payroll)])
     db.commit()
     db.refresh(db_payroll)  # total được DB tính sẵn
     return db_payroll
@@ -74,11 +82,14 @@ def update_payroll(db: Session, payroll_id: int, payroll_update: PayrollUpdate):
         )
 
     update_data = payroll_update.model_dump(exclude_unset=True)
-    
+    old_period = _payroll_period(db_payroll)
+
     for key, value in update_data.items():
         setattr(db_payroll, key, value)
 
     db.add(db_payroll)
+    db.flush()
+    finance_crud.refresh_finance_months(db, [old_period, _payroll_period(db_payroll)])
     db.commit()
     db.refresh(db_payroll) 
     
@@ -88,27 +99,16 @@ def delete_payroll(db: Session, payroll_id: int):
     db_payroll = db.query(Payroll).filter(Payroll.payroll_id == payroll_id).first()
     
     if db_payroll:
-        # Tạo lại nội dung thông báo để tìm kiếm
-        notification_content = (
-            f"Lương tháng {db_payroll.month}/{db_payroll.sent_at.year} của bạn đã được tính. "
-            f"Tổng lương: {db_payroll.total:.2f}. "
-            f"Thời gian: {db_payroll.sent_at.isoformat()}"
-        )
-        
-        # Tìm notification
-        # Giả sử notification_crud có một hàm để tìm kiếm theo nội dung và người nhận
-        db_notification = notification_crud.get_notification_by_content_and_receiver(
-            db, 
-            content=notification_content, 
-            receiver_id=db_payroll.teacher_user_id
+        # Xóa các thông báo tham chiếu tới payroll này (lookup theo index ref_type/ref_id)
+        notification_crud.delete_notifications_by_ref(
+            db, NotificationRefType.payroll, db_payroll.payroll_id
         )
-        
-        # Nếu tìm thấy, xóa notification
-        if db_notification:
-            db.delete(db_notification)
-            
+
         # Xóa bản ghi payroll
+        period = _payroll_period(db_payroll)
         db.delete(db_payroll)
+        db.flush()
+        finance_crud.refresh_finance_months(db, [period])
         db.commit()
 
     return db_payroll
\ No newline at end of file
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, select, join
+from sqlalchemy.sql import ColumnElement
 from typing import Optional, List
 from datetime import date as dt_date, time
 from app.schemas import schedule_schema
@@ -7,7 +8,8 @@ from app.models.schedule_model import Schedule, DayOfWeekEnum, ScheduleTypeEnum
 from app.models.class_model import Class
 from app.schemas.schedule_schema import ScheduleCreate, ScheduleUpdate, ScheduleView
 from app.models.enrollment_model import Enrollment
-from app.services import schedule_service
+from app.services import schedule_service, stats_service, fast_json_service
+from app.services.session_index_service import invalidate_session_index
 from app.services.service_helper import to_naive_time
 from app.models.subject_model import Subject
 
@@ -89,6 +91,8 @@ def create_schedule(db: Session, schedule_in: ScheduleCreate, current_user):
     db.add(db_schedule)
     db.commit()
     db.refresh(db_schedule)
+    stats_service.invalidate_stats()
+    invalidate_session_index()
     return db_schedule
 
 def update_schedule(db: Session, schedule: Schedule, schedule_in: ScheduleUpdate) -> Schedule:
@@ -126,6 +130,8 @@ def update_schedule(db: Session, schedule: Schedule, schedule_in: ScheduleUpdate
 
     db.commit()
     db.refresh(schedule)
+    stats_service.invalidate_stats()
+    invalidate_session_index()
     return schedule
 
 
@@ -135,6 +141,8 @@ def delete_schedule(db: Session, schedule: Schedule):
     """
     db.delete(schedule)
     db.commit()
+    stats_service.invalidate_stats()
+    invalidate_session_index()
 
 def search_schedules(
     db: Session,
@@ -145,14 +153,19 @@ def search_schedules(
     day_of_week: Optional[DayOfWeekEnum] = None,
     schedule_type: Optional[ScheduleTypeEnum] = None,
     date: Optional[dt_date] = None,
-    room: Optional[str] = None
+    room: Optional[str] = None,
+    scope: Optional[ColumnElement] = None
 ) -> List[ScheduleView]:
     """
     Tìm kiếm và lọc các lịch trình dựa trên nhiều tiêu chí, trả về ScheduleView object.
     Hàm này đã được bổ sung tham số skip và limit để hỗ trợ phân trang.
+    `scope`: predicate phân quyền (policy_service.schedule_scope), None = không giới hạn.
     """
     query = get_schedule_with_class_name_query()
 
+    if scope is not None:
+        query = query.where(scope)
+
     if class_id is not None:
         query = query.where(Schedule.class_id == class_id)
     if class_ids:
@@ -167,7 +180,7 @@ def search_schedules(
         query = query.where(Schedule.room == room)
 
     results = db.execute(query.offset(skip).limit(limit)).all()
-    return [ScheduleView.model_validate(row._asdict()) for row in results]
+    return fast_json_service.rows_to_models(ScheduleView, results)
     
     
 def get_classes_for_teacher(db: Session, teacher_user_id: int) -> List[Class]:
@@ -193,7 +206,7 @@ def get_schedules_by_class_ids(db: Session, class_ids: List[int]) -> List[Schedu
     """
     query = get_schedule_with_class_name_query().where(Schedule.class_id.in_(class_ids))
     results = db.execute(query).all()
-    return [ScheduleView.model_validate(row._asdict()) for row in results]
+    return fast_json_service.rows_to_models(ScheduleView, results)
 
 def get_classes_by_teacher_user_id(db: Session, teacher_user_id: int) -> List[Class]:
     """
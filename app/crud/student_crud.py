@@ -1,6 +1,6 @@
-from typing import Optional, List, Tuple
+from typing import Dict, Optional, List, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func, select, delete
+from sqlalchemy import func, select, delete, case, and_
 from app.models.student_model import Student
 from app.schemas.student_schema import StudentUpdate, StudentCreate, StudentView
 from app.models.parent_model import Parent
@@ -9,13 +9,14 @@ from app.models.role_model import Role
 from app.models.association_tables import user_roles
 from app.models.test_model import Test
 from app.schemas.stats_schema import StudentStats
-from app.services.evaluation_service import summarize_end_of_semester
+from app.models.evaluation_rollup_model import EvaluationRollup
 from app.models.enrollment_model import Enrollment
 from app.schemas.class_schema import ClassView
 from app.models.class_model import Class
 from app.models.subject_model import Subject
 from app.schemas.teacher_schema import TeacherView
 from app.crud import teacher_crud
+from app.services import stats_service
 
 def get_student(db: Session, student_user_id: int) -> Optional[StudentView]:
     """
@@ -69,6 +70,25 @@ def get_parent_by_user_id(db: Session, user_id: int) -> Optional[Tuple[Parent, U
     ).first()
 
 
+def is_child_of_parent(db: Session, student_user_id: int, parent_user_id: int) -> bool:
+    """Kiểm tra học sinh có phải con của phụ huynh này không (chỉ select khóa chính)."""
+    return db.execute(
+        select(Student.user_id).where(
+            Student.user_id == student_user_id, Student.parent_id == parent_user_id
+        )
+    ).first() is not None
+
+
+def is_taught_by_teacher(db: Session, student_user_id: int, teacher_user_id: int) -> bool:
+    """Kiểm tra học sinh có học (đã đăng ký) lớp nào của giáo viên này không."""
+    return db.execute(
+        select(Enrollment.student_user_id)
+        .join(Class, Class.class_id == Enrollment.class_id)
+        .where(Enrollment.student_user_id == student_user_id, Class.teacher_user_id == teacher_user_id)
+        .limit(1)
+    ).first() is not None
+
+
 def get_student_by_user_id(db: Session, user_id: int) -> Optional[Student]:
     return db.execute(
         select(Student).where(Student.user_id == user_id)
@@ -151,6 +171,7 @@ def create_student(db: Session, student_in: StudentCreate) -> Student:
     db.add(db_student)
     db.commit()
     db.refresh(db_student)
+    stats_service.invalidate_stats()
     return db_student
 
 
@@ -184,65 +205,90 @@ def delete_student(db: Session, user_id: int):
 
     db.delete(db_student)
     db.commit()
+    stats_service.invalidate_stats()
     return db_student
 
 
-def calculate_gpa(db: Session, student_user_id: int) -> Optional[float]:
+def get_students_stats(
+    db: Session, student_user_ids: List[int], teacher_user_id: Optional[int] = None
+) -> Dict[int, StudentStats]:
     """
-    Tính điểm trung bình học tập (GPA) từ tất cả các bản ghi Test của học sinh.
-    GIẢ ĐỊNH: Model Test có trường 'score' (float) và liên kết với student_user_id.
+    Thống kê của nhiều học sinh trong một câu lệnh (GROUP BY học sinh), trả về {student_user_id: StudentStats}.
+    - gpa: trung bình tất cả bài kiểm tra.
+    - classes_enrolled: số lớp đang học (active).
+    - study_point / discipline_point: điểm mỗi lớp = min(100 + tổng delta, 100) như evaluation summary
+      của lớp (đọc từ evaluation_rollups), lấy trung bình trên các lớp đang học; None nếu không học lớp nào.
+    teacher_user_id: chỉ trả về học sinh đang học ít nhất một lớp của giáo viên này.
+    Id không phải học sinh (hoặc ngoài phạm vi giáo viên) không có trong kết quả.
     """
-    # Lấy điểm trung bình của tất cả các bài kiểm tra (Test)
-    avg_score = db.execute(
-        select(func.avg(Test.score))
-        .where(Test.student_user_id == student_user_id)
-    ).scalar_one_or_none()
-    
-    return avg_score
+    if not student_user_ids:
+        return {}
+
+    def capped(total):
+        point = 100 + func.coalesce(total, 0)
+        return case((point > 100, 100), else_=point)
+
+    gpa = (
+        select(Test.student_user_id, func.avg(Test.score).label("gpa"))
+        .where(Test.student_user_id.in_(student_user_ids))
+        .group_by(Test.student_user_id)
+        .subquery("gpa")
+    )
+    classes = (
+        select(
+            Enrollment.student_user_id,
+            func.count(Enrollment.class_id).label("classes_enrolled"),
+            func.avg(capped(EvaluationRollup.total_study_point)).label("study_point"),
+            func.avg(capped(EvaluationRollup.total_discipline_point)).label("discipline_point"),
+        )
+        .outerjoin(EvaluationRollup, and_(
+            EvaluationRollup.student_user_id == Enrollment.student_user_id,
+            EvaluationRollup.class_id == Enrollment.class_id,
+        ))
+        .where(
+            Enrollment.student_user_id.in_(student_user_ids),
+            Enrollment.enrollment_status == "active",
+        )
+        .group_by(Enrollment.student_user_id)
+        .subquery("classes")
+    )
+    stmt = (
+        select(
+            Student.user_id,
+            gpa.c.gpa,
+            classes.c.classes_enrolled,
+            classes.c.study_point,
+            classes.c.discipline_point,
+        )
+        .outerjoin(gpa, gpa.c.student_user_id == Student.user_id)
+        .outerjoin(classes, classes.c.student_user_id == Student.user_id)
+        .where(Student.user_id.in_(student_user_ids))
+    )
+    if teacher_user_id is not None:
+        stmt = stmt.where(
+            select(Enrollment.student_user_id)
+            .join(Class, Class.class_id == Enrollment.class_id)
+            .where(Enrollment.student_user_id == Student.user_id, Class.teacher_user_id == teacher_user_id)
+            .exists()
+        )
 
+    return {
+        row.user_id: StudentStats(
+            classes_enrolled=row.classes_enrolled or 0,
+            # Làm tròn GPA để dễ hiển thị
+            gpa=round(float(row.gpa), 2) if row.gpa is not None else None,
+            study_point=round(float(row.study_point)) if row.study_point is not None else None,
+            discipline_point=round(float(row.discipline_point)) if row.discipline_point is not None else None,
+        )
+        for row in db.execute(stmt)
+    }
 
-def get_classes_enrolled_count(db: Session, student_user_id: int) -> int:
-    student = get_student(db, student_user_id)
-    if not student:
-        return 0
-    
-    enrollment_count = db.execute(
-        select(func.count(Enrollment.class_id))
-        .where(Enrollment.student_user_id == student_user_id)
-        .where(Enrollment.enrollment_status == "active")
-    ).scalar_one_or_none()
-    
-    return enrollment_count if enrollment_count is not None else 0
 
-# Bỏ async vì không còn gọi API bất đồng bộ
-def get_student_stats(db: Session, student_user_id: int) -> StudentStats:
+def get_student_stats(db: Session, student_user_id: int) -> Optional[StudentStats]:
     """
-    Tổng hợp các chỉ số thống kê của học sinh.
+    Tổng hợp các chỉ số thống kê của học sinh (1 query). None nếu không phải học sinh.
     """
-    # 1. Tính GPA
-    gpa_result = calculate_gpa(db, student_user_id)
-
-    # 2. Đếm số lớp đã đăng ký
-    classes_count = get_classes_enrolled_count(db, student_user_id)
-
-    # 3. Lấy điểm học tập và kỷ luật bằng cách gọi hàm trực tiếp
-    evaluation_summary = summarize_end_of_semester(db, student_user_id)
-    
-    study_point = None
-    discipline_point = None
-    
-    if evaluation_summary:
-        # Lấy giá trị số nguyên từ kết quả trả về
-        study_point = 100 + evaluation_summary.get("final_study_point")
-        discipline_point = 100 + evaluation_summary.get("final_discipline_point")
-
-    return StudentStats(
-        classes_enrolled=classes_count,
-        # Làm tròn GPA để dễ hiển thị
-        gpa=round(gpa_result, 2) if gpa_result is not None else None,
-        study_point=study_point,
-        discipline_point=discipline_point,
-    )
+    return get_students_stats(db, [student_user_id]).get(student_user_id)
 
 def get_student_active_classes(db: Session, student_user_id: int) -> List[ClassView]:
     """
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from app.models.subject_model import Subject
 from app.schemas.subject_schema import SubjectCreate, SubjectUpdate
+from app.services import response_cache_service
 
 def get_subject(db: Session, subject_id: int):
     """Lấy thông tin môn học theo ID."""
@@ -22,6 +23,7 @@ def create_subject(db: Session, subject: SubjectCreate):
     """Tạo mới một môn học."""
     db_subject = Subject(**subject.model_dump())
     db.add(db_subject)
+    response_cache_service.invalidate_tags(db, response_cache_service.SUBJECTS)
     db.commit()
     db.refresh(db_subject)
     return db_subject
@@ -31,6 +33,7 @@ def update_subject(db: Session, db_obj: Subject, obj_in: SubjectUpdate):
     for key, value in update_data.items():
         setattr(db_obj, key, value)
     db.add(db_obj)
+    response_cache_service.invalidate_tags(db, response_cache_service.SUBJECTS)
     db.commit()
     db.refresh(db_obj)
     return db_obj
@@ -38,6 +41,7 @@ def update_subject(db: Session, db_obj: Subject, obj_in: SubjectUpdate):
 
 def delete_subject(db: Session, db_obj: Subject):
     db.delete(db_obj)
+    response_cache_service.invalidate_tags(db, response_cache_service.SUBJECTS)
     db.commit()
     return db_obj
 
@@ -1,19 +1,22 @@
 # app/crud/teacher_crud.py
 from typing import Dict, Optional, List
 from sqlalchemy.orm import Session
-from sqlalchemy import func, select
+from sqlalchemy import func, select, distinct
 from app.models.role_model import Role 
 from app.models.teacher_model import Teacher
-from app.schemas.teacher_schema import TeacherUpdate, TeacherCreate, ClassTaught, TeacherStats
+from app.schemas.teacher_schema import TeacherUpdate, TeacherCreate, ClassTaught, TeacherStats, TeacherMetrics
 from app.models.association_tables import user_roles
 from app.models.class_model import Class
 from app.models.enrollment_model import Enrollment
 from app.models.user_model import User
 from app.models.subject_model import Subject
-from app.models.teacher_review_model import TeacherReview
+from app.models.teacher_rating_stats_model import TeacherRatingStats
 from app.models.schedule_model import Schedule
+from app.models.test_model import Test
+from app.models.evaluation_rollup_model import EvaluationRollup
 from app.schemas.class_schema import Student
 from app.crud.class_crud import get_students_list
+from app.services import stats_service
 def get_teacher(db: Session, teacher_user_id: int) -> Optional[Teacher]:
     """
     Lấy thông tin giáo viên theo teacher_id.
@@ -89,6 +92,7 @@ def create_teacher(db: Session, teacher_in: TeacherCreate) -> Teacher:
     db.add(db_teacher)
     db.commit()
     db.refresh(db_teacher)
+    stats_service.invalidate_stats()
     return db_teacher
 
 
@@ -128,6 +132,7 @@ def delete_teacher(db: Session, user_id: int):
 
     db.delete(db_teacher)
     db.commit()
+    stats_service.invalidate_stats()
     return db_teacher
 
 
@@ -168,33 +173,98 @@ def get_class_taught(db: Session, teacher_user_id: int) -> List[ClassTaught]:
         
     return classes_taught_list
 
-def get_teacher_stats(db: Session, teacher_user_id: int) -> Optional[TeacherStats]:
+def get_teachers_metrics(db: Session, teacher_user_ids: List[int]) -> Dict[int, TeacherMetrics]:
     """
-    Lấy các số liệu thống kê cho giáo viên bao gồm: số lớp đã dạy, số lịch trình, số đánh giá và điểm trung bình.
+    Số liệu của nhiều giáo viên trong một câu lệnh: mỗi chỉ số là một subquery GROUP BY teacher_user_id
+    (lớp, buổi học, học sinh, điểm đánh giá, GPA), LEFT JOIN vào bảng teachers;
+    đánh giá của học sinh đọc từ bảng tổng hợp teacher_rating_stats.
+    Điểm đánh giá = 100 + delta trung bình trên mỗi evaluation (như tổng quan giáo viên).
+    Id không phải giáo viên không có trong kết quả.
     """
-    # 1. Số lớp đã dạy
-    class_taught_count = db.query(Class).filter(Class.teacher_user_id == teacher_user_id).count()
+    if not teacher_user_ids:
+        return {}
+    in_ids = Class.teacher_user_id.in_(teacher_user_ids)
 
-    # 2. Số lịch trình (đã được sửa để join với bảng schedules)
-    schedules_count = (
-        db.query(func.count(Schedule.schedule_id))
-        .join(Class)
-        .filter(Class.teacher_user_id == teacher_user_id)
-        .scalar()
-    ) or 0
+    classes = (
+        select(Class.teacher_user_id, func.count(Class.class_id).label("class_taught"))
+        .where(in_ids).group_by(Class.teacher_user_id).subquery("classes")
+    )
+    schedules = (
+        select(Class.teacher_user_id, func.count(Schedule.schedule_id).label("schedules"))
+        .join(Schedule, Schedule.class_id == Class.class_id)
+        .where(in_ids).group_by(Class.teacher_user_id).subquery("schedules")
+    )
+    students = (
+        select(Class.teacher_user_id, func.count(distinct(Enrollment.student_user_id)).label("total_students"))
+        .join(Enrollment, Enrollment.class_id == Class.class_id)
+        .where(in_ids).group_by(Class.teacher_user_id).subquery("students")
+    )
+    evaluations = (
+        select(
+            Class.teacher_user_id,
+            func.sum(EvaluationRollup.total_study_point).label("study_total"),
+            func.sum(EvaluationRollup.total_discipline_point).label("discipline_total"),
+            func.sum(EvaluationRollup.evaluation_count).label("evaluation_count"),
+        )
+        .join(EvaluationRollup, EvaluationRollup.class_id == Class.class_id)
+        .where(in_ids).group_by(Class.teacher_user_id).subquery("evaluations")
+    )
+    gpa = (
+        select(Test.teacher_user_id, func.avg(Test.score).label("avg_gpa"))
+        .where(Test.teacher_user_id.in_(teacher_user_ids)).group_by(Test.teacher_user_id).subquery("gpa")
+    )
+    stmt = (
+        select(
+            Teacher.user_id,
+            classes.c.class_taught, schedules.c.schedules, students.c.total_students,
+            evaluations.c.study_total, evaluations.c.discipline_total, evaluations.c.evaluation_count,
+            gpa.c.avg_gpa, TeacherRatingStats.review_count, TeacherRatingStats.rating_sum,
+        )
+        .outerjoin(classes, classes.c.teacher_user_id == Teacher.user_id)
+        .outerjoin(schedules, schedules.c.teacher_user_id == Teacher.user_id)
+        .outerjoin(students, students.c.teacher_user_id == Teacher.user_id)
+        .outerjoin(evaluations, evaluations.c.teacher_user_id == Teacher.user_id)
+        .outerjoin(gpa, gpa.c.teacher_user_id == Teacher.user_id)
+        .outerjoin(TeacherRatingStats, TeacherRatingStats.teacher_user_id == Teacher.user_id)
+        .where(Teacher.user_id.in_(teacher_user_ids))
+    )
+
+    metrics = {}
+    for row in db.execute(stmt):
+        eval_count = row.evaluation_count or 0
+        metrics[row.user_id] = TeacherMetrics(
+            teacher_user_id=row.user_id,
+            class_taught=row.class_taught or 0,
+            schedules=row.schedules or 0,
+            total_students=row.total_students or 0,
+            avg_gpa=round(float(row.avg_gpa or 0), 2),
+            avg_study_point=round(100 + (float(row.study_total) / eval_count if eval_count else 0), 2),
+            avg_discipline_point=round(100 + (float(row.discipline_total) / eval_count if eval_count else 0), 2),
+            reviews=row.review_count or 0,
+            rate=round(float(row.rating_sum) / row.review_count, 2) if row.review_count else 0.0,
+        )
+    return metrics
 
-    # 3. Số đánh giá
-    reviews_count = db.query(func.count(TeacherReview.review_id)).filter(TeacherReview.teacher_user_id == teacher_user_id).scalar() or 0
 
-    # 4. Điểm trung bình
-    average_rate = db.query(func.avg(TeacherReview.rating)).filter(TeacherReview.teacher_user_id == teacher_user_id).scalar()
-    rate_value = round(average_rate, 2) if average_rate is not None else 0.0
+def get_teacher_page_ids(db: Session, skip: int = 0, limit: int = 100) -> List[int]:
+    """Id giáo viên của một trang danh sách (theo user_id)."""
+    return list(db.execute(
+        select(Teacher.user_id).order_by(Teacher.user_id).offset(skip).limit(limit)
+    ).scalars())
 
+
+def get_teacher_stats(db: Session, teacher_user_id: int) -> Optional[TeacherStats]:
+    """
+    Lấy các số liệu thống kê cho giáo viên bao gồm: số lớp đã dạy, số lịch trình, số đánh giá và điểm trung bình.
+    """
+    metrics = get_teachers_metrics(db, [teacher_user_id]).get(teacher_user_id)
+    if metrics is None:
+        return None
     return TeacherStats(
-        class_taught=class_taught_count,
-        schedules=schedules_count,
-        reviews=reviews_count,
-        rate=rate_value
+        class_taught=metrics.class_taught,
+        schedules=metrics.schedules,
+        reviews=metrics.reviews,
+        rate=metrics.rate
     )
 
 def get_teacher_students(db: Session, teacher_user_id: int) -> List[Student]:
@@ -0,0 +1,92 @@
+import math
+from collections import defaultdict
+from decimal import Decimal
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import select, delete, insert, func, case, cast, Integer
+from sqlalchemy.orm import Session
+
+from app.models.teacher_review_model import TeacherReview
+from app.models.teacher_rating_stats_model import TeacherRatingStats
+from app.models.user_model import User
+from app.crud.crud_helper import upsert_insert
+
+# (teacher_user_id, rating)
+Rating = Tuple[int, float]
+
+_STAR_COLUMNS = tuple(f"star_{star}" for star in range(1, 6))
+_COUNTER_COLUMNS = ("review_count", "rating_sum", *_STAR_COLUMNS)
+
+
+def _contribution(rating) -> dict:
+    """Phần đóng góp của một review: đếm, cộng điểm và tăng cột sao theo floor(rating)."""
+    star = math.floor(rating)
+    values = {"review_count": 1, "rating_sum": Decimal(str(rating))}
+    if 1 <= star <= 5:
+        values[f"star_{star}"] = 1
+    return values
+
+
+def apply_rating_changes(db: Session, added: Iterable[Rating] = (), removed: Iterable[Rating] = ()) -> None:
+    """
+    Cộng/trừ phần đóng góp của các review vào teacher_rating_stats bằng một câu upsert.
+    Không commit: gọi trong cùng transaction với thao tác ghi teacher_reviews.
+    Sửa một review = removed(giá trị cũ) + added(giá trị mới).
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(_COUNTER_COLUMNS, 0))
+    for sign, items in ((1, added), (-1, removed)):
+        for teacher_user_id, rating in items:
+            acc = deltas[teacher_user_id]
+            for key, value in _contribution(rating).items():
+                acc[key] += sign * value
+
+    rows = [
+        {"teacher_user_id": teacher_user_id, **values}
+        for teacher_user_id, values in deltas.items()
+        if any(values.values())
+    ]
+    if not rows:
+        return
+
+    stmt = upsert_insert(db, TeacherRatingStats)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TeacherRatingStats.teacher_user_id],
+        set_={
+            **{col: getattr(TeacherRatingStats, col) + getattr(stmt.excluded, col) for col in _COUNTER_COLUMNS},
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt, rows)
+
+
+def get_rating_stats(db: Session, teacher_user_id: int) -> Optional[TeacherRatingStats]:
+    return db.get(TeacherRatingStats, teacher_user_id)
+
+
+def get_top_teachers(db: Session, limit: int = 10, min_reviews: int = 1) -> List[Tuple[TeacherRatingStats, str]]:
+    """Giáo viên được đánh giá cao nhất (điểm trung bình, rồi số lượt đánh giá), kèm tên."""
+    average = TeacherRatingStats.rating_sum / TeacherRatingStats.review_count
+    return db.execute(
+        select(TeacherRatingStats, User.full_name)
+        .join(User, User.user_id == TeacherRatingStats.teacher_user_id)
+        .where(TeacherRatingStats.review_count >= max(min_reviews, 1))
+        .order_by(average.desc(), TeacherRatingStats.review_count.desc(), TeacherRatingStats.teacher_user_id)
+        .limit(limit)
+    ).all()
+
+
+def rebuild_teacher_rating_stats(db: Session) -> int:
+    """Dựng lại teacher_rating_stats từ bảng teacher_reviews. Trả về số dòng được tạo."""
+    star = cast(func.floor(TeacherReview.rating), Integer)
+    db.execute(delete(TeacherRatingStats))
+    result = db.execute(insert(TeacherRatingStats).from_select(
+        ["teacher_user_id", *_COUNTER_COLUMNS, "updated_at"],
+        select(
+            TeacherReview.teacher_user_id,
+            func.count(TeacherReview.review_id),
+            func.sum(TeacherReview.rating),
+            *[func.sum(case((star == i, 1), else_=0)) for i in range(1, 6)],
+            func.now(),
+        ).group_by(TeacherReview.teacher_user_id),
+    ))
+    db.commit()
+    return result.rowcount
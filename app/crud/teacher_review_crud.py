@@ -8,6 +8,7 @@ import logging
 from typing import List
 from app.models.user_model import User
 from sqlalchemy import select, join
+from app.crud import teacher_rating_crud
 
 logger = logging.getLogger(__name__)
 
@@ -111,6 +112,9 @@ def create_teacher_review(
     )
     
     db.add(db_teacher_review)
+    teacher_rating_crud.apply_rating_changes(
+        db, added=[(teacher_review.teacher_user_id, teacher_review.rating)]
+    )
     db.commit()
     db.refresh(db_teacher_review)
     return db_teacher_review
@@ -125,14 +129,20 @@ def get_teacher_review_model(db: Session, review_id: int) -> TeacherReview | Non
 def update_teacher_review(db: Session, db_obj: TeacherReview, obj_in: TeacherReviewUpdate):
     """Cập nhật thông tin review dựa trên db_obj."""
     update_data = obj_in.model_dump(exclude_unset=True)
+    old = (db_obj.teacher_user_id, db_obj.rating)
     for key, value in update_data.items():
         setattr(db_obj, key, value)
+    # Thay phần đóng góp cũ bằng giá trị mới trong bảng tổng hợp
+    new = (db_obj.teacher_user_id, db_obj.rating)
+    if new != old:
+        teacher_rating_crud.apply_rating_changes(db, added=[new], removed=[old])
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
     return db_obj
 
 def delete_teacher_review(db: Session, db_obj: TeacherReview):
+    teacher_rating_crud.apply_rating_changes(db, removed=[(db_obj.teacher_user_id, db_obj.rating)])
     db.delete(db_obj)
     db.commit()
     return db_obj
\ No newline at end of file
@@ -1,6 +1,6 @@
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, select
+from sqlalchemy import select
 from typing import List
 
 # ✅ Dùng SQLAlchemy model cho thao tác DB
@@ -14,6 +14,8 @@ from app.schemas.test_schema import TestBase, TestCreate, TestUpdate
 from app.schemas.auth_schema import AuthenticatedUser
 
 from app.services.test_service import validate_student_enrollment
+from app.services import policy_service, fast_json_service
+from app.crud import class_crud
 
 
 def create_test(db: Session, test_in: TestCreate, current_user: AuthenticatedUser):
@@ -52,6 +54,7 @@ def create_test(db: Session, test_in: TestCreate, current_user: AuthenticatedUse
         test_type=test_in.test_type
     )
     db.add(db_test)
+    class_crud.bump_data_version(db, db_class.class_id)
     db.commit()
     db.refresh(db_test)
     return db_test
@@ -93,6 +96,7 @@ def update_test(db: Session, test_id: int, test_update: TestUpdate, current_user
         setattr(db_test, key, value)
 
     # 5. Commit và trả về
+    class_crud.bump_data_version(db, db_test.class_id)
     db.commit()
     db.refresh(db_test)
     return db_test
@@ -133,6 +137,7 @@ def delete_test(db: Session, test_id: int, current_user: AuthenticatedUser):
                 detail="Bạn không có quyền xóa bài kiểm tra này."
             )
 
+    class_crud.bump_data_version(db, db_test.class_id)
     db.delete(db_test)
     db.commit()
     return db_test
@@ -150,7 +155,7 @@ def get_tests_by_teacher_user_id(db: Session, teacher_user_id: int, skip: int =
     return db.execute(stmt).scalars().all()
 
 
-from sqlalchemy import select, or_
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 # Giả định các import cần thiết khác như Test, Class, Student, User, AuthenticatedUser
 # VÀ TestBase (Pydantic model)
@@ -176,35 +181,16 @@ def get_all_tests(db: Session, current_user: AuthenticatedUser, skip: int = 0, l
         .outerjoin(User, Test.student_user_id == User.user_id)
     )
 
-    # BƯỚC 2: Xử lý filter theo vai trò
-    
-    filters = []
-
-
-    if "teacher" in current_user.roles:
-        filters.append(Test.teacher_user_id == current_user.user_id)
-
-    if "student" in current_user.roles:
-        filters.append(Test.student_user_id == current_user.user_id)
-
-    if "parent" in current_user.roles and "manager" not in current_user.roles:
-        child_students = db.execute(
-            select(Student.user_id).where(Student.parent_id == current_user.user_id)
-        ).scalars().all()
-        if child_students:
-            filters.append(Test.student_user_id.in_(child_students))
-        else:
-            filters.append(Test.test_id == -1)
-
-    # Chỉ áp dụng filter nếu filters không rỗng
-    if filters:
-        stmt = stmt.where(or_(*filters))
-    # Manager: filters rỗng => lấy tất cả test
+    # BƯỚC 2: Phạm vi theo vai trò (policy_service): giáo viên theo lớp mình dạy,
+    # học sinh/phụ huynh theo học sinh, manager thấy tất cả
+    stmt = stmt.where(policy_service.row_scope(
+        current_user, class_column=Test.class_id, student_column=Test.student_user_id
+    ))
 
     # BƯỚC 3: Phân trang
     stmt = stmt.offset(skip).limit(limit)
 
     results = db.execute(stmt).all()
 
-    # BƯỚC 4: Map tuple -> Pydantic
-    return [TestBase.model_validate(row._asdict()) for row in results]
+    # BƯỚC 4: Map tuple -> Pydantic (validate cả trang một lần)
+    return fast_json_service.rows_to_models(TestBase, results)
@@ -1,11 +1,16 @@
 # Trong file app/crud/tuition_crud.py
+from datetime import date
 from fastapi import HTTPException, status
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
+from decimal import Decimal
 from typing import Optional, Tuple, List
 from app.models.tuition_model import Tuition, PaymentStatus
+from app.models.tuition_payment_model import TuitionPayment, PaymentEntryType
 from app.schemas.tuition_schema import TuitionCreate, TuitionUpdate
 from app.models.user_model import User
 from app.models.student_model import Student
+from app.crud import balance_crud, finance_crud
 
 
 def get_tuition(db: Session, tuition_id: int) -> Optional[Tuple[Tuition, str]]:
@@ -54,11 +59,22 @@ def create_tuition(db: Session, tuition: TuitionCreate):
         status=PaymentStatus.pending
     )
     db.add(db_tuition)
+    balance_crud.apply_balance_changes(db, [(tuition.student_user_id, tuition.amount, 0)])
+    db.flush()
+    finance_crud.refresh_finance_months(db, [finance_crud.period_of(tuition.due_date)])
     db.commit()
     db.refresh(db_tuition)
     return db_tuition
 
 
+def tuition_status_for(amount, paid_amount, due_date: date, today: Optional[date] = None) -> PaymentStatus:
+    """Trạng thái học phí suy ra từ số đã thu và hạn thanh toán."""
+    today = today or date.today()
+    if (paid_amount or 0) >= (amount or 0):
+        return PaymentStatus.paid
+    return PaymentStatus.overdue if due_date < today else PaymentStatus.pending
+
+
 def update_tuition(db: Session, tuition_id: int, tuition_update: TuitionUpdate):
     """Cập nhật các chi tiết về học phí như amount, term, due_date."""
     # Sửa: Lấy tuple và kiểm tra. db_tuition là phần tử đầu tiên của tuple.
@@ -78,9 +94,34 @@ def update_tuition(db: Session, tuition_id: int, tuition_update: TuitionUpdate):
     update_data = tuition_update.model_dump(exclude_unset=True)
     update_data.pop("student_user_id", None)
 
+    old_amount = Decimal(db_tuition.amount)
+    old_period = finance_crud.period_of(db_tuition.due_date)
+    if "amount" in update_data and Decimal(str(update_data["amount"])) < Decimal(db_tuition.paid_amount or 0):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Số tiền học phí không được nhỏ hơn số đã thu."
+        )
+
     for key, value in update_data.items():
         setattr(db_tuition, key, value)
 
+    # Đồng bộ snapshot công nợ khi số tiền thay đổi
+    new_amount = Decimal(str(db_tuition.amount))
+    if new_amount != old_amount:
+        balance_crud.apply_balance_changes(db, [(db_tuition.student_user_id, new_amount - old_amount, 0)])
+
+    # Số tiền/hạn mới có thể đổi trạng thái (vd. hạ amount xuống bằng số đã thu -> paid)
+    db_tuition.status = tuition_status_for(new_amount, db_tuition.paid_amount, db_tuition.due_date)
+    if db_tuition.status == PaymentStatus.paid:
+        db_tuition.payment_date = db.scalar(
+            select(func.max(TuitionPayment.paid_at)).where(
+                TuitionPayment.tuition_id == tuition_id,
+                TuitionPayment.entry_type == PaymentEntryType.payment,
+            )
+        )
+
+    db.flush()
+    finance_crud.refresh_finance_months(db, [old_period, finance_crud.period_of(db_tuition.due_date)])
     db.commit()
     db.refresh(db_tuition)
     return db_tuition
@@ -90,6 +131,16 @@ def delete_tuition(db: Session, tuition_id: int):
     db_tuition = db.query(Tuition).filter(Tuition.tuition_id == tuition_id).first()
     if not db_tuition:
         return None
+    # Đã có tiền thu thì phải hoàn trước, tránh mất dấu vết trong sổ thanh toán
+    if db_tuition.paid_amount:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Không thể xóa học phí ID {tuition_id} vì đã có khoản thu, hãy hoàn tiền trước."
+        )
+    balance_crud.apply_balance_changes(db, [(db_tuition.student_user_id, -Decimal(db_tuition.amount), 0)])
+    period = finance_crud.period_of(db_tuition.due_date)
     db.delete(db_tuition)
+    db.flush()
+    finance_crud.refresh_finance_months(db, [period])
     db.commit()
     return True
\ No newline at end of file
@@ -0,0 +1,32 @@
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.tuition_payment_model import TuitionPayment
+from app.models.student_model import Student
+
+
+def get_payment(db: Session, payment_id: int) -> Optional[TuitionPayment]:
+    return db.get(TuitionPayment, payment_id)
+
+
+def get_payments(
+    db: Session,
+    tuition_id: Optional[int] = None,
+    student_user_id: Optional[int] = None,
+    parent_user_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[TuitionPayment]:
+    """Danh sách bút toán, mới nhất trước; lọc theo học phí / học sinh / phụ huynh."""
+    stmt = select(TuitionPayment)
+    if tuition_id is not None:
+        stmt = stmt.where(TuitionPayment.tuition_id == tuition_id)
+    if student_user_id is not None:
+        stmt = stmt.where(TuitionPayment.student_user_id == student_user_id)
+    if parent_user_id is not None:
+        stmt = stmt.where(TuitionPayment.student_user_id.in_(
+            select(Student.user_id).where(Student.parent_id == parent_user_id)
+        ))
+    stmt = stmt.order_by(TuitionPayment.paid_at.desc(), TuitionPayment.payment_id.desc()).offset(skip).limit(limit)
+    return db.execute(stmt).scalars().all()
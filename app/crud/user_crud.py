@@ -1,8 +1,12 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, case, cast, func, literal, or_, select, Float
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
 from passlib.context import CryptContext # type: ignore
 
 from app.models.user_model import User
+from app.models.role_model import Role
+from app.models.association_tables import user_roles
 from app.schemas.user_schema import UserCreate, UserUpdate
 from app.schemas.user_schema import UserView, UserViewDetails
 
@@ -130,4 +134,72 @@ def delete_user(db: Session, user_id: int) -> Optional[User]:
     # Xóa user
     db.delete(db_user)
     db.commit()
-    return db_user
\ No newline at end of file
+    return db_user
+
+def _search_score(db: Session, term: str) -> Tuple[ColumnElement, ColumnElement]:
+    """
+    (điểm xếp hạng, điều kiện khớp) cho từ khóa `term` đã chuẩn hóa (chữ thường, bỏ dấu).
+    PostgreSQL: trigram trên f_unaccent(lower(full_name)), lower(email), phone_number (trùng biểu thức
+    index GIN trong user_model.SEARCH_DDL). SQLite (test/benchmark): LIKE, tên có dấu không được bỏ dấu.
+    """
+    email = func.lower(User.email)
+    if db.get_bind().dialect.name == "postgresql":
+        name = func.f_unaccent(func.lower(User.full_name))
+        term_param = literal(term)
+        score = func.greatest(
+            func.word_similarity(term_param, name),
+            func.similarity(term_param, email),
+            func.similarity(term_param, User.phone_number),
+        )
+        match = or_(
+            term_param.op("<%")(name),
+            name.contains(term, autoescape=True),
+            email.contains(term, autoescape=True),
+            User.phone_number.contains(term, autoescape=True),
+        )
+    else:
+        name = func.lower(User.full_name)
+        score = case(
+            (name == term, 1.0),
+            (name.startswith(term, autoescape=True), 0.75),
+            (name.contains(term, autoescape=True), 0.5),
+            else_=0.25,
+        )
+        match = or_(
+            name.contains(term, autoescape=True),
+            email.contains(term, autoescape=True),
+            User.phone_number.contains(term, autoescape=True),
+        )
+    return cast(score, Float), match
+
+
+def search_users(
+    db: Session,
+    term: str,
+    scope: ColumnElement,
+    role: Optional[str] = None,
+    limit: int = 20,
+    after: Optional[Tuple[float, int]] = None,
+) -> list:
+    """
+    Tìm người dùng theo tên/email/số điện thoại, sắp xếp (điểm giảm dần, user_id tăng dần).
+    `scope`: predicate phân quyền trên User.user_id; `after`: (điểm, user_id) của dòng cuối trang trước (keyset).
+    """
+    score, match = _search_score(db, term)
+    stmt = (
+        select(
+            User.user_id, User.username, User.full_name, User.email, User.phone_number,
+            score.label("score"),
+        )
+        .where(match, scope)
+    )
+    if role is not None:
+        stmt = stmt.where(User.user_id.in_(
+            select(user_roles.c.user_id)
+            .join(Role, Role.role_id == user_roles.c.role_id)
+            .where(Role.name == role)
+        ))
+    if after is not None:
+        last_score, last_user_id = after
+        stmt = stmt.where(or_(score < last_score, and_(score == last_score, User.user_id > last_user_id)))
+    return db.execute(stmt.order_by(score.desc(), User.user_id).limit(limit)).all()
@@ -8,12 +8,22 @@ from .manager_model import Manager
 from .class_model import Class
 from .subject_model import Subject
 from .attendance_model import Attendance
+from .attendance_rollup_model import AttendanceRollup
 from .enrollment_model import Enrollment
 from .evaluation_model import Evaluation
+from .evaluation_rollup_model import EvaluationRollup
 from .notification_model import Notification
 from .payroll_model import Payroll
 from .schedule_model import Schedule
 from .test_model import Test
+from .job_model import Job
+from .tuition_model import Tuition
+from .tuition_payment_model import TuitionPayment
+from .balance_model import StudentBalance, ParentBalance, RevenueMonthly
+from .finance_model import FinanceMonthly, PayrollMonthly
+from .teacher_rating_stats_model import TeacherRatingStats
+from .device_sync_state_model import DeviceSyncState
+from .cache_tag_model import CacheTagVersion
 
 # Import các bảng liên kết từ association_tables.py
 from .association_tables import user_roles
\ No newline at end of file
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import relationship
-from sqlalchemy import Column, ForeignKey, Integer, Date, Enum, Time
+from datetime import datetime
+from sqlalchemy import Column, ForeignKey, Integer, Date, DateTime, Enum, Time, UniqueConstraint, Index
 from app.database import Base
 import enum
 
@@ -10,6 +11,12 @@ class AttendanceStatus(str, enum.Enum):
 
 class Attendance(Base):
     __tablename__ = "attendances"
+    __table_args__ = (
+        # Mỗi học sinh chỉ có một bản ghi cho một buổi học (khóa của upsert điểm danh)
+        UniqueConstraint("student_user_id", "schedule_id", "attendance_date", name="uq_attendance_student_schedule_date"),
+        # Change set cho thiết bị đồng bộ: keyset theo (updated_at, attendance_id)
+        Index("ix_attendances_updated_at", "updated_at", "attendance_id"),
+    )
 
     attendance_id = Column(Integer, primary_key=True, index=True)
     student_user_id = Column(Integer, ForeignKey("students.user_id", ondelete="CASCADE"), nullable=False)
@@ -19,6 +26,11 @@ class Attendance(Base):
     attendance_date = Column(Date)
     status = Column(Enum(AttendanceStatus))
     checkin_time = Column(Time, nullable=True)
+    # Trạng thái ngay trước lần upsert gần nhất (NULL: lần đó là INSERT). Ghi trong chính câu
+    # upsert để chênh lệch trạng thái đúng cả khi hai request cùng ghi một buổi đồng thời.
+    previous_status = Column(Enum(AttendanceStatus), nullable=True)
+    # Thời điểm (UTC) trạng thái/giờ check-in thay đổi lần cuối, làm watermark đồng bộ
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Quan hệ với học sinh, lịch trình, lớp
     student = relationship("Student", back_populates="attendances")
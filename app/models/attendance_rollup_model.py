@@ -0,0 +1,28 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from app.database import Base
+
+
+class AttendanceRollup(Base):
+    """
+    Model cho bảng attendance_rollups: bộ đếm điểm danh theo (học sinh, lớp).
+    Được cập nhật trong cùng transaction với mọi thao tác ghi attendances;
+    có thể dựng lại bằng `python rebuild_rollups.py attendance`.
+    """
+    __tablename__ = 'attendance_rollups'
+
+    student_user_id = Column(Integer, ForeignKey('students.user_id', ondelete="CASCADE"), primary_key=True)
+    class_id = Column(Integer, ForeignKey('classes.class_id', ondelete="CASCADE"), primary_key=True)
+
+    present_count = Column(Integer, nullable=False, default=0)
+    late_count = Column(Integer, nullable=False, default=0)
+    absent_count = Column(Integer, nullable=False, default=0)
+    total_count = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return (
+            f"<AttendanceRollup(student_user_id={self.student_user_id}, class_id={self.class_id}, "
+            f"present={self.present_count}, late={self.late_count}, absent={self.absent_count})>"
+        )
@@ -0,0 +1,64 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, Numeric, DateTime, ForeignKey
+from app.database import Base
+
+
+class StudentBalance(Base):
+    """
+    Model cho bảng student_balances: snapshot công nợ học phí theo học sinh.
+    Cập nhật cùng transaction với mọi thao tác ghi học phí/sổ thanh toán;
+    có thể dựng lại bằng `python rebuild_rollups.py balances`.
+    """
+    __tablename__ = 'student_balances'
+
+    student_user_id = Column(Integer, ForeignKey('students.user_id', ondelete="CASCADE"), primary_key=True)
+    total_billed = Column(Numeric(12, 2), nullable=False, default=0)
+    total_paid = Column(Numeric(12, 2), nullable=False, default=0)  # đã trừ tiền hoàn
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def outstanding(self):
+        return (self.total_billed or 0) - (self.total_paid or 0)
+
+    def __repr__(self):
+        return f"<StudentBalance(student_user_id={self.student_user_id}, outstanding={self.outstanding})>"
+
+
+class ParentBalance(Base):
+    """
+    Model cho bảng parent_balances: snapshot công nợ học phí gộp theo phụ huynh.
+    """
+    __tablename__ = 'parent_balances'
+
+    parent_user_id = Column(Integer, ForeignKey('parents.user_id', ondelete="CASCADE"), primary_key=True)
+    total_billed = Column(Numeric(12, 2), nullable=False, default=0)
+    total_paid = Column(Numeric(12, 2), nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def outstanding(self):
+        return (self.total_billed or 0) - (self.total_paid or 0)
+
+    def __repr__(self):
+        return f"<ParentBalance(parent_user_id={self.parent_user_id}, outstanding={self.outstanding})>"
+
+
+class RevenueMonthly(Base):
+    """
+    Model cho bảng revenue_monthly: doanh thu học phí thực thu theo tháng (theo ngày thu).
+    """
+    __tablename__ = 'revenue_monthly'
+
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    collected_amount = Column(Numeric(12, 2), nullable=False, default=0)
+    refunded_amount = Column(Numeric(12, 2), nullable=False, default=0)
+    payment_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def net_amount(self):
+        return (self.collected_amount or 0) - (self.refunded_amount or 0)
+
+    def __repr__(self):
+        return f"<RevenueMonthly({self.month}/{self.year}, net={self.net_amount})>"
@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from app.database import Base
+
+
+class CacheTagVersion(Base):
+    """
+    Model cho bảng cache_tag_versions: version của mỗi tag dữ liệu trong cache response
+    (môn học, lớp học, ghi danh). Lưu ở DB để mọi worker cùng thấy một version;
+    tăng trong cùng transaction với thao tác ghi dữ liệu.
+    """
+    __tablename__ = 'cache_tag_versions'
+
+    tag = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CacheTagVersion(tag={self.tag}, version={self.version})>"
@@ -14,6 +14,8 @@ class Class(Base):
     capacity = Column(Integer, nullable=False)
     class_size = Column(Integer, nullable=False, default=0)
     fee = Column(Integer, nullable=False)
+    # Tăng mỗi khi dữ liệu của lớp (test, đánh giá, điểm danh, ghi danh) thay đổi; dùng làm khóa cache báo cáo
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Quan hệ với Teacher và Subject
     teacher = relationship("Teacher", back_populates="classes")
@@ -0,0 +1,21 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey
+from app.database import Base
+
+
+class DeviceSyncState(Base):
+    """
+    Model cho bảng device_sync_states: seq cuối cùng đã áp dụng của mỗi thiết bị điểm danh
+    (theo giáo viên), để hàng đợi offline gửi lại nhiều lần không bị áp dụng trùng.
+    """
+    __tablename__ = 'device_sync_states'
+
+    teacher_user_id = Column(Integer, ForeignKey('teachers.user_id', ondelete="CASCADE"), primary_key=True)
+    device_id = Column(String(64), primary_key=True)
+
+    last_seq = Column(BigInteger, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DeviceSyncState(teacher_user_id={self.teacher_user_id}, device_id={self.device_id}, last_seq={self.last_seq})>"
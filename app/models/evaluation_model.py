@@ -30,6 +30,8 @@ class Evaluation(Base):
     study_point = Column(Integer, nullable=False)
     discipline_point = Column(Integer, nullable=False)
     evaluation_content = Column(Text, nullable=False)
+    # Đánh giá tự động sinh từ điểm danh (vắng/muộn) trỏ về bản ghi điểm danh tương ứng
+    attendance_id = Column(Integer, ForeignKey('attendances.attendance_id', ondelete="SET NULL"), nullable=True, index=True)
 
     # Mối quan hệ với học sinh và giáo viên và lớp (many-to-one)
     student = relationship("Student", back_populates="evaluations")
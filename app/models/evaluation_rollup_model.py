@@ -0,0 +1,31 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from app.database import Base
+
+
+class EvaluationRollup(Base):
+    """
+    Model cho bảng evaluation_rollups: tổng hợp điểm đánh giá theo (học sinh, lớp).
+    Được cập nhật trong cùng transaction với mọi thao tác ghi evaluations;
+    có thể dựng lại bằng `python rebuild_rollups.py`.
+    """
+    __tablename__ = 'evaluation_rollups'
+
+    student_user_id = Column(Integer, ForeignKey('students.user_id', ondelete="CASCADE"), primary_key=True)
+    class_id = Column(Integer, ForeignKey('classes.class_id', ondelete="CASCADE"), primary_key=True)
+
+    evaluation_count = Column(Integer, nullable=False, default=0)
+    total_study_point = Column(Integer, nullable=False, default=0)
+    total_discipline_point = Column(Integer, nullable=False, default=0)
+    study_plus_count = Column(Integer, nullable=False, default=0)
+    study_minus_count = Column(Integer, nullable=False, default=0)
+    discipline_plus_count = Column(Integer, nullable=False, default=0)
+    discipline_minus_count = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return (
+            f"<EvaluationRollup(student_user_id={self.student_user_id}, class_id={self.class_id}, "
+            f"study={self.total_study_point}, discipline={self.total_discipline_point})>"
+        )
@@ -0,0 +1,61 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, Numeric, DateTime, ForeignKey, Index
+from app.database import Base
+
+
+class FinanceMonthly(Base):
+    """
+    Model cho bảng finance_monthly: cube tài chính theo tháng (thu học phí vs chi lương).
+    Mỗi tháng được tính lại (refresh) bởi các thao tác ghi liên quan và tác vụ hằng đêm;
+    có thể dựng lại bằng `python rebuild_rollups.py finance`.
+    """
+    __tablename__ = 'finance_monthly'
+
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+
+    # Học phí có hạn thanh toán trong tháng
+    tuition_billed = Column(Numeric(14, 2), nullable=False, default=0)
+    tuition_count = Column(Integer, nullable=False, default=0)
+    # Số còn nợ của các học phí đã quá hạn (theo hạn trong tháng)
+    tuition_overdue = Column(Numeric(14, 2), nullable=False, default=0)
+    # Thực thu trong tháng (theo ngày thu, đã trừ tiền hoàn)
+    tuition_collected = Column(Numeric(14, 2), nullable=False, default=0)
+
+    payroll_total = Column(Numeric(14, 2), nullable=False, default=0)
+    payroll_count = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def net_amount(self):
+        return (self.tuition_collected or 0) - (self.payroll_total or 0)
+
+    def __repr__(self):
+        return f"<FinanceMonthly({self.month}/{self.year}, collected={self.tuition_collected}, payroll={self.payroll_total})>"
+
+
+class PayrollMonthly(Base):
+    """
+    Model cho bảng payroll_monthly: chi lương theo tháng, giáo viên và môn học.
+    Lương của giáo viên được phân bổ cho các môn theo tỷ lệ số lớp đang dạy của từng môn
+    (subject_id NULL nếu giáo viên chưa dạy lớp nào).
+    """
+    __tablename__ = 'payroll_monthly'
+
+    id = Column(Integer, primary_key=True)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    teacher_user_id = Column(Integer, ForeignKey('teachers.user_id', ondelete="CASCADE"), nullable=False)
+    subject_id = Column(Integer, ForeignKey('subjects.subject_id', ondelete="SET NULL"), nullable=True)
+    amount = Column(Numeric(14, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_payroll_monthly_period", "year", "month"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<PayrollMonthly({self.month}/{self.year}, teacher={self.teacher_user_id}, "
+            f"subject={self.subject_id}, amount={self.amount})>"
+        )
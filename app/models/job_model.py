@@ -0,0 +1,52 @@
+import enum
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey, Enum, Index
+from app.database import Base
+
+
+class JobStatus(str, enum.Enum):
+    """Trạng thái của một job chạy nền."""
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class Job(Base):
+    """
+    Model cho bảng jobs: tác vụ nặng (import/export/chạy hàng loạt) chạy nền
+    trong worker pool của tiến trình, client polling trạng thái qua /jobs/{job_id}.
+    """
+    __tablename__ = 'jobs'
+
+    job_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    job_type = Column(String(50), nullable=False)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.queued)
+    progress = Column(Integer, nullable=False, default=0)  # 0 - 100
+
+    params = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    # Đường dẫn file input (upload) và file kết quả (export) trên đĩa
+    input_file = Column(String(500), nullable=True)
+    result_file = Column(String(500), nullable=True)
+
+    created_by = Column(Integer, ForeignKey('users.user_id', ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Tiến trình (worker gunicorn) sở hữu job và lần cuối tiến trình đó báo còn sống
+    worker_id = Column(String(100), nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_status", "status"),
+    )
+
+    @property
+    def has_result_file(self) -> bool:
+        return bool(self.result_file)
+
+    def __repr__(self):
+        return f"<Job(job_id={self.job_id}, job_type={self.job_type}, status={self.status}, progress={self.progress})>"
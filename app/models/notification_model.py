@@ -1,5 +1,5 @@
 # app/models/notification_model.py
-from sqlalchemy import Boolean, Column, Integer, ForeignKey, DateTime, Text, func, Enum
+from sqlalchemy import Boolean, Column, Integer, ForeignKey, DateTime, Date, Text, String, JSON, Index, func, Enum
 from sqlalchemy.orm import relationship
 from app.database import Base
 import enum
@@ -10,21 +10,60 @@ class NotificationType(str, enum.Enum):
     tuition = "tuition"
     schedule = "schedule"
     warning = "warning"
-    others = "others" 
-    
+    others = "others"
+
+
+class NotificationRefType(str, enum.Enum):
+    """Loại đối tượng nghiệp vụ mà thông báo tham chiếu tới."""
+    attendance = "attendance"
+    payroll = "payroll"
+    tuition = "tuition"
+    evaluation = "evaluation"
+
 
 class Notification(Base):
     """
     Model cho bảng notifications.
+
+    Thông báo hệ thống lưu tham chiếu có cấu trúc (ref_type, ref_id, event_date)
+    cùng template + params; nội dung hiển thị được render khi đọc.
+    Thông báo tự do (do người dùng gửi) vẫn lưu nội dung thô ở cột content.
     """
     __tablename__ = 'notifications'
     notification_id = Column(Integer, primary_key=True)
     sender_id = Column(Integer, ForeignKey('users.user_id'))
     receiver_id = Column(Integer, ForeignKey('users.user_id'), nullable=False)
-    content = Column(Text, nullable=False)
+    raw_content = Column("content", Text, nullable=True)
     sent_at = Column(DateTime, default=func.now())
     type = Column(Enum(NotificationType), nullable=False)
     is_read = Column(Boolean, default=False)
 
+    # Tham chiếu có cấu trúc để cập nhật/xóa bằng index thay vì so khớp chuỗi
+    ref_type = Column(Enum(NotificationRefType), nullable=True)
+    ref_id = Column(Integer, nullable=True)
+    event_date = Column(Date, nullable=True)
+
+    # Template + tham số để render nội dung lazily
+    template = Column(String(50), nullable=True)
+    params = Column(JSON, nullable=True)
+
     sender = relationship("User", foreign_keys=[sender_id])
-    receiver = relationship("User", foreign_keys=[receiver_id])
\ No newline at end of file
+    receiver = relationship("User", foreign_keys=[receiver_id])
+
+    __table_args__ = (
+        Index("ix_notifications_ref", "ref_type", "ref_id"),
+        Index("ix_notifications_receiver_event", "receiver_id", "event_date"),
+    )
+
+    @property
+    def content(self) -> str:
+        """Nội dung hiển thị: render từ template nếu có, ngược lại dùng nội dung thô."""
+        from app.services.notification_service import render_notification_content
+        return render_notification_content(self.template, self.params, self.raw_content)
+
+    @content.setter
+    def content(self, value):
+        # Gán nội dung thô sẽ thay thế template (nội dung do người dùng sửa)
+        self.raw_content = value
+        if value is not None:
+            self.template = None
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Computed, Integer, ForeignKey, Float, DateTime, Enum
+from sqlalchemy import Column, Computed, Integer, ForeignKey, Float, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.tuition_model import PaymentStatus
@@ -23,5 +23,10 @@ class Payroll(Base):
     # Mối quan hệ với giáo viên (many-to-one, vì một giáo viên có thể có nhiều bản lương theo tháng)
     teacher = relationship("Teacher", back_populates="payroll")
 
+    __table_args__ = (
+        # Báo cáo lương theo giáo viên lọc theo khoảng sent_at (range predicate dùng được index)
+        Index("ix_payroll_teacher_sent_at", "teacher_user_id", "sent_at"),
+    )
+
     def __repr__(self):
         return f"<Payroll(teacher_user_id={self.teacher_user_id}, month={self.month}, total={self.total})>"
\ No newline at end of file
@@ -0,0 +1,36 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, Numeric, DateTime, ForeignKey
+from app.database import Base
+
+
+class TeacherRatingStats(Base):
+    """
+    Model cho bảng teacher_rating_stats: tổng hợp đánh giá của học sinh theo giáo viên
+    (số lượt, tổng điểm và phân bố 1-5 sao theo floor(rating)).
+    Được cập nhật trong cùng transaction với mọi thao tác ghi teacher_reviews;
+    có thể dựng lại bằng `python rebuild_rollups.py teacher_ratings`.
+    """
+    __tablename__ = 'teacher_rating_stats'
+
+    teacher_user_id = Column(Integer, ForeignKey('teachers.user_id', ondelete="CASCADE"), primary_key=True)
+
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Numeric(12, 2), nullable=False, default=0)
+    star_1 = Column(Integer, nullable=False, default=0)
+    star_2 = Column(Integer, nullable=False, default=0)
+    star_3 = Column(Integer, nullable=False, default=0)
+    star_4 = Column(Integer, nullable=False, default=0)
+    star_5 = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def average_rating(self) -> float:
+        return round(float(self.rating_sum) / self.review_count, 2) if self.review_count else 0.0
+
+    @property
+    def distribution(self) -> dict:
+        return {star: getattr(self, f"star_{star}") or 0 for star in range(1, 6)}
+
+    def __repr__(self):
+        return f"<TeacherRatingStats(teacher_user_id={self.teacher_user_id}, count={self.review_count}, sum={self.rating_sum})>"
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, Float, DateTime, Enum, ForeignKey, Date
+from sqlalchemy import Column, Integer, Numeric, DateTime, Enum, ForeignKey, Date, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
@@ -14,6 +14,10 @@ class PaymentStatus(str, enum.Enum):
     overdue = "overdue"
 
 
+# Điều kiện "còn nợ" của partial index; query công nợ dùng OPEN_TUITION (cùng biểu thức) để planner chọn index
+OPEN_TUITION_SQL = "paid_amount < amount"
+
+
 class Tuition(Base):
     """
     Mô hình database cho bảng `tuitions`.
@@ -22,7 +26,9 @@ class Tuition(Base):
 
     tuition_id = Column(Integer, primary_key=True, index=True)
     student_user_id = Column(Integer, ForeignKey("students.user_id", ondelete="CASCADE"), nullable=False, index=True)
-    amount = Column(Float, nullable=False)
+    amount = Column(Numeric(12, 2), nullable=False)
+    # Tổng đã thu (trừ tiền hoàn) từ sổ tuition_payments
+    paid_amount = Column(Numeric(12, 2), nullable=False, default=0, server_default="0")
     payment_date = Column(Date, nullable=True)  # Có thể null nếu chưa thanh toán
     term = Column(Integer, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -32,9 +38,25 @@ class Tuition(Base):
 
     # Quan hệ với bảng student
     student = relationship("Student", back_populates="tuitions")
+    payments = relationship("TuitionPayment", back_populates="tuition", passive_deletes=True)
+
+    __table_args__ = (
+        # Mỗi học sinh chỉ có một bản ghi học phí cho mỗi kỳ (sinh học phí idempotent)
+        UniqueConstraint("student_user_id", "term", name="uq_tuitions_student_term"),
+        # Cube tài chính tính lại theo khoảng hạn thanh toán của tháng
+        Index("ix_tuitions_due_date", "due_date"),
+        # Báo cáo tuổi nợ chỉ đọc học phí còn nợ (phần nhỏ của bảng khi đa số đã thu đủ)
+        Index(
+            "ix_tuitions_open_due_date", "due_date", "amount", "paid_amount",
+            postgresql_where=text(OPEN_TUITION_SQL), sqlite_where=text(OPEN_TUITION_SQL),
+        ),
+    )
 
     def __repr__(self):
         return (
             f"<Tuition(student_user_id={self.student_user_id}, amount={self.amount}, "
-            f"status={self.payment_status}, due_date={self.due_date})>"
+            f"status={self.status}, due_date={self.due_date})>"
         )
+
+
+OPEN_TUITION = Tuition.paid_amount < Tuition.amount
@@ -0,0 +1,48 @@
+import enum
+from datetime import datetime
+from sqlalchemy import Column, Integer, Numeric, String, Text, Date, DateTime, Enum, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class PaymentEntryType(str, enum.Enum):
+    """Loại bút toán trong sổ thanh toán học phí."""
+    payment = "payment"
+    refund = "refund"
+
+
+class TuitionPayment(Base):
+    """
+    Model cho bảng tuition_payments: sổ cái (ledger) các lần thu/hoàn học phí.
+    Chỉ ghi thêm (append-only); số tiền luôn dương, chiều tiền xác định bởi entry_type.
+    """
+    __tablename__ = 'tuition_payments'
+
+    payment_id = Column(Integer, primary_key=True)
+    tuition_id = Column(Integer, ForeignKey('tuitions.tuition_id', ondelete="CASCADE"), nullable=False)
+    student_user_id = Column(Integer, ForeignKey('students.user_id', ondelete="CASCADE"), nullable=False)
+
+    entry_type = Column(Enum(PaymentEntryType), nullable=False, default=PaymentEntryType.payment)
+    amount = Column(Numeric(12, 2), nullable=False)
+    method = Column(String(30), nullable=True)  # cash, bank_transfer, ...
+    note = Column(Text, nullable=True)
+    paid_at = Column(Date, nullable=False)
+
+    created_by = Column(Integer, ForeignKey('users.user_id', ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    tuition = relationship("Tuition", back_populates="payments")
+
+    __table_args__ = (
+        Index("ix_tuition_payments_tuition", "tuition_id"),
+        Index("ix_tuition_payments_student", "student_user_id"),
+        Index("ix_tuition_payments_paid_at", "paid_at"),
+    )
+
+    @property
+    def signed_amount(self):
+        """Số tiền có dấu: thu là dương, hoàn là âm."""
+        return self.amount if self.entry_type == PaymentEntryType.payment else -self.amount
+
+    def __repr__(self):
+        return f"<TuitionPayment(tuition_id={self.tuition_id}, {self.entry_type}={self.amount})>"
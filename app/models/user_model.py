@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean, Enum
+from sqlalchemy import Column, Integer, String, Date, Boolean, Enum, DDL, event
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.association_tables import user_roles
@@ -52,3 +52,23 @@ class User(Base):
     # ✅ (tuỳ chọn) Hàm để đặt mật khẩu mới
     def set_password(self, plain_password: str):
         self.password = pwd_context.hash(plain_password.encode('utf-8')[:72])
+
+
+# Tìm kiếm người dùng (/users/search) trên PostgreSQL: trigram (pg_trgm) + bỏ dấu tiếng Việt (unaccent).
+# unaccent() không IMMUTABLE nên không dùng được trong index; f_unaccent bọc lại với từ điển cố định.
+# Biểu thức index phải trùng với biểu thức trong user_crud.search_users.
+# create_all chỉ chạy các lệnh này khi tạo mới bảng users; DB đã có sẵn cần chạy tay SEARCH_DDL
+# (CREATE EXTENSION cần quyền tương ứng).
+SEARCH_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text "
+    "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+    "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$",
+    "CREATE INDEX IF NOT EXISTS ix_users_full_name_trgm ON users USING gin (f_unaccent(lower(full_name)) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (lower(email) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_phone_number_trgm ON users USING gin (phone_number gin_trgm_ops)",
+)
+
+for _statement in SEARCH_DDL:
+    event.listen(User.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
@@ -1,6 +1,6 @@
 # app/schemas/attendance_schema.py
-from pydantic import BaseModel
-from datetime import date, time
+from pydantic import BaseModel, Field
+from datetime import date, datetime, time
 from typing import List, Optional
 from app.models.attendance_model import AttendanceStatus
 
@@ -63,3 +63,75 @@ class AttendanceBatchCreate(BaseModel):
     class_id: int
     attendance_date: date
     records: List[AttendanceInitialRecord]
+
+
+class AttendanceMultiBatchCreate(BaseModel):
+    """Schema để điểm danh nhiều buổi học (nhiều lịch/lớp) trong một request"""
+    sessions: List[AttendanceBatchCreate] = Field(..., min_length=1, max_length=500)
+
+
+# ---- Đồng bộ thiết bị (offline) ----
+class AttendanceSyncDelta(BaseModel):
+    """Một thay đổi điểm danh được ghi offline trên thiết bị"""
+    seq: int = Field(..., ge=1, description="Số thứ tự tăng dần theo thiết bị")
+    schedule_id: int
+    student_user_id: int
+    attendance_date: date
+    status: AttendanceStatus
+    checkin_time: Optional[time] = None
+    recorded_at: datetime = Field(..., description="Thời điểm ghi nhận theo đồng hồ thiết bị")
+
+
+class SyncWatermark(BaseModel):
+    """Vị trí đã đồng bộ tới trong change set (keyset)"""
+    updated_at: datetime
+    attendance_id: int
+
+
+class AttendanceSyncRequest(BaseModel):
+    """Hàng đợi thay đổi của thiết bị + watermark change set lần trước"""
+    device_id: str = Field(..., min_length=1, max_length=64)
+    deltas: List[AttendanceSyncDelta] = Field(default_factory=list, max_length=5000)
+    since: Optional[SyncWatermark] = None
+    limit: int = Field(1000, ge=1, le=5000)
+
+
+class AttendanceSyncRejected(BaseModel):
+    seq: int
+    detail: str
+
+
+class AttendanceChange(BaseModel):
+    """Bản ghi điểm danh rút gọn trong change set (lớp suy ra từ lịch học)"""
+    attendance_id: int
+    student_user_id: int
+    schedule_id: int
+    attendance_date: date
+    status: AttendanceStatus
+    checkin_time: Optional[time] = None
+
+    class Config:
+        from_attributes = True
+
+
+class AttendanceSyncResult(BaseModel):
+    last_seq: int
+    applied: int
+    rejected: List[AttendanceSyncRejected] = []
+    changes: List[AttendanceChange] = []
+    watermark: Optional[SyncWatermark] = None
+    has_more: bool = False
+
+
+class AttendanceStats(BaseModel):
+    """Bộ đếm điểm danh của một học sinh trong một lớp (đọc từ attendance_rollups)"""
+    student_user_id: int
+    class_id: int
+    present_count: int
+    late_count: int
+    absent_count: int
+    total_count: int
+    attendance_rate: float  # % buổi có mặt đúng giờ
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+from typing import Any, Optional
+from datetime import datetime
+from app.models.job_model import JobStatus
+
+
+class Job(BaseModel):
+    job_id: str = Field(..., example="3f2b6c1e-8a0d-4f4e-9a55-0c7d6b1e2f10")
+    job_type: str = Field(..., example="tests_import")
+    status: JobStatus = Field(..., example="running")
+    progress: int = Field(0, example=50, description="Tiến độ 0 - 100")
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    has_result_file: bool = Field(False, description="Có file kết quả để tải qua /jobs/{job_id}/result")
+    created_by: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class JobSubmitted(BaseModel):
+    job_id: str
+    status: JobStatus
+    message: str = "Đã tiếp nhận yêu cầu, job đang chạy nền."
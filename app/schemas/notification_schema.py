@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field, field_serializer
-from typing import Optional
-from datetime import datetime
-from app.models.notification_model import NotificationType # Import Enum từ file model
+from typing import Optional, Dict, Any
+from datetime import datetime, date
+from app.models.notification_model import NotificationType, NotificationRefType # Import Enum từ file model
 
 class NotificationBase(BaseModel):
     """
@@ -13,13 +13,20 @@ class NotificationBase(BaseModel):
     # Sử dụng Enum để đảm bảo kiểu dữ liệu hợp lệ
     type: NotificationType = Field(..., example=NotificationType.payroll)
     is_read: bool = Field(default=False, example=False)
+    # Tham chiếu có cấu trúc tới đối tượng nghiệp vụ (nếu có)
+    ref_type: Optional[NotificationRefType] = Field(None, example=NotificationRefType.payroll)
+    ref_id: Optional[int] = Field(None, example=10)
+    event_date: Optional[date] = None
     
 class NotificationCreate(NotificationBase):
     """
     Schema để tạo một bản ghi Notification mới.
     sent_at không cần ở đây vì nó sẽ được tự động tạo trong DB.
+    Thông báo hệ thống có thể bỏ trống content và truyền template + params để render lúc đọc.
     """
-    pass
+    content: Optional[str] = Field(None, example="Bảng lương của bạn đã được cập nhật.")
+    template: Optional[str] = Field(None, example="payroll_calculated")
+    params: Optional[Dict[str, Any]] = None
 
 class NotificationUpdate(BaseModel):
     """
@@ -0,0 +1,74 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import date, datetime
+from decimal import Decimal
+from app.models.tuition_payment_model import PaymentEntryType
+
+
+class PaymentCreate(BaseModel):
+    tuition_id: int = Field(..., example=1)
+    amount: Decimal = Field(..., gt=0, max_digits=12, decimal_places=2, example="1500000.00")
+    entry_type: PaymentEntryType = Field(PaymentEntryType.payment, example="payment")
+    method: Optional[str] = Field(None, max_length=30, example="bank_transfer")
+    note: Optional[str] = None
+    paid_at: Optional[date] = Field(None, description="Ngày thu/hoàn tiền, mặc định hôm nay")
+
+
+class Payment(BaseModel):
+    payment_id: int
+    tuition_id: int
+    student_user_id: int
+    entry_type: PaymentEntryType
+    amount: Decimal
+    method: Optional[str] = None
+    note: Optional[str] = None
+    paid_at: date
+    created_by: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class StudentBalance(BaseModel):
+    student_user_id: int
+    total_billed: Decimal
+    total_paid: Decimal
+    outstanding: Decimal
+
+    class Config:
+        from_attributes = True
+
+
+class ParentBalance(BaseModel):
+    parent_user_id: int
+    total_billed: Decimal
+    total_paid: Decimal
+    outstanding: Decimal
+
+    class Config:
+        from_attributes = True
+
+
+class AgingBucket(BaseModel):
+    bucket: str = Field(..., example="1-30")
+    tuition_count: int
+    outstanding: Decimal
+
+
+class AgingReport(BaseModel):
+    as_of: date
+    total_outstanding: Decimal
+    buckets: List[AgingBucket]
+
+
+class RevenueMonth(BaseModel):
+    year: int
+    month: int
+    collected_amount: Decimal
+    refunded_amount: Decimal
+    net_amount: Decimal
+    payment_count: int
+
+    class Config:
+        from_attributes = True
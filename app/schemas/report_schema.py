@@ -1,5 +1,5 @@
 ﻿from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 class TeacherOverview(BaseModel):
     total_students: int
@@ -44,4 +44,40 @@ class TeacherReport(BaseModel):
     teacher_id: int
     teacher_name: str
     review_distribution: Dict[int, int]  # ví dụ: {1: 3, 2: 1, 3: 5, 4: 10, 5: 7}
-    salary_by_month: List[SalaryByMonth]
\ No newline at end of file
+    salary_by_month: List[SalaryByMonth]
+
+
+class FinanceMonth(BaseModel):
+    month: int
+    tuition_billed: float
+    tuition_count: int
+    tuition_overdue: float
+    tuition_collected: float
+    payroll_total: float
+    payroll_count: int
+    net_amount: float  # thực thu - chi lương
+
+
+class PayrollByTeacher(BaseModel):
+    teacher_user_id: int
+    teacher_name: Optional[str] = None
+    amount: float
+
+
+class PayrollBySubject(BaseModel):
+    subject_id: Optional[int] = None  # None: giáo viên chưa dạy lớp nào
+    subject_name: Optional[str] = None
+    amount: float
+
+
+class FinanceReport(BaseModel):
+    year: int
+    month: Optional[int] = None
+    months: List[FinanceMonth]
+    total_billed: float
+    total_collected: float
+    total_overdue: float
+    total_payroll: float
+    net_amount: float
+    payroll_by_teacher: List[PayrollByTeacher]
+    payroll_by_subject: List[PayrollBySubject]
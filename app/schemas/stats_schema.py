@@ -5,7 +5,10 @@ class Stats(BaseModel):
     total_classes: int
     total_teachers: int
     total_students: int
-    total_schedules: int
+    total_schedules: int  # Số buổi học hôm nay
+    active_enrollments: int = Field(0, description="Số lượt ghi danh đang active")
+    pending_tuition_total: float = Field(0, description="Tổng học phí còn nợ (đã trừ các khoản thu)")
+    today_sessions_checked: int = Field(0, description="Số buổi học hôm nay đã điểm danh")
 
     class Config:
         from_attributes = True
@@ -22,4 +25,8 @@ class StudentStats(BaseModel):
     classes_enrolled: Optional[int] = Field(..., description="Số lớp đã đăng ký")
     gpa: Optional[float] = Field(None, description="Điểm trung bình học tập")
     study_point: Optional[int] = Field(None, description="Điểm học tập")
-    discipline_point: Optional[int] = Field(None, description="Điểm kỷ luật")
\ No newline at end of file
+    discipline_point: Optional[int] = Field(None, description="Điểm kỷ luật")
+
+
+class StudentStatsItem(StudentStats):
+    student_user_id: int
@@ -4,6 +4,8 @@ from datetime import date
 from pydantic import BaseModel, field_serializer
 from typing import Optional
 
+from app.schemas.stats_schema import StudentStats
+
 class StudentBase(BaseModel):
     user_id: int
     parent_id: Optional[int] = None   # ✅ để Optional, không bắt buộc khi tạo
@@ -34,6 +36,7 @@ class StudentView(BaseModel):
     date_of_birth: Optional[date] = None
     phone_number: Optional[str] = None
     gender: Optional[str] = None
+    stats: Optional[StudentStats] = None  # chỉ có khi gọi danh sách với with_stats=true
 
     @field_serializer("date_of_birth")
     def format_date_of_birth(self, date_of_birth: date, _info):
@@ -1,6 +1,6 @@
 # app/schemas/teacher_review_schema.py
 from pydantic import BaseModel, Field, field_serializer
-from typing import Optional
+from typing import Dict, Optional
 from datetime import date as dt_date
 
 # Schema cơ sở cho các trường dữ liệu do người dùng cung cấp
@@ -42,4 +42,13 @@ class TeacherReviewView(BaseModel):
         if value is None:
             return None
         # Chuyển đổi đối tượng date thành chuỗi 'dd/mm/yyyy'
-        return value.strftime('%d/%m/%Y')
\ No newline at end of file
+        return value.strftime('%d/%m/%Y')
+
+
+class TeacherRating(BaseModel):
+    """Tổng hợp đánh giá của một giáo viên (đọc từ teacher_rating_stats)."""
+    teacher_user_id: int
+    teacher_name: Optional[str] = None
+    review_count: int
+    average_rating: float
+    distribution: Dict[int, int]  # số lượt theo sao 1-5 (floor(rating))
@@ -57,6 +57,14 @@ class TeacherStats(BaseModel):
     reviews: int
     rate: float
 
+class TeacherMetrics(TeacherStats):
+    """Số liệu tổng hợp của một giáo viên cho trang danh sách (tính hàng loạt)."""
+    teacher_user_id: int
+    total_students: int
+    avg_gpa: float
+    avg_study_point: float
+    avg_discipline_point: float
+
 class TeacherView(BaseModel):
     teacher_user_id: int
     full_name: str
@@ -0,0 +1,49 @@
+from datetime import date
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+
+class TranscriptTest(BaseModel):
+    test_id: int
+    test_name: str
+    test_type: Optional[str] = None
+    score: float
+    exam_date: date
+
+
+class TranscriptClass(BaseModel):
+    class_id: int
+    class_name: str
+    subject_name: Optional[str] = None
+    teacher_name: Optional[str] = None
+    enrollment_status: Optional[str] = None
+    gpa: Optional[float] = None  # trung bình điểm kiểm tra của lớp
+    scores_by_type: Dict[str, float]  # điểm trung bình theo loại bài kiểm tra
+    tests: List[TranscriptTest]
+    study_point: int
+    discipline_point: int
+    attendance_total: int
+    attendance_rate: Optional[float] = None  # % buổi có mặt, None nếu chưa điểm danh
+
+
+class Transcript(BaseModel):
+    student_user_id: int
+    full_name: str
+    gpa: Optional[float] = None  # trung bình tất cả bài kiểm tra
+    classes_enrolled: int  # số lớp đang học (active)
+    classes: List[TranscriptClass]
+
+
+class TranscriptRow(BaseModel):
+    """Dạng bảng phẳng (mỗi dòng một học sinh - lớp) để xuất Excel/in ấn."""
+    student_user_id: int
+    full_name: str
+    class_id: int
+    class_name: str
+    subject_name: Optional[str] = None
+    teacher_name: Optional[str] = None
+    test_count: int
+    gpa: Optional[float] = None
+    study_point: int
+    discipline_point: int
+    attendance_rate: Optional[float] = None
@@ -27,7 +27,10 @@ class TuitionUpdate(BaseModel):
     amount: Optional[float] = Field(None, gt=0)
     term: Optional[int] = None
     due_date: Optional[date] = None
-    status: PaymentStatus  = Field("pending")
+
+    class Config:
+        # Trạng thái chỉ suy ra từ sổ thu/hoàn (tuition_payments), không cho sửa tay
+        extra = "forbid"
 
 
 class TuitionView(BaseModel):
@@ -115,4 +115,20 @@ class SheetUserCreate(UserBase):
     roles: List[str]
 
 class SheetUserImportRequest(BaseModel):
-    users: List[SheetUserCreate]
\ No newline at end of file
+    users: List[SheetUserCreate]
+
+# -------------------------------
+# Schema cho tìm kiếm người dùng (/users/search)
+# -------------------------------
+class UserSearchHit(BaseModel):
+    user_id: int
+    username: str
+    full_name: Optional[str] = None
+    email: Optional[str] = None
+    phone_number: Optional[str] = None
+    score: float = Field(..., description="Độ tương đồng với từ khóa (0..1), kết quả sắp xếp giảm dần")
+
+
+class UserSearchPage(BaseModel):
+    items: List[UserSearchHit]
+    next_cursor: Optional[str] = Field(None, description="Truyền vào `cursor` để lấy trang tiếp theo; None = hết")
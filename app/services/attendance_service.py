@@ -1,20 +1,25 @@
-from typing import List, Optional, Dict, Tuple
-from datetime import datetime, date as dt_date, time as dt_time
+from typing import Callable, List, NamedTuple, Optional, Dict, Tuple
+from datetime import datetime, timedelta, date as dt_date, time as dt_time
 from fastapi import HTTPException
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import select, or_
+from sqlalchemy import select, insert, update, delete, case, and_, or_
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
 
 # Import Models
 from app.models.attendance_model import Attendance, AttendanceStatus
 from app.models.evaluation_model import EvaluationType, Evaluation
-from app.models.notification_model import Notification, NotificationType
+from app.models.notification_model import Notification, NotificationType, NotificationRefType
+from app.models.attendance_rollup_model import AttendanceRollup
 from app.models.schedule_model import Schedule, ScheduleTypeEnum, DayOfWeekEnum
-from app.models.class_model import Class
-from app.models.student_model import Student, Parent
+from app.models.student_model import Student
 from app.models.user_model import User 
 
 # Import Schemas
-from app.schemas.attendance_schema import AttendanceBatchCreate
+from app.schemas.attendance_schema import (
+    AttendanceBatchCreate, AttendanceMultiBatchCreate, AttendanceStats,
+    AttendanceSyncRequest, AttendanceSyncResult, AttendanceSyncRejected, AttendanceChange, SyncWatermark,
+)
 from app.schemas.notification_schema import NotificationUpdate
 from app.schemas.evaluation_schema import EvaluationCreate
 
@@ -23,11 +28,34 @@ from app.crud import (
     attendance_crud,
     notification_crud,
     evaluation_crud,
-    schedule_crud,
     student_crud,
     class_crud,
+    evaluation_rollup_crud,
+    attendance_rollup_crud,
+    device_sync_crud,
+    enrollment_crud,
 )
-from app.services import evaluation_service
+from app.services import policy_service
+from app.services.session_index_service import session_index, SessionWindow
+
+class AttendancePenalty(NamedTuple):
+    """Hệ quả của một trạng thái điểm danh: đánh giá kỷ luật + template thông báo."""
+    study_point: int
+    discipline_point: int
+    content: str
+    student_template: str
+    parent_template: str
+
+
+# Trạng thái không có trong bảng (present) thì không có hệ quả
+ATTENDANCE_PENALTIES: Dict[AttendanceStatus, AttendancePenalty] = {
+    AttendanceStatus.absent: AttendancePenalty(
+        -5, -5, "Vắng mặt không phép trong buổi học.", "attendance_absent", "attendance_absent_parent"
+    ),
+    AttendanceStatus.late: AttendancePenalty(
+        -2, -2, "Đi học muộn", "attendance_late", "attendance_late_parent"
+    ),
+}
 
 # ----------------- Helper để chuẩn hóa time -----------------
 def _to_naive_time(t: Optional[dt_time]) -> Optional[dt_time]:
@@ -57,160 +85,449 @@ def check_attendance_permission(
     attendance_date: dt_date,
     checkin_time: Optional[dt_time],
     current_user,
-    schedule_obj: Optional[Schedule] = None 
-) -> Schedule:
+) -> SessionWindow:
     """
-    Kiểm tra quyền điểm danh và khung giờ.
-    Tối ưu: Nhận schedule_obj để tránh query lại nếu đã có.
+    Kiểm tra quyền điểm danh, ngày học và khung giờ.
+    Tối ưu: tra chỉ mục buổi học trong ngày (session_index_service) theo (giáo viên, lịch, ngày),
+    không truy vấn DB khi điểm danh cho hôm nay/hôm qua.
+    Trả về khung giờ của buổi học (kèm class_id, teacher_user_id).
     """
-    schedule = schedule_obj
-    if not schedule:
-        schedule = schedule_crud.get_schedule(db, schedule_id)
-    
-    if not schedule:
+    owner = session_index.owner(db, schedule_id)
+    if owner is None:
         raise HTTPException(status_code=404, detail="Không tìm thấy lịch học.")
-    
-    # Kiểm tra giáo viên chủ nhiệm lớp
-    # Lưu ý: Cần đảm bảo schedule.class_info đã được load (qua joinedload ở hàm gọi) hoặc lazy load
-    if schedule.class_info.teacher_user_id != current_user.user_id:
-        raise HTTPException(status_code=403, detail="Bạn không được phép điểm danh cho lớp này.")
-
-    # Chuẩn hóa thời gian
-    raw_check_time = checkin_time or datetime.now().time()
-    time_to_check = _to_naive_time(raw_check_time)
-    start_time_naive = _to_naive_time(schedule.start_time)
-    end_time_naive = _to_naive_time(schedule.end_time)
 
-    if start_time_naive is None or end_time_naive is None:
-        raise HTTPException(status_code=500, detail="Lịch học thiếu thông tin giờ bắt đầu/kết thúc.")
+    # Kiểm tra giáo viên chủ nhiệm lớp (đọc lại DB trước khi từ chối: cache có thể cũ hơn lớp)
+    if owner.teacher_user_id != current_user.user_id:
+        owner = session_index.owner(db, schedule_id, refresh=True)
+    if owner is None:
+        raise HTTPException(status_code=404, detail="Không tìm thấy lịch học.")
+    if owner.teacher_user_id != current_user.user_id:
+        raise HTTPException(status_code=403, detail="Bạn không được phép điểm danh cho lớp này.")
 
-    if start_time_naive <= end_time_naive:
-        in_range = (start_time_naive <= time_to_check <= end_time_naive)
-    else:
-        # Trường hợp qua đêm
-        in_range = (time_to_check >= start_time_naive) or (time_to_check <= end_time_naive)
+    # Lịch học phải có buổi vào đúng ngày điểm danh (WEEKLY theo thứ, ONCE theo ngày)
+    window = session_index.window(db, current_user.user_id, schedule_id, attendance_date)
+    if window is None:
+        raise HTTPException(status_code=400, detail=f"Lịch học không có buổi vào ngày {attendance_date}.")
 
-    if not in_range:
+    # Chuẩn hóa thời gian
+    time_to_check = _to_naive_time(checkin_time or datetime.now().time())
+    if not window.contains(time_to_check):
         raise HTTPException(
             status_code=403,
-            detail=f"Bạn chỉ có thể điểm danh trong giờ học ({schedule.start_time} - {schedule.end_time})."
+            detail=f"Bạn chỉ có thể điểm danh trong giờ học ({window.start_time} - {window.end_time})."
         )
 
-    return schedule
+    return window
 
 # ----------------- Create Batch (Optimized) -----------------
-def create_batch_attendance(
-    db: Session, attendance_data: AttendanceBatchCreate, current_user
-) -> List[Attendance]:
+def _normalize_records(attendance_data: AttendanceBatchCreate, now_time: dt_time) -> Optional[dt_time]:
     """
-    Tạo các bản ghi điểm danh ban đầu cho một lớp.
-    Tối ưu: Bulk insert Notification và Evaluation để tránh N+1 query.
+    Gán giờ hiện tại cho học sinh có mặt chưa có checkin_time.
+    Trả về checkin_time đại diện (bản ghi đầu tiên có giờ) để kiểm tra khung giờ.
     """
-    now_time = datetime.now().time()
-
-    # 1. Chuẩn hóa checkin_time trong payload
     representative_checkin = None
     for record in attendance_data.records:
         if record.status == AttendanceStatus.present and record.checkin_time is None:
             record.checkin_time = now_time
-        
+
         if record.checkin_time is not None and representative_checkin is None:
             representative_checkin = _to_naive_time(record.checkin_time)
+    return representative_checkin
+
+
+def _linked_evaluations(db: Session, records: List[Attendance]) -> Dict[int, Row]:
+    """
+    Đánh giá tự động của các bản ghi điểm danh, theo attendance_id (1 query).
+    Đánh giá tạo trước khi có cột attendance_id được khớp theo (học sinh, lớp, ngày, nội dung).
+    """
+    if not records:
+        return {}
+    by_key = {(r.student_user_id, r.class_id, r.attendance_date): r.attendance_id for r in records}
+    rows = db.execute(
+        select(
+            Evaluation.evaluation_id, Evaluation.attendance_id, Evaluation.student_user_id,
+            Evaluation.class_id, Evaluation.evaluation_date, Evaluation.study_point, Evaluation.discipline_point,
+        ).where(or_(
+            Evaluation.attendance_id.in_(by_key.values()),
+            and_(
+                Evaluation.attendance_id.is_(None),
+                Evaluation.evaluation_type == EvaluationType.discipline,
+                Evaluation.evaluation_content.in_({p.content for p in ATTENDANCE_PENALTIES.values()}),
+                Evaluation.student_user_id.in_({key[0] for key in by_key}),
+                Evaluation.class_id.in_({key[1] for key in by_key}),
+                Evaluation.evaluation_date.in_({key[2] for key in by_key}),
+            ),
+        ))
+    ).all()
+
+    linked = {}
+    # Đánh giá đã gắn attendance_id được ưu tiên hơn đánh giá khớp theo khóa
+    for row in sorted(rows, key=lambda row: row.attendance_id is None):
+        attendance_id = row.attendance_id or by_key.get((row.student_user_id, row.class_id, row.evaluation_date))
+        if attendance_id is not None:
+            linked.setdefault(attendance_id, row)
+    return linked
+
+
+def _penalty_evaluations(records: List[Attendance], teacher_by_class: Dict[int, int]) -> List[dict]:
+    """Dòng đánh giá kỷ luật tự động cho các bản ghi vắng/muộn."""
+    evaluations = []
+    for record in records:
+        penalty = ATTENDANCE_PENALTIES[record.status]
+        evaluations.append({
+            "student_user_id": record.student_user_id,
+            "teacher_user_id": teacher_by_class[record.class_id],
+            "class_id": record.class_id,
+            "attendance_id": record.attendance_id,
+            "study_point": penalty.study_point,
+            "discipline_point": penalty.discipline_point,
+            "evaluation_content": penalty.content,
+            "evaluation_type": EvaluationType.discipline,
+            "evaluation_date": record.attendance_date,
+        })
+    return evaluations
+
+
+def _add_penalties(
+    db: Session, records: List[Attendance], teacher_by_class: Dict[int, int], notify: bool = True
+) -> list:
+    """
+    Thông báo (học sinh + phụ huynh) và đánh giá kỷ luật cho các bản ghi vừa có hệ quả:
+    1 query lấy học sinh, mỗi bảng một lệnh INSERT nhiều dòng.
+    notify=False chỉ tạo đánh giá (bản ghi đã có thông báo từ trước).
+    Trả về các dòng evaluation_rollups cần cộng thêm.
+    """
+    if not records:
+        return []
+
+    if notify:
+        # Phụ huynh liên kết qua students.parent_id (= parents.user_id) nên không cần query thêm.
+        student_rows = db.execute(
+            select(Student.user_id, Student.parent_id, User.full_name)
+            .join(User, User.user_id == Student.user_id)
+            .where(Student.user_id.in_({r.student_user_id for r in records}))
+        ).all()
+        student_map = {row.user_id: row for row in student_rows}
+        records = [r for r in records if r.student_user_id in student_map]
+
+        notifications_to_add = []
+        for record in records:
+            student = student_map[record.student_user_id]
+            penalty = ATTENDANCE_PENALTIES[record.status]
+            notification = {
+                "type": NotificationType.warning,
+                "ref_type": NotificationRefType.attendance,
+                "ref_id": record.attendance_id,
+                "event_date": record.attendance_date,
+                "params": {
+                    "date": record.attendance_date.isoformat(),
+                    "student_name": student.full_name,
+                },
+                "is_read": False,
+            }
+            notifications_to_add.append({**notification, "receiver_id": student.user_id, "template": penalty.student_template})
+            if student.parent_id:
+                notifications_to_add.append({
+                    **notification, "receiver_id": student.parent_id, "template": penalty.parent_template
+                })
+        if notifications_to_add:
+            db.execute(insert(Notification), notifications_to_add)
+
+    evaluations_to_add = _penalty_evaluations(records, teacher_by_class)
+    if evaluations_to_add:
+        db.execute(insert(Evaluation), evaluations_to_add)
+    return [
+        (e["student_user_id"], e["class_id"], e["study_point"], e["discipline_point"])
+        for e in evaluations_to_add
+    ]
+
+
+def _apply_status_changes(
+    db: Session,
+    changes: List[Tuple[Attendance, Optional[AttendanceStatus]]],
+    teacher_by_class: Dict[int, int],
+) -> None:
+    """
+    Đồng bộ đánh giá/thông báo theo chênh lệch trạng thái (bản ghi mới, trạng thái cũ hoặc None),
+    xử lý theo tập nên số câu lệnh không phụ thuộc số bản ghi:
+    - chưa có hệ quả -> vắng/muộn: tạo thông báo + đánh giá;
+    - vắng/muộn -> có mặt: xóa thông báo + đánh giá;
+    - vắng <-> muộn: sửa điểm/nội dung đánh giá và đổi template thông báo.
+    Đồng bộ evaluation_rollups. Không commit.
+    """
+    gained, lost, switched, missing_evaluation = [], [], [], []
+    for record, old_status in changes:
+        old_penalty = ATTENDANCE_PENALTIES.get(old_status)
+        new_penalty = ATTENDANCE_PENALTIES.get(record.status)
+        if old_penalty is None and new_penalty is not None:
+            gained.append(record)
+        elif old_penalty is not None and new_penalty is None:
+            lost.append(record)
+        elif old_penalty is not None and old_penalty != new_penalty:
+            switched.append(record)
+
+    linked = _linked_evaluations(db, lost + switched)
+    removed = [
+        (row.student_user_id, row.class_id, row.study_point, row.discipline_point) for row in linked.values()
+    ]
+    added = []
+
+    if lost:
+        lost_ids = [r.attendance_id for r in lost]
+        db.execute(delete(Notification).where(
+            Notification.ref_type == NotificationRefType.attendance, Notification.ref_id.in_(lost_ids)
+        ))
+        lost_evaluations = [linked[i].evaluation_id for i in lost_ids if i in linked]
+        if lost_evaluations:
+            db.execute(delete(Evaluation).where(Evaluation.evaluation_id.in_(lost_evaluations)))
+
+    for status, penalty in ATTENDANCE_PENALTIES.items():
+        group = [r for r in switched if r.status == status]
+        if not group:
+            continue
+        group_ids = [r.attendance_id for r in group]
+        template_map = {}
+        for other in ATTENDANCE_PENALTIES.values():
+            if other != penalty:
+                template_map[other.student_template] = penalty.student_template
+                template_map[other.parent_template] = penalty.parent_template
+        db.execute(
+            update(Notification)
+            .where(Notification.ref_type == NotificationRefType.attendance, Notification.ref_id.in_(group_ids))
+            .values(template=case(template_map, value=Notification.template, else_=Notification.template))
+            .execution_options(synchronize_session=False)
+        )
+        evaluation_links = {linked[i].evaluation_id: i for i in group_ids if i in linked}
+        if evaluation_links:
+            db.execute(
+                update(Evaluation)
+                .where(Evaluation.evaluation_id.in_(evaluation_links))
+                .values(
+                    study_point=penalty.study_point,
+                    discipline_point=penalty.discipline_point,
+                    evaluation_content=penalty.content,
+                    attendance_id=case(evaluation_links, value=Evaluation.evaluation_id),
+                )
+                .execution_options(synchronize_session=False)
+            )
+        # Bản ghi cũ không có đánh giá nào để sửa thì chỉ tạo đánh giá (thông báo đã đổi template ở trên)
+        missing_evaluation.extend(r for r in group if r.attendance_id not in linked)
+        added.extend(
+            (r.student_user_id, r.class_id, penalty.study_point, penalty.discipline_point)
+            for r in group if r.attendance_id in linked
+        )
+
+    added.extend(_add_penalties(db, gained, teacher_by_class))
+    added.extend(_add_penalties(db, missing_evaluation, teacher_by_class, notify=False))
+    evaluation_rollup_crud.apply_evaluation_changes(db, added=added, removed=removed)
+
+
+def _save_attendance_rows(
+    db: Session,
+    rows: List[dict],
+    teacher_by_class: Dict[int, int],
+    before_commit: Optional[Callable[[], None]] = None,
+) -> List[Attendance]:
+    """
+    Ghi các dòng điểm danh đã kiểm tra quyền trong một transaction:
+    một upsert ... RETURNING cho toàn bộ bản ghi (gửi lại buổi đã điểm danh = sửa điểm danh),
+    hệ quả vắng/muộn tính theo chênh lệch trạng thái, một lần commit.
+    `before_commit` cho phép ghi thêm trong cùng transaction (vd. seq của thiết bị).
+    """
+    try:
+        db_records, previous = attendance_crud.upsert_attendance_records(db, rows)
+        _apply_status_changes(
+            db,
+            [(r, previous.get(r.attendance_id)) for r in db_records if previous.get(r.attendance_id) != r.status],
+            teacher_by_class,
+        )
+        if before_commit:
+            before_commit()
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Dữ liệu điểm danh không hợp lệ (lịch học hoặc lớp không tồn tại).")
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    return db_records
+
+
+def _save_attendance_sessions(
+    db: Session, sessions: List[AttendanceBatchCreate], teacher_by_class: Dict[int, int]
+) -> List[Attendance]:
+    """Ghi điểm danh của các buổi đã kiểm tra quyền (xem _save_attendance_rows)."""
+    rows = [row for session in sessions for row in attendance_crud.attendance_rows(session)]
+    keys = {(row["student_user_id"], row["schedule_id"], row["attendance_date"]) for row in rows}
+    if len(keys) != len(rows):
+        raise HTTPException(status_code=400, detail="Một học sinh bị điểm danh nhiều lần trong cùng một buổi học.")
+    return _save_attendance_rows(db, rows, teacher_by_class)
 
-    # 2. Fetch Schedule kèm Class Info (1 Query)
-    schedule = db.query(Schedule).options(joinedload(Schedule.class_info))\
-                 .filter(Schedule.schedule_id == attendance_data.schedule_id).first()
 
-    # 3. Check Permission (Tái sử dụng schedule đã fetch)
-    check_attendance_permission(
+def create_batch_attendance(
+    db: Session, attendance_data: AttendanceBatchCreate, current_user
+) -> List[Attendance]:
+    """
+    Tạo các bản ghi điểm danh ban đầu cho một lớp.
+    Tối ưu: Bulk insert Notification và Evaluation để tránh N+1 query.
+    """
+    # 1. Chuẩn hóa checkin_time trong payload
+    representative_checkin = _normalize_records(attendance_data, datetime.now().time())
+
+    # 2. Check Permission + ngày học (chỉ mục buổi học, không query DB)
+    window = check_attendance_permission(
         db=db,
         schedule_id=attendance_data.schedule_id,
         attendance_date=attendance_data.attendance_date,
         checkin_time=representative_checkin,
         current_user=current_user,
-        schedule_obj=schedule
     )
-    
-    class_info = schedule.class_info
-    teacher_user_id = class_info.teacher_user_id
+    if window.class_id != attendance_data.class_id:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Lịch học {attendance_data.schedule_id} không thuộc lớp {attendance_data.class_id}."
+        )
 
-    # 4. Tạo Attendance Records (Gọi CRUD)
-    try:
-        db_records = attendance_crud.create_initial_attendance_records(db, attendance_data)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    # 3. Ghi điểm danh + xử lý vắng mặt (một transaction)
+    return _save_attendance_sessions(
+        db, [attendance_data], {window.class_id: window.teacher_user_id}
+    )
 
-    # 5. Xử lý logic cho sinh viên vắng mặt (Batch Processing)
-    absent_records = [r for r in db_records if r.status == AttendanceStatus.absent]
-    
-    if absent_records:
-        absent_student_user_ids = [r.student_user_id for r in absent_records]
-        
-        # Lấy thông tin Student và User (để lấy tên gửi thông báo)
-        # Giả định relationship Student -> User thông qua student_user_id
-        students = db.query(Student).options(joinedload(Student.user))\
-                     .filter(Student.user_id.in_(absent_student_user_ids)).all()
-        
-        student_map = {s.user_id: s for s in students}
-
-        # Lấy thông tin Parent (nếu có)
-        parents = db.query(Parent).options(joinedload(Parent.user))\
-                    .filter(Parent.student_id.in_([s.student_id for s in students])).all()
-        
-        # Map student_user_id -> Parent Object
-        # Lưu ý logic này phụ thuộc vào việc Parent liên kết với Student như thế nào
-        # Ở đây giả định Parent có field student_id hoặc quan hệ ngược lại.
-        # Để đơn giản và chính xác với logic cũ, ta tạo map: student_id -> parent
-        parent_map = {p.student_id: p for p in parents}
 
-        notifications_to_add = []
-        evaluations_to_add = []
-
-        for record in absent_records:
-            student = student_map.get(record.student_user_id)
-            if not student: continue
-            
-            student_user = student.user # Object User của học sinh
-
-            # 5.1 Notify Student
-            notifications_to_add.append(Notification(
-                receiver_id=student_user.user_id,
-                content=f"Thông báo: Bạn đã vắng mặt trong buổi học ngày {record.attendance_date}.",
-                type=NotificationType.warning,
-                is_read=False
-            ))
-
-            # 5.2 Notify Parent
-            parent = parent_map.get(student.student_id)
-            if parent and parent.user:
-                notifications_to_add.append(Notification(
-                    receiver_id=parent.user.user_id,
-                    content=f"Thông báo: Con của bạn {student_user.full_name} đã vắng mặt trong buổi học ngày {record.attendance_date}.",
-                    type=NotificationType.warning,
-                    is_read=False
-                ))
-
-            # 5.3 Create Evaluation (Kỷ luật)
-            evaluations_to_add.append(Evaluation(
-                student_user_id=record.student_user_id,
-                teacher_user_id=teacher_user_id,
-                class_id=class_info.class_id,
-                study_point=-5,
-                discipline_point=-5,
-                evaluation_content="Vắng mặt không phép trong buổi học.",
-                evaluation_type=EvaluationType.discipline,
-                created_at=datetime.now()
-            ))
-
-        # Bulk Insert
-        if notifications_to_add:
-            db.add_all(notifications_to_add)
-        if evaluations_to_add:
-            db.add_all(evaluations_to_add)
-        
-        db.commit()
+def create_multi_batch_attendance(
+    db: Session, batch: AttendanceMultiBatchCreate, current_user
+) -> List[Attendance]:
+    """
+    Điểm danh nhiều buổi học (nhiều lịch/lớp) trong một request, ví dụ điểm danh toàn trường.
+    Quyền, ngày học và khung giờ của mọi buổi được kiểm tra qua chỉ mục buổi học trong ngày;
+    toàn bộ bản ghi ghi bằng một upsert ... RETURNING, hệ quả vắng/muộn xử lý chung một lô.
+    Một buổi không hợp lệ thì cả request bị từ chối (không ghi gì).
+    """
+    now_time = datetime.now().time()
+    teacher_by_class: Dict[int, int] = {}
+    for session in batch.sessions:
+        window = check_attendance_permission(
+            db=db,
+            schedule_id=session.schedule_id,
+            attendance_date=session.attendance_date,
+            checkin_time=_normalize_records(session, now_time),
+            current_user=current_user,
+        )
+        if window.class_id != session.class_id:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Lịch học {session.schedule_id} không thuộc lớp {session.class_id}."
+            )
+        teacher_by_class[session.class_id] = window.teacher_user_id
 
-    return db_records
+    return _save_attendance_sessions(db, batch.sessions, teacher_by_class)
+
+# ----------------- Sync thiết bị (offline) -----------------
+# Lệch đồng hồ tối đa chấp nhận giữa thiết bị và máy chủ
+SYNC_CLOCK_SKEW = timedelta(minutes=5)
+# Change set chỉ trả bản ghi cũ hơn khoảng này, để transaction commit muộn
+# (updated_at nhỏ hơn watermark đã trả) không bị thiết bị bỏ sót
+SYNC_SETTLE = timedelta(seconds=5)
+
+
+def _to_server_time(value: datetime) -> datetime:
+    """Giờ thiết bị có múi giờ -> giờ địa phương của máy chủ (naive), như datetime.now()."""
+    if value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def sync_attendance(db: Session, payload: AttendanceSyncRequest, current_user) -> AttendanceSyncResult:
+    """
+    Đồng bộ hàng đợi điểm danh offline của một thiết bị và trả change set các lớp giáo viên dạy.
+
+    - Delta có seq <= seq đã áp dụng của thiết bị bị bỏ qua (gửi lại nhiều lần an toàn).
+    - Quyền và khung giờ kiểm tra theo thời điểm ghi nhận trên thiết bị (recorded_at), không theo
+      giờ máy chủ; tra chỉ mục buổi học nên không query DB cho từng delta.
+    - Delta không hợp lệ bị từ chối riêng lẻ (trả về trong `rejected`), không chặn cả hàng đợi.
+    - Nhiều delta cùng một buổi của một học sinh: delta có seq lớn nhất thắng.
+    - Ghi điểm danh (upsert + hệ quả theo chênh lệch) và seq của thiết bị cùng một transaction.
+    """
+    teacher_user_id = current_user.user_id
+    last_seq = device_sync_crud.get_last_seq(db, teacher_user_id, payload.device_id)
+    pending = sorted((d for d in payload.deltas if d.seq > last_seq), key=lambda d: d.seq)
+
+    rejected: List[AttendanceSyncRejected] = []
+    applied = 0
+    if pending:
+        server_now = datetime.now()
+        latest: Dict[Tuple[int, int, dt_date], dict] = {}
+        teacher_by_class: Dict[int, int] = {}
+        # Học sinh không tồn tại/không học lớp của buổi bị từ chối theo từng delta (1 query cho cả lô)
+        enrolled = enrollment_crud.get_active_enrollment_pairs(db, {d.student_user_id for d in pending})
+        for delta in pending:
+            recorded_at = _to_server_time(delta.recorded_at)
+            try:
+                if recorded_at > server_now + SYNC_CLOCK_SKEW:
+                    raise HTTPException(status_code=400, detail="Thời điểm ghi nhận nằm ở tương lai.")
+                if recorded_at.date() != delta.attendance_date:
+                    raise HTTPException(status_code=400, detail="Thời điểm ghi nhận không thuộc ngày điểm danh.")
+                window = check_attendance_permission(
+                    db=db,
+                    schedule_id=delta.schedule_id,
+                    attendance_date=delta.attendance_date,
+                    checkin_time=recorded_at.time(),
+                    current_user=current_user,
+                )
+                if (delta.student_user_id, window.class_id) not in enrolled:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Học sinh {delta.student_user_id} không học lớp {window.class_id}.",
+                    )
+            except HTTPException as e:
+                rejected.append(AttendanceSyncRejected(seq=delta.seq, detail=e.detail))
+                continue
+
+            checkin_time = delta.checkin_time
+            if checkin_time is None and delta.status != AttendanceStatus.absent:
+                checkin_time = recorded_at.time()
+            latest[(delta.student_user_id, delta.schedule_id, delta.attendance_date)] = {
+                "student_user_id": delta.student_user_id,
+                "schedule_id": delta.schedule_id,
+                "class_id": window.class_id,
+                "attendance_date": delta.attendance_date,
+                "status": delta.status,
+                "checkin_time": _to_naive_time(checkin_time),
+            }
+            teacher_by_class[window.class_id] = window.teacher_user_id
+
+        new_seq = pending[-1].seq
+
+        def save_seq():
+            device_sync_crud.save_last_seq(db, teacher_user_id, payload.device_id, new_seq)
+
+        if latest:
+            _save_attendance_rows(db, list(latest.values()), teacher_by_class, before_commit=save_seq)
+        else:
+            save_seq()
+            db.commit()
+        last_seq = new_seq
+        applied = len(pending) - len(rejected)
+
+    since = (payload.since.updated_at, payload.since.attendance_id) if payload.since else None
+    changes = attendance_crud.get_attendance_changes(
+        db, teacher_user_id, until=datetime.utcnow() - SYNC_SETTLE, since=since, limit=payload.limit + 1
+    )
+    has_more = len(changes) > payload.limit
+    changes = changes[:payload.limit]
+    if changes:
+        watermark = SyncWatermark(updated_at=changes[-1].updated_at, attendance_id=changes[-1].attendance_id)
+    else:
+        watermark = payload.since
+
+    return AttendanceSyncResult(
+        last_seq=last_seq,
+        applied=applied,
+        rejected=rejected,
+        changes=[AttendanceChange.model_validate(c) for c in changes],
+        watermark=watermark,
+        has_more=has_more,
+    )
 
 # ----------------- Update Late (Optimized) -----------------
 def update_late_attendance(
@@ -223,16 +540,10 @@ def update_late_attendance(
 ) -> Optional[Attendance]:
     """
     Cập nhật trạng thái đi muộn.
-    Tối ưu: Sử dụng eager load để giảm query.
+    Tối ưu: quyền kiểm tra qua chỉ mục buổi học, không cần load schedule/class.
     """
-    # Fetch record kèm theo tất cả quan hệ cần thiết để xử lý logic sau đó
     attendance_record = (
         db.query(Attendance)
-        .options(
-            joinedload(Attendance.schedule).joinedload(Schedule.class_info),
-            joinedload(Attendance.student).joinedload(Student.user), # Load user info của HS
-            joinedload(Attendance.student).joinedload(Student.parent).joinedload(Parent.user) # Load phụ huynh
-        )
         .filter(
             Attendance.student_user_id == student_user_id,
             Attendance.schedule_id == schedule_id,
@@ -244,56 +555,29 @@ def update_late_attendance(
     if not attendance_record or attendance_record.status != AttendanceStatus.absent:
         return None
 
-    # Check permission (dùng lại object đã load)
-    check_attendance_permission(
+    # Check permission (chỉ mục buổi học)
+    window = check_attendance_permission(
         db=db,
         schedule_id=schedule_id,
         attendance_date=attendance_date,
         checkin_time=checkin_time,
         current_user=current_user,
-        schedule_obj=attendance_record.schedule
     )
 
-    # Update Status (Update trực tiếp trên object SQLAlchemy)
-    attendance_record.status = AttendanceStatus.late
-    attendance_record.checkin_time = checkin_time
-    
-    # Update Evaluation (Logic nghiệp vụ)
-    teacher_user_id = attendance_record.schedule.class_info.teacher_user_id
-    evaluation_service.update_late_evaluation(
-        db=db,
-        student_user_id=student_user_id,
-        teacher_user_id=teacher_user_id,
-        attendance_date=attendance_date,
-        new_content="Đi học muộn",
-        study_point_penalty=-2,
-        discipline_point_penalty=-2,
+    # Upsert trạng thái muộn, đánh giá/thông báo đi theo chênh lệch absent -> late
+    db_records, previous = attendance_crud.upsert_attendance_records(db, [{
+        "student_user_id": student_user_id,
+        "schedule_id": schedule_id,
+        "class_id": attendance_record.class_id,
+        "attendance_date": attendance_date,
+        "status": AttendanceStatus.late,
+        "checkin_time": checkin_time,
+    }])
+    _apply_status_changes(
+        db,
+        [(db_records[0], previous.get(db_records[0].attendance_id))],
+        {window.class_id: window.teacher_user_id},
     )
-
-    # Update Notifications (Search tối ưu hơn dùng LIKE đơn thuần nếu có thể)
-    # Logic: Tìm notif warning chưa đọc của HS/PH có nội dung chứa ngày điểm danh
-    student_user = attendance_record.student.user
-    parent_obj = attendance_record.student.parent
-    parent_user = parent_obj.user if parent_obj else None
-
-    receiver_ids = [student_user.user_id]
-    if parent_user:
-        receiver_ids.append(parent_user.user_id)
-    
-    # Tìm notifications liên quan
-    notifs = db.query(Notification).filter(
-        Notification.receiver_id.in_(receiver_ids),
-        Notification.type == NotificationType.warning,
-        Notification.is_read == False,
-        Notification.content.like(f"%{attendance_record.attendance_date}%") 
-    ).all()
-
-    for notif in notifs:
-        if notif.receiver_id == student_user.user_id:
-            notif.content = f"Thông báo: Bạn đã đi học muộn trong buổi học ngày {attendance_record.attendance_date}."
-        elif parent_user and notif.receiver_id == parent_user.user_id:
-            notif.content = f"Thông báo: Con của bạn {student_user.full_name} đi học muộn trong buổi học ngày {attendance_record.attendance_date}."
-    
     db.commit()
     db.refresh(attendance_record)
     return attendance_record
@@ -316,11 +600,11 @@ def get_attendances(
     if schedule_id:
         query = query.filter(Attendance.schedule_id == schedule_id)
 
-    # Nếu user là giáo viên, chỉ cho phép xem điểm danh của lớp mình dạy
-    if current_user and "teacher" in current_user.roles:
-        # Join với Schedule -> Class để filter theo teacher_user_id
-        query = query.join(Attendance.schedule).join(Schedule.class_info)\
-                     .filter(Class.teacher_user_id == current_user.user_id)
+    # Phạm vi theo vai trò (policy_service): giáo viên chỉ xem lớp mình dạy, ...
+    if current_user:
+        query = query.filter(policy_service.row_scope(
+            current_user, class_column=Attendance.class_id, student_column=Attendance.student_user_id
+        ))
 
     return query.all()
 
@@ -339,4 +623,43 @@ def get_all_attendances_no_auth(
     if schedule_id is not None:
         query = query.filter(Attendance.schedule_id == schedule_id)
 
-    return query.all()
\ No newline at end of file
+    return query.all()
+
+# ----------------- Stats (đọc từ attendance_rollups) -----------------
+def get_attendance_stats(
+    db: Session,
+    current_user,
+    class_id: Optional[int] = None,
+    student_user_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[AttendanceStats]:
+    """
+    Thống kê điểm danh theo (học sinh, lớp), O(số học sinh) thay vì quét attendances.
+    Phạm vi theo vai trò (policy_service): manager xem tất cả, teacher xem lớp mình dạy,
+    student xem của mình, parent xem của con.
+    """
+    rollups = attendance_rollup_crud.get_attendance_rollups(
+        db,
+        class_id=class_id,
+        student_user_id=student_user_id,
+        scope=policy_service.row_scope(
+            current_user,
+            class_column=AttendanceRollup.class_id,
+            student_column=AttendanceRollup.student_user_id,
+        ),
+        skip=skip,
+        limit=limit,
+    )
+    return [
+        AttendanceStats(
+            student_user_id=r.student_user_id,
+            class_id=r.class_id,
+            present_count=r.present_count,
+            late_count=r.late_count,
+            absent_count=r.absent_count,
+            total_count=r.total_count,
+            attendance_rate=round(r.present_count * 100 / r.total_count, 1) if r.total_count else 0,
+        )
+        for r in rollups
+    ]
@@ -1,15 +1,16 @@
-from datetime import date
 from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session, aliased
-from sqlalchemy import and_, case, join, select, func, literal
+from sqlalchemy import and_, join, select, func, literal
 from fastapi import HTTPException
 
-from app.models.evaluation_model import Evaluation, EvaluationType
+from app.models.evaluation_model import Evaluation
+from app.models.evaluation_rollup_model import EvaluationRollup
 from app.models.class_model import Class
 from app.models.subject_model import Subject
 from app.models.user_model import User
 from app.models.student_model import Student
 from app.schemas.evaluation_schema import EvaluationSummary, EvaluationView
+from app.services import policy_service
 
 # --- Global Aliases (Tạo 1 lần dùng chung để tối ưu bộ nhớ & tốc độ khởi tạo) ---
 TeacherUser = aliased(User, name="teacher_user")
@@ -31,6 +32,19 @@ def _enforce_student_access_or_raise(
         if requesting_user_id is None or requesting_user_id != target_student_user_id:
             raise HTTPException(status_code=403, detail="Học sinh chỉ được xem thông tin của chính mình.")
 
+def _evaluation_scope(
+    requesting_user_id: Optional[int], requesting_user_roles: Optional[List[str]], table=Evaluation
+):
+    """
+    Predicate phân quyền theo dòng (policy_service) cho evaluations/evaluation_rollups:
+    giáo viên chỉ thấy lớp mình dạy, phụ huynh chỉ thấy con mình. Không có ngữ cảnh người dùng -> không giới hạn.
+    """
+    return policy_service.row_scope(
+        policy_service.principal(requesting_user_id, requesting_user_roles),
+        class_column=table.class_id,
+        student_column=table.student_user_id,
+    )
+
 # --- Main Functions ---
 
 def get_evaluations_by_student_user_id_forCal(
@@ -70,6 +84,7 @@ def get_evaluations_by_student_user_id(
         .join(ClassTable, Evaluation.class_id == ClassTable.class_id)
         .join(SubjectTable, ClassTable.subject_id == SubjectTable.subject_id)
         .where(Evaluation.student_user_id == student_user_id)
+        .where(_evaluation_scope(requesting_user_id, requesting_user_roles))
         .offset(skip)
         .limit(limit)
     )
@@ -112,6 +127,7 @@ def get_all_evaluations_with_names(
         .join(StudentUser, Evaluation.student_user_id == StudentUser.user_id)
         .join(ClassTable, Evaluation.class_id == ClassTable.class_id)
         .join(SubjectTable, ClassTable.subject_id == SubjectTable.subject_id)
+        .where(_evaluation_scope(requesting_user_id, requesting_user_roles))
         .offset(skip)
         .limit(limit)
     )
@@ -153,6 +169,7 @@ def get_evaluations_by_teacher_user_id(
         .join(ClassTable, Evaluation.class_id == ClassTable.class_id)
         .join(SubjectTable, ClassTable.subject_id == SubjectTable.subject_id)
         .where(Evaluation.teacher_user_id == teacher_user_id)
+        .where(_evaluation_scope(requesting_user_id, requesting_user_roles))
         .offset(skip)
         .limit(limit)
     )
@@ -178,13 +195,16 @@ def calculate_total_points_for_student(
 ) -> Dict[str, Any]:
     _enforce_student_access_or_raise(requesting_user_id, requesting_user_roles, student_user_id)
 
-    # Sử dụng coalesce để trả về 0 nếu sum là NULL
+    # Đọc từ evaluation_rollups (tiền tố khóa chính), coalesce để trả về 0 nếu chưa có
     stmt = (
         select(
-            func.coalesce(func.sum(Evaluation.study_point), 0).label("total_study_point"),
-            func.coalesce(func.sum(Evaluation.discipline_point), 0).label("total_discipline_point"),
+            func.coalesce(func.sum(EvaluationRollup.total_study_point), 0).label("total_study_point"),
+            func.coalesce(func.sum(EvaluationRollup.total_discipline_point), 0).label("total_discipline_point"),
+        )
+        .where(
+            EvaluationRollup.student_user_id == student_user_id,
+            _evaluation_scope(requesting_user_id, requesting_user_roles, EvaluationRollup),
         )
-        .where(Evaluation.student_user_id == student_user_id)
     )
     row = db.execute(stmt).first()
     
@@ -194,15 +214,6 @@ def calculate_total_points_for_student(
         "final_discipline_point": row.total_discipline_point,
     }
 
-def summarize_end_of_semester(db: Session, student_user_id: int) -> Dict[str, Any]:
-    total_points = calculate_total_points_for_student(db, student_user_id)
-    # Logic min(..., 100)
-    return {
-        "student_user_id": student_user_id,
-        "final_study_point": min(total_points["final_study_point"], 100),
-        "final_discipline_point": min(total_points["final_discipline_point"], 100),
-    }
-
 def get_evaluations_summary_of_student_in_class(
     db: Session,
     student_user_id: int,
@@ -211,74 +222,50 @@ def get_evaluations_summary_of_student_in_class(
     requesting_user_roles: Optional[List[str]] = None
 ) -> EvaluationSummary:
     """
-    Tối ưu hóa: Sử dụng SQL Aggregation thay vì Python loop.
-    Tính tổng điểm và đếm số lần cộng/trừ điểm trực tiếp từ DB.
+    Đọc tổng điểm và số lần cộng/trừ điểm từ evaluation_rollups (khóa chính),
+    kèm tên lớp/môn trong cùng một query.
     """
     _enforce_student_access_or_raise(requesting_user_id, requesting_user_roles, student_user_id)
 
     stmt = (
         select(
-            func.coalesce(func.sum(Evaluation.study_point), 0).label("total_study"),
-            func.coalesce(func.sum(Evaluation.discipline_point), 0).label("total_discipline"),
-            func.sum(case((Evaluation.study_point > 0, 1), else_=0)).label("study_plus"),
-            func.sum(case((Evaluation.study_point < 0, 1), else_=0)).label("study_minus"),
-            func.sum(case((Evaluation.discipline_point > 0, 1), else_=0)).label("discipline_plus"),
-            func.sum(case((Evaluation.discipline_point < 0, 1), else_=0)).label("discipline_minus"),
-            ClassTable.class_name,
-            SubjectTable.name.label("subject_name")
+            Class.class_name,
+            Subject.name.label("subject_name"),
+            EvaluationRollup.total_study_point,
+            EvaluationRollup.total_discipline_point,
+            EvaluationRollup.study_plus_count,
+            EvaluationRollup.study_minus_count,
+            EvaluationRollup.discipline_plus_count,
+            EvaluationRollup.discipline_minus_count,
         )
-        .join(ClassTable, Evaluation.class_id == ClassTable.class_id)
-        .join(SubjectTable, ClassTable.subject_id == SubjectTable.subject_id)
-        .where(
+        .join(Subject, Class.subject_id == Subject.subject_id)
+        .outerjoin(
+            EvaluationRollup,
             and_(
-                Evaluation.student_user_id == student_user_id,
-                Evaluation.class_id == class_id
-            )
+                EvaluationRollup.class_id == Class.class_id,
+                EvaluationRollup.student_user_id == student_user_id,
+                _evaluation_scope(requesting_user_id, requesting_user_roles, EvaluationRollup),
+            ),
         )
-        .group_by(ClassTable.class_name, SubjectTable.name)
+        .where(Class.class_id == class_id)
     )
 
     row = db.execute(stmt).first()
 
-    # Trường hợp chưa có evaluation nào -> Query riêng tên lớp/môn để trả về object rỗng
-    if not row:
-        class_info = (
-            db.query(Class.class_name, Subject.name)
-            .join(Subject, Class.subject_id == Subject.subject_id)
-            .filter(Class.class_id == class_id)
-            .first()
-        )
-        
-        c_name = class_info.class_name if class_info else ""
-        s_name = class_info.name if class_info else ""
-
-        return EvaluationSummary(
-            student_user_id=student_user_id,
-            class_name=c_name,
-            subject=s_name,
-            final_study_point=100,       # Mặc định 100
-            final_discipline_point=100,  # Mặc định 100
-            study_plus_count=0,
-            study_minus_count=0,
-            discipline_plus_count=0,
-            discipline_minus_count=0
-        )
-
-    # Tính điểm cuối cùng: Mặc định 100 + delta, max 100
-    # Logic cũ: total_study_point = 100 + sum(delta)
-    final_s_point = 100 + row.total_study
-    final_d_point = 100 + row.total_discipline
+    # Tính điểm cuối cùng: Mặc định 100 + delta, max 100 (chưa có evaluation -> 100)
+    total_study = (row.total_study_point or 0) if row else 0
+    total_discipline = (row.total_discipline_point or 0) if row else 0
 
     return EvaluationSummary(
         student_user_id=student_user_id,
-        class_name=row.class_name,
-        subject=row.subject_name,
-        final_study_point=min(final_s_point, 100),
-        final_discipline_point=min(final_d_point, 100),
-        study_plus_count=row.study_plus or 0,
-        study_minus_count=row.study_minus or 0,
-        discipline_plus_count=row.discipline_plus or 0,
-        discipline_minus_count=row.discipline_minus or 0
+        class_name=row.class_name if row else "",
+        subject=row.subject_name if row else "",
+        final_study_point=min(100 + total_study, 100),
+        final_discipline_point=min(100 + total_discipline, 100),
+        study_plus_count=(row.study_plus_count or 0) if row else 0,
+        study_minus_count=(row.study_minus_count or 0) if row else 0,
+        discipline_plus_count=(row.discipline_plus_count or 0) if row else 0,
+        discipline_minus_count=(row.discipline_minus_count or 0) if row else 0
     )
 
 def get_evaluations_by_student_in_class(
@@ -314,6 +301,7 @@ def get_evaluations_by_student_in_class(
                 Evaluation.class_id == class_id
             )
         )
+        .where(_evaluation_scope(requesting_user_id, requesting_user_roles))
         .offset(skip)
         .limit(limit)
     )
@@ -333,46 +321,6 @@ def get_evaluations_by_student_in_class(
         for row in rows
     ]
 
-def update_late_evaluation(
-    db: Session,
-    student_user_id: int,
-    teacher_user_id: int,
-    attendance_date: date,
-    new_content: str,
-    study_point_penalty: int = 0,
-    discipline_point_penalty: int = 0,
-    evaluation_type: EvaluationType = EvaluationType.discipline
-) -> Evaluation:
-    """
-    Cập nhật hoặc tạo mới evaluation (Upsert logic).
-    """
-    evaluation_record = db.query(Evaluation).filter(
-        Evaluation.student_user_id == student_user_id,
-        Evaluation.teacher_user_id == teacher_user_id,
-        Evaluation.evaluation_type == evaluation_type,
-        Evaluation.evaluation_date == attendance_date
-    ).first()
-
-    if evaluation_record:
-        evaluation_record.evaluation_content = new_content
-        evaluation_record.study_point = study_point_penalty
-        evaluation_record.discipline_point = discipline_point_penalty
-    else:
-        evaluation_record = Evaluation(
-            student_user_id=student_user_id,
-            teacher_user_id=teacher_user_id,
-            evaluation_date=attendance_date,
-            evaluation_content=new_content,
-            study_point=study_point_penalty,
-            discipline_point=discipline_point_penalty,
-            evaluation_type=evaluation_type
-        )
-        db.add(evaluation_record)
-
-    db.commit()
-    db.refresh(evaluation_record)
-    return evaluation_record
-
 def get_parent_children_evaluation(
     db: Session, parent_user_id: int, skip: int = 0, limit: int = 100,
     requesting_user_id: Optional[int] = None, requesting_user_roles: Optional[List[str]] = None
@@ -398,6 +346,7 @@ def get_parent_children_evaluation(
         .join(ClassTable, Evaluation.class_id == ClassTable.class_id)
         .join(SubjectTable, ClassTable.subject_id == SubjectTable.subject_id)
         .where(StudentTable.parent_id == parent_user_id) # Lọc theo parent_id
+        .where(_evaluation_scope(requesting_user_id, requesting_user_roles))
         .offset(skip)
         .limit(limit)
     )
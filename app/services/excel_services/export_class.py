@@ -1,8 +1,6 @@
 from sqlalchemy.orm import Session
 from openpyxl import Workbook # type: ignore
 from openpyxl.utils import get_column_letter # type: ignore
-from fastapi.responses import StreamingResponse
-from io import BytesIO
 
 from app.models.class_model import Class
 from app.models.teacher_model import Teacher
@@ -10,9 +8,9 @@ from app.models.student_model import Student
 from app.models.user_model import User
 from app.models.enrollment_model import Enrollment, EnrollmentStatus
 
-def export_class(db: Session, class_id: int):
+def build_class_workbook(db: Session, class_id: int) -> Workbook:
     """
-    Xuất dữ liệu lớp học ra Excel:
+    Dựng workbook dữ liệu lớp học:
     - B1: class_name
     - D1: teacher full_name
     - B3-D3: header
@@ -92,15 +90,10 @@ def export_class(db: Session, class_id: int):
         adjusted_width = (max_length + 2)
         ws.column_dimensions[col_letter].width = adjusted_width
 
-    # Export to response
-    stream = BytesIO()
-    wb.save(stream)
-    stream.seek(0)
+    return wb
 
-    filename = f"class_{class_id}.xlsx"
-    headers = {"Content-Disposition": f"attachment; filename={filename}"}
-    return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers=headers
-    )
\ No newline at end of file
+
+def export_class_to_file(db: Session, class_id: int, path: str) -> str:
+    """Xuất dữ liệu lớp học ra file Excel trên đĩa (dùng cho job chạy nền), trả về tên file gợi ý."""
+    build_class_workbook(db, class_id).save(path)
+    return f"class_{class_id}.xlsx"
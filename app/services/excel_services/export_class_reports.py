@@ -0,0 +1,65 @@
+from typing import Callable, List, Optional
+from sqlalchemy.orm import Session
+from openpyxl import Workbook # type: ignore
+
+from app.services import report_service
+
+SUMMARY_HEADER = ["Class ID", "Class", "Students", "Avg GPA", "Avg study point", "Avg discipline point"]
+STUDENT_HEADER = ["STT", "Student ID", "Full name", "GPA", "Study point", "Discipline point", "Attendance (%)"]
+
+
+def _sheet_title(report: dict, used: set) -> str:
+    """Tên sheet theo lớp: tối đa 31 ký tự, bỏ ký tự Excel không cho phép, không trùng."""
+    name = f"{report['class_id']} {report['class_name'] or ''}"
+    name = "".join(ch for ch in name if ch not in '[]:*?/\\').strip()[:31]
+    title, n = name, 1
+    while title.lower() in used:
+        suffix = f"~{n}"
+        title, n = name[:31 - len(suffix)] + suffix, n + 1
+    used.add(title.lower())
+    return title
+
+
+def export_class_reports_to_file(
+    db: Session,
+    class_ids: List[int],
+    path: str,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> dict:
+    """
+    Xuất báo cáo của nhiều lớp vào một workbook: sheet "Summary" + mỗi lớp một sheet.
+    Dữ liệu lấy theo lô từ report_service.iter_class_reports; workbook ở chế độ write_only
+    để bộ nhớ không tăng theo số lớp. on_progress nhận phần trăm hoàn thành (0-100).
+    """
+    wb = Workbook(write_only=True)
+    summary = wb.create_sheet("Summary")
+    summary.append(SUMMARY_HEADER)
+    used_titles = {"summary"}
+
+    total = len(class_ids)
+    last_progress = -1
+    for done, report in enumerate(report_service.iter_class_reports(db, class_ids), start=1):
+        summary.append([
+            report["class_id"], report["class_name"], report["total_students"],
+            report["avg_gpa"], report["avg_study_point"], report["avg_discipline_point"],
+        ])
+
+        ws = wb.create_sheet(_sheet_title(report, used_titles))
+        ws.append([f"Class: {report['class_name']}"])
+        ws.append([])
+        ws.append(STUDENT_HEADER)
+        for idx, st in enumerate(report["students"], start=1):
+            ws.append([
+                idx, st["id"], st["name"], st["gpa"],
+                st["study_point"], st["discipline_point"], st["attendance"],
+            ])
+
+        # Chỉ báo tiến độ khi phần trăm thay đổi để không ghi bảng jobs sau mỗi lớp;
+        # 100% chỉ đạt được khi file đã lưu xong
+        progress = done * 99 // total
+        if on_progress and progress != last_progress:
+            on_progress(progress)
+            last_progress = progress
+
+    wb.save(path)
+    return {"filename": "class_reports.xlsx", "classes": total}
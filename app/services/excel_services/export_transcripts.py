@@ -0,0 +1,55 @@
+from io import BytesIO
+from typing import List
+from openpyxl import Workbook # type: ignore
+from fastapi.responses import StreamingResponse
+
+from app.services.transcript_service import transcript_rows
+
+SUMMARY_HEADER = [
+    "Student ID", "Full name", "Class ID", "Class", "Subject", "Teacher",
+    "Tests", "GPA", "Study point", "Discipline point", "Attendance (%)",
+]
+TESTS_HEADER = ["Student ID", "Full name", "Class", "Test", "Type", "Score", "Exam date"]
+
+
+def build_transcripts_workbook(transcripts: List[dict]) -> Workbook:
+    """
+    Workbook bảng điểm:
+    - Sheet "Transcript": mỗi dòng một học sinh - lớp (dạng bảng của transcript_service)
+    - Sheet "Tests": chi tiết từng bài kiểm tra
+    """
+    wb = Workbook(write_only=True)
+
+    ws = wb.create_sheet("Transcript")
+    ws.append(SUMMARY_HEADER)
+    for row in transcript_rows(transcripts):
+        ws.append([
+            row["student_user_id"], row["full_name"], row["class_id"], row["class_name"],
+            row["subject_name"], row["teacher_name"], row["test_count"], row["gpa"],
+            row["study_point"], row["discipline_point"], row["attendance_rate"],
+        ])
+
+    ws = wb.create_sheet("Tests")
+    ws.append(TESTS_HEADER)
+    for t in transcripts:
+        for c in t["classes"]:
+            for test in c["tests"]:
+                ws.append([
+                    t["student_user_id"], t["full_name"], c["class_name"], test["test_name"],
+                    test["test_type"], test["score"], test["exam_date"].strftime("%d/%m/%Y"),
+                ])
+    return wb
+
+
+def export_transcripts(transcripts: List[dict], filename: str) -> StreamingResponse:
+    """Xuất bảng điểm ra Excel và trả về trực tiếp trong response."""
+    stream = BytesIO()
+    build_transcripts_workbook(transcripts).save(stream)
+    stream.seek(0)
+
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+    return StreamingResponse(
+        stream,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers=headers
+    )
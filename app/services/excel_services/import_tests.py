@@ -1,54 +1,117 @@
 # app/services/excel_test_service.py
-from fastapi import UploadFile
+from fastapi import HTTPException
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from openpyxl import load_workbook  # type: ignore
-from io import BytesIO
-from app.models.class_model import Class
-from app.schemas.test_schema import TestCreate
-from app.crud import test_crud
+from app.models.enrollment_model import Enrollment
+from app.models.test_model import Test, TestTypeEnum
+from app.crud import class_crud
+from app.services.test_service import validate_teacher_class
 from .. import service_helper
+from .upload_reader import open_excel_file
 
-def import_tests_from_excel(db: Session, file: UploadFile, class_id: int, current_user):
-    try:
-        contents = file.file.read()
-        workbook = load_workbook(filename=BytesIO(contents), data_only=True)
 
-        ws = workbook.active
-        test_rows = []
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            # row: [STT, test_name, student_user_id, student_name, class, subject, score, exam_date]
-            test_name = (row[1] or "").strip() if row[1] else ""
+def _parse_test_type(value) -> TestTypeEnum:
+    """Cột loại bài kiểm tra là tùy chọn; để trống thì mặc định Other."""
+    if value is None or str(value).strip() == "":
+        return TestTypeEnum.Other
+    return TestTypeEnum(str(value).strip())
+
+
+def _parse_rows(rows):
+    """
+    Chuyển lazily các dòng (số dòng, giá trị) thành (số dòng, dict, lỗi).
+    row: [STT, test_name, student_user_id, student_name, score, exam_date, test_type?]
+    """
+    for row_idx, row in rows:
+        row = tuple(row) + (None,) * (7 - len(row))
+        try:
+            test_name = str(row[1]).strip() if row[1] else ""
             student_user_id = int(row[2]) if row[2] else None
             score = float(row[4]) if row[4] is not None else None
             exam_date = service_helper.parse_date_safe(row[5])
+            test_type = _parse_test_type(row[6])
+        except (ValueError, TypeError) as e:
+            yield row_idx, None, f"Dữ liệu không hợp lệ: {e}"
+            continue
+
+        if not (test_name and student_user_id and score is not None and exam_date):
+            yield row_idx, None, "Thiếu tên bài, mã học sinh, điểm hoặc ngày kiểm tra"
+            continue
+
+        yield row_idx, {
+            "test_name": test_name,
+            "student_user_id": student_user_id,
+            "score": score,
+            "exam_date": exam_date,
+            "test_type": test_type,
+        }, None
+
+
+def import_tests_from_path(db: Session, path: str, class_id: int, current_user):
+    """Import điểm kiểm tra từ file đã lưu trên đĩa (dùng cho job chạy nền)."""
+    validate_teacher_class(db, current_user, class_id)
+    with open_excel_file(path) as upload:
+        parsed = list(_parse_rows(upload.iter_rows()))
+    return import_parsed_tests(db, parsed, class_id)
+
 
-            if not (test_name and student_user_id and score is not None and exam_date):
-                continue
+def import_parsed_tests(db: Session, parsed: list, class_id: int):
+    """
+    Import điểm kiểm tra theo lô:
+    - Validate enrollment và trùng (student_user_id + test_name) bằng 2 query tập hợp.
+    - Insert toàn bộ dòng hợp lệ bằng 1 câu lệnh, commit 1 lần.
+    Trả về số dòng đã import và danh sách lỗi theo từng dòng.
+    """
+    db_class = class_crud.get_class(db, class_id=class_id)
+    if db_class is None:
+        raise HTTPException(status_code=404, detail=f"Class with id {class_id} not found.")
+    teacher_user_id = db_class.teacher_user_id
 
-            test_rows.append({
-                "test_name": test_name,
-                "student_user_id": student_user_id,
-                "score": score,
-                "exam_date": exam_date,
+    errors = [{"row": row_idx, "error": error} for row_idx, _, error in parsed if error]
+    candidates = [(row_idx, data) for row_idx, data, error in parsed if not error]
+
+    student_ids = {data["student_user_id"] for _, data in candidates}
+    test_names = {data["test_name"] for _, data in candidates}
+
+    # Query 1: các học sinh đang học trong lớp
+    enrolled = {
+        sid for (sid,) in db.query(Enrollment.student_user_id).filter(
+            Enrollment.class_id == class_id,
+            Enrollment.student_user_id.in_(student_ids),
+            Enrollment.enrollment_status == "active",
+        ).all()
+    } if student_ids else set()
+
+    # Query 2: các cặp (học sinh, tên bài) đã tồn tại
+    existing = set(
+        db.query(Test.student_user_id, Test.test_name).filter(
+            Test.student_user_id.in_(student_ids),
+            Test.test_name.in_(test_names),
+        ).all()
+    ) if student_ids else set()
+
+    rows = []
+    for row_idx, data in candidates:
+        key = (data["student_user_id"], data["test_name"])
+        if data["student_user_id"] not in enrolled:
+            errors.append({
+                "row": row_idx,
+                "error": f"Student {data['student_user_id']} is not actively enrolled in class {class_id}",
+            })
+        elif key in existing:
+            errors.append({
+                "row": row_idx,
+                "error": f"Student {data['student_user_id']} đã có test '{data['test_name']}'",
             })
+        else:
+            # Đánh dấu luôn để bắt trùng lặp ngay trong file
+            existing.add(key)
+            rows.append({**data, "class_id": class_id, "teacher_user_id": teacher_user_id})
+
+    if rows:
+        db.execute(insert(Test), rows)
+        class_crud.bump_data_version(db, class_id)
+        db.commit()
 
-        db_class = db.query(Class).filter(Class.class_id == class_id).first()
-        if not db_class:
-            raise ValueError(f"Class with id {class_id} not found")
-
-        created_tests = []
-        for r in test_rows:
-            test_in = TestCreate(
-                test_name=r["test_name"],
-                student_user_id=r["student_user_id"],
-                class_id=class_id,
-                score=r["score"],
-                exam_date=r["exam_date"],
-            )
-            db_test = test_crud.create_test(db, test_in, current_user) 
-            created_tests.append(db_test)
-
-        return {"imported": len(created_tests)}
-
-    except Exception as e:
-        raise RuntimeError(f"Import tests failed: {str(e)}")
+    errors.sort(key=lambda e: e["row"])
+    return {"imported": len(rows), "errors": errors}
@@ -1,61 +1,56 @@
-from fastapi import UploadFile
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from openpyxl import load_workbook  # type: ignore
-from io import BytesIO
 
 from .. import service_helper
+from .upload_reader import ExcelUpload, open_excel_file
 from app.schemas.user_schema import UserCreate
 from app.schemas.user_role_schema import UserRoleCreate
 from app.schemas.student_schema import StudentCreate
 from app.schemas.parent_schema import ParentCreate
+from app.models.student_model import Student
 
 from app.crud.user_crud import create_user
 from app.crud.user_role_crud import create_user_role
-from app.crud.student_crud import create_student, get_student
+from app.crud.student_crud import create_student
 from app.crud.parent_crud import create_parent
 
 
-def import_users(file: UploadFile, db: Session):
-    try:
-        contents = file.file.read()
-        workbook = load_workbook(filename=BytesIO(contents), data_only=True)
+def _clean_rows(rows):
+    """Lazily bỏ cột A (STT), chuẩn hóa ô thành chuỗi và chỉ giữ dòng có email."""
+    for _, row in rows:
+        row = row[1:]  # bỏ cột A (STT)
+        clean_row = [str(cell).strip() if cell is not None else "" for cell in row]
+        if clean_row and clean_row[0] and "@" in clean_row[0]:
+            yield clean_row
 
-        # --- Đọc sheet Student ---
-        if "Student" not in workbook.sheetnames:
-            raise ValueError("Excel file must contain a 'Student' sheet")
-        ws_student = workbook["Student"]
-        student_rows = []
-        for row in ws_student.iter_rows(min_row=2, values_only=True):
-            row = row[1:]  # bỏ cột A (STT)
-            clean_row = [str(cell).strip() if cell is not None else "" for cell in row]
-            if clean_row[0] and "@" in clean_row[0]:
-                student_rows.append(clean_row)
 
-        email_to_student_id = import_students(db, student_rows)
+def import_users_from_path(db: Session, path: str):
+    """Import người dùng từ file đã lưu trên đĩa (dùng cho job chạy nền)."""
+    with open_excel_file(path) as upload:
+        return import_users_from_workbook(db, upload)
 
-        # --- Đọc sheet Parent ---
-        if "Parent" not in workbook.sheetnames:
-            raise ValueError("Excel file must contain a 'Parent' sheet")
-        ws_parent = workbook["Parent"]
-        parent_rows = []
-        for row in ws_parent.iter_rows(min_row=2, values_only=True):
-            row = row[1:]
-            clean_row = [str(cell).strip() if cell is not None else "" for cell in row]
-            if clean_row[0] and "@" in clean_row[0]:
-                parent_rows.append(clean_row)
 
-        email_to_parent_id = import_parents(db, parent_rows, email_to_student_id)
+def import_users_from_workbook(db: Session, upload: ExcelUpload):
+    # --- Kiểm tra đủ sheet trước khi ghi DB ---
+    for sheet_name in ("Student", "Parent"):
+        if sheet_name not in upload.sheetnames:
+            raise ValueError(f"Excel file must contain a '{sheet_name}' sheet")
 
-        return {
-            "students": email_to_student_id,
-            "parents": email_to_parent_id,
-        }
+    # --- Đọc sheet Student ---
+    email_to_student_id = import_students(db, _clean_rows(upload.iter_rows("Student")))
 
-    except Exception as e:
-        raise RuntimeError(f"Import failed: {str(e)}")
+    # --- Đọc sheet Parent ---
+    email_to_parent_id = import_parents(
+        db, _clean_rows(upload.iter_rows("Parent")), email_to_student_id
+    )
 
+    return {
+        "students": email_to_student_id,
+        "parents": email_to_parent_id,
+    }
 
-def import_students(db: Session, student_rows: list) -> dict:
+
+def import_students(db: Session, student_rows) -> dict:
     """
     Import học sinh từ sheet (đã cắt cột A).
     Trả về dict email -> student_id.
@@ -105,7 +100,7 @@ def import_students(db: Session, student_rows: list) -> dict:
     return email_to_student_id
 
 
-def import_parents(db: Session, parent_rows: list, email_to_student_id: dict) -> dict:
+def import_parents(db: Session, parent_rows, email_to_student_id: dict) -> dict:
     """
     Import phụ huynh từ sheet (đã cắt cột A).
     Trả về dict email -> parent_id.
@@ -157,11 +152,11 @@ def import_parents(db: Session, parent_rows: list, email_to_student_id: dict) ->
         # Nếu có child_email hợp lệ -> update student.parent_id
         if child_email and child_email in email_to_student_id:
             student_id = email_to_student_id[child_email]
-            student = get_student(db, student_id)
-            if student:
-                student.parent_id = db_parent.user_id
-                db.add(student)
-                db.commit()
-                db.refresh(student)
+            db.execute(
+                update(Student)
+                .where(Student.user_id == student_id)
+                .values(parent_id=db_parent.user_id)
+            )
+            db.commit()
 
     return email_to_parent_id
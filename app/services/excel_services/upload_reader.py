@@ -0,0 +1,87 @@
+# app/services/excel_services/upload_reader.py
+"""
+Đọc file Excel upload theo kiểu streaming, giới hạn bộ nhớ:
+- Ghi file upload ra file tạm theo từng chunk (không đọc toàn bộ vào RAM).
+- Mở workbook ở chế độ read_only, trả về các dòng lazily.
+- Chặn sớm file quá lớn hoặc quá nhiều dòng.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+from openpyxl import load_workbook  # type: ignore
+
+MAX_UPLOAD_BYTES = int(os.getenv("EXCEL_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+MAX_UPLOAD_ROWS = int(os.getenv("EXCEL_MAX_UPLOAD_ROWS", 20000))
+CHUNK_SIZE = 1024 * 1024
+
+
+def spool_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES, dir: Optional[str] = None) -> str:
+    """
+    Copy file upload ra file tạm theo chunk, dừng ngay khi vượt giới hạn dung lượng.
+    Trả về đường dẫn file; người gọi chịu trách nhiệm xóa file.
+    """
+    src = file.file
+    src.seek(0)
+    fd, path = tempfile.mkstemp(suffix=".xlsx", dir=dir)
+    try:
+        with os.fdopen(fd, "wb") as dst:
+            written = 0
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File vượt quá dung lượng cho phép ({max_bytes // (1024 * 1024)} MB)"
+                    )
+                dst.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+class ExcelUpload:
+    """Workbook read_only đã mở từ file tạm; đọc các sheet theo từng dòng."""
+
+    def __init__(self, workbook, max_rows: int):
+        self.workbook = workbook
+        self.max_rows = max_rows
+
+    @property
+    def sheetnames(self):
+        return self.workbook.sheetnames
+
+    def iter_rows(self, sheet_name: Optional[str] = None, min_row: int = 2) -> Iterator[Tuple[int, tuple]]:
+        """
+        Trả về lazily (số dòng, giá trị các ô) của sheet, bỏ qua dòng trống.
+        Vượt quá max_rows dòng dữ liệu thì dừng và báo lỗi.
+        """
+        ws = self.workbook[sheet_name] if sheet_name else self.workbook.active
+        count = 0
+        for row_idx, row in enumerate(ws.iter_rows(min_row=min_row, values_only=True), start=min_row):
+            if not row or all(cell is None for cell in row):
+                continue
+            count += 1
+            if count > self.max_rows:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Sheet vượt quá số dòng cho phép ({self.max_rows} dòng)"
+                )
+            yield row_idx, row
+
+
+@contextmanager
+def open_excel_file(path: str, max_rows: int = MAX_UPLOAD_ROWS) -> Iterator[ExcelUpload]:
+    """Context manager: mở workbook read_only từ file trên đĩa và đóng khi kết thúc."""
+    workbook = load_workbook(filename=path, read_only=True, data_only=True)
+    try:
+        yield ExcelUpload(workbook, max_rows)
+    finally:
+        workbook.close()
+
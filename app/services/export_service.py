@@ -0,0 +1,157 @@
+# app/services/export_service.py
+"""
+Xuất dữ liệu lớn dạng luồng (NDJSON/CSV) cho bài kiểm tra, đánh giá, học phí, điểm danh.
+
+- Phạm vi theo vai trò bằng policy_service.row_scope, lọc theo khoảng ngày của từng bảng.
+- Đọc bằng yield_per (PostgreSQL: server-side cursor), mã hóa và gửi từng lô STREAM_BATCH_SIZE dòng:
+  bộ nhớ không phụ thuộc số dòng, client nhận byte đầu tiên trước khi truy vấn đọc xong.
+- Generator tự mở/đóng session riêng vì session của dependency get_db đã đóng trước khi
+  StreamingResponse bắt đầu gửi body.
+"""
+import csv
+import enum
+import io
+import json
+from datetime import date, time
+from decimal import Decimal
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement, Select
+
+from app.models.attendance_model import Attendance
+from app.models.evaluation_model import Evaluation
+from app.models.test_model import Test
+from app.models.tuition_model import Tuition
+from app.services import policy_service
+
+# Số dòng mỗi lần đọc từ cursor và mỗi chunk gửi đi
+STREAM_BATCH_SIZE = 1000
+
+
+class ExportFormat(str, enum.Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv; charset=utf-8",
+}
+
+
+class ExportSpec(NamedTuple):
+    columns: Tuple[ColumnElement, ...]
+    date_column: ColumnElement
+    order_by: ColumnElement
+    class_column: Optional[ColumnElement] = None
+    student_column: Optional[ColumnElement] = None
+
+
+class ExportDataset(str, enum.Enum):
+    tests = "tests"
+    evaluations = "evaluations"
+    tuitions = "tuitions"
+    attendances = "attendances"
+
+
+EXPORTS = {
+    ExportDataset.tests: ExportSpec(
+        columns=(
+            Test.test_id, Test.test_name, Test.student_user_id, Test.class_id, Test.teacher_user_id,
+            Test.score, Test.exam_date, Test.test_type,
+        ),
+        date_column=Test.exam_date,
+        order_by=Test.test_id,
+        class_column=Test.class_id,
+        student_column=Test.student_user_id,
+    ),
+    ExportDataset.evaluations: ExportSpec(
+        columns=(
+            Evaluation.evaluation_id, Evaluation.student_user_id, Evaluation.teacher_user_id,
+            Evaluation.class_id, Evaluation.evaluation_type, Evaluation.evaluation_date,
+            Evaluation.study_point, Evaluation.discipline_point, Evaluation.evaluation_content,
+        ),
+        date_column=Evaluation.evaluation_date,
+        order_by=Evaluation.evaluation_id,
+        class_column=Evaluation.class_id,
+        student_column=Evaluation.student_user_id,
+    ),
+    ExportDataset.tuitions: ExportSpec(
+        columns=(
+            Tuition.tuition_id, Tuition.student_user_id, Tuition.term, Tuition.amount, Tuition.paid_amount,
+            Tuition.due_date, Tuition.payment_date, Tuition.status,
+        ),
+        date_column=Tuition.due_date,
+        order_by=Tuition.tuition_id,
+        student_column=Tuition.student_user_id,
+    ),
+    ExportDataset.attendances: ExportSpec(
+        columns=(
+            Attendance.attendance_id, Attendance.student_user_id, Attendance.schedule_id, Attendance.class_id,
+            Attendance.attendance_date, Attendance.status, Attendance.checkin_time,
+        ),
+        date_column=Attendance.attendance_date,
+        order_by=Attendance.attendance_id,
+        class_column=Attendance.class_id,
+        student_column=Attendance.student_user_id,
+    ),
+}
+
+
+def build_export_query(
+    dataset: ExportDataset, current_user, from_date: Optional[date] = None, to_date: Optional[date] = None
+) -> Select:
+    """Câu truy vấn xuất dữ liệu: phạm vi theo vai trò + khoảng ngày (bao gồm hai đầu), theo thứ tự khóa chính."""
+    spec = EXPORTS[dataset]
+    stmt = (
+        select(*spec.columns)
+        .where(policy_service.row_scope(
+            current_user, class_column=spec.class_column, student_column=spec.student_column
+        ))
+        .order_by(spec.order_by)
+    )
+    if from_date is not None:
+        stmt = stmt.where(spec.date_column >= from_date)
+    if to_date is not None:
+        stmt = stmt.where(spec.date_column <= to_date)
+    return stmt
+
+
+def _plain(value):
+    """Giá trị cột -> kiểu JSON/CSV (enum -> value, Decimal -> float, ngày/giờ -> ISO)."""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
+
+
+def _ndjson_chunk(keys, rows) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(keys, map(_plain, row))), ensure_ascii=False) + "\n" for row in rows
+    ).encode("utf-8")
+
+
+def _csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def stream_export(bind: "Engine | Connection", stmt: Select, fmt: ExportFormat) -> Iterator[bytes]:
+    """Sinh các chunk bytes của file xuất; truy vấn chỉ chạy khi response bắt đầu gửi."""
+    db = Session(bind=bind)
+    try:
+        result = db.execute(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+        keys = list(result.keys())
+        if fmt == ExportFormat.csv:
+            yield _csv_chunk([keys])
+        for rows in result.partitions():
+            yield _ndjson_chunk(keys, rows) if fmt == ExportFormat.ndjson else _csv_chunk(rows)
+    finally:
+        db.close()
@@ -0,0 +1,39 @@
+# app/services/fast_json_service.py
+"""
+Đường serialize nhanh cho các endpoint trả về danh sách lớn (route tự chọn dùng).
+
+Đường mặc định: crud dựng từng model bằng model_validate(row._asdict()) trong vòng lặp Python,
+rồi FastAPI validate lại toàn bộ theo response_model, qua jsonable_encoder và json.dumps.
+Đường nhanh:
+- rows_to_models(): validate cả trang (Row của SQLAlchemy) trong một lần gọi pydantic-core.
+- list_response(): trả thẳng bytes JSON từ các model đã có (TypeAdapter.dump_json), không validate lần hai.
+Route vẫn khai báo response_model để sinh OpenAPI.
+"""
+from functools import lru_cache
+from typing import Any, Iterable, List, Sequence
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model: type) -> TypeAdapter:
+    """TypeAdapter(List[model]), dựng một lần cho mỗi model."""
+    return TypeAdapter(List[model])
+
+
+def rows_to_models(model: type, rows: Iterable[Any]) -> List[BaseModel]:
+    """
+    Row của SQLAlchemy (hoặc ORM object) -> danh sách model; tên cột/label phải trùng tên field.
+    Row được đổi sang dict bằng zip với _fields: nhanh hơn nhiều so với from_attributes (getattr từng cột).
+    """
+    rows = rows if isinstance(rows, list) else list(rows)
+    if rows and hasattr(rows[0], "_fields"):
+        keys = rows[0]._fields
+        return list_adapter(model).validate_python([dict(zip(keys, row)) for row in rows])
+    return list_adapter(model).validate_python(rows, from_attributes=True)
+
+
+def list_response(model: type, items: Sequence[BaseModel]) -> Response:
+    """Response JSON từ danh sách model đúng kiểu `model` (kiểu khác sẽ bị pydantic cảnh báo khi serialize)."""
+    return Response(content=list_adapter(model).dump_json(items), media_type="application/json")
@@ -0,0 +1,245 @@
+# app/services/job_service.py
+"""
+Job runner chạy nền trong tiến trình (không cần broker ngoài):
+- Trạng thái/tiến độ/kết quả lưu ở bảng jobs.
+- Worker pool là ThreadPoolExecutor, khởi động/tắt theo lifespan của app.
+- Mỗi job chạy với session riêng; handler đăng ký theo job_type.
+- Mỗi tiến trình (worker gunicorn) có worker_id riêng, gắn vào job nó nhận và định kỳ gia hạn
+  heartbeat; chỉ job có heartbeat quá JOB_STALE_SECONDS mới bị coi là bị gián đoạn.
+"""
+import logging
+import os
+import socket
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, UploadFile
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.crud import job_crud
+from app.models.job_model import Job, JobStatus
+from app.schemas.auth_schema import AuthenticatedUser
+from app.services import tuition_service, payroll_service, report_service
+from app.services.excel_services.import_users import import_users_from_path
+from app.services.excel_services.import_tests import import_tests_from_path
+from app.services.excel_services.export_class import export_class_to_file
+from app.services.excel_services.export_class_reports import export_class_reports_to_file
+from app.services.excel_services.upload_reader import spool_upload
+
+logger = logging.getLogger(__name__)
+
+JOB_STORAGE_DIR = os.getenv("JOB_STORAGE_DIR", os.path.join(tempfile.gettempdir(), "student_jobs"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+# Chu kỳ gia hạn heartbeat và ngưỡng coi job là mồ côi (giây); ngưỡng phải lớn hơn vài chu kỳ
+JOB_HEARTBEAT_SECONDS = int(os.getenv("JOB_HEARTBEAT_SECONDS", 30))
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", 120))
+
+
+class JobContext:
+    """Thông tin truyền cho handler: session làm việc, tham số, file input và hàm báo tiến độ."""
+
+    def __init__(self, db: Session, job: Job):
+        self.db = db
+        self.job_id = job.job_id
+        self.params: Dict[str, Any] = job.params or {}
+        self.input_file: Optional[str] = job.input_file
+        self.result_file: Optional[str] = None
+
+    @property
+    def current_user(self) -> Optional[AuthenticatedUser]:
+        user = self.params.get("user")
+        return AuthenticatedUser(**user) if user else None
+
+    def set_progress(self, progress: int) -> None:
+        # Dùng session riêng để không commit dở transaction của handler
+        status_db = SessionLocal()
+        try:
+            job_crud.update_job(status_db, self.job_id, progress=max(0, min(100, int(progress))))
+        finally:
+            status_db.close()
+
+    def result_path(self, suffix: str) -> str:
+        """Đường dẫn file kết quả của job; file sẽ được tải qua /jobs/{job_id}/result."""
+        self.result_file = os.path.join(JOB_STORAGE_DIR, f"{self.job_id}{suffix}")
+        return self.result_file
+
+
+JobHandler = Callable[[JobContext], Any]
+_HANDLERS: Dict[str, JobHandler] = {}
+_executor: Optional[ThreadPoolExecutor] = None
+_worker_id: Optional[str] = None
+
+
+def job_handler(job_type: str):
+    """Decorator đăng ký handler cho một job_type."""
+    def decorator(fn: JobHandler) -> JobHandler:
+        _HANDLERS[job_type] = fn
+        return fn
+    return decorator
+
+
+def worker_id() -> str:
+    """Định danh của tiến trình hiện tại (host:pid:boot), tạo mới mỗi lần khởi động runner."""
+    global _worker_id
+    if _worker_id is None:
+        _worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    return _worker_id
+
+
+def heartbeat_jobs() -> None:
+    """
+    Gọi định kỳ (JOB_HEARTBEAT_SECONDS): gia hạn heartbeat job của tiến trình này,
+    rồi đánh dấu failed các job mà tiến trình sở hữu đã ngừng báo heartbeat.
+    """
+    db = SessionLocal()
+    try:
+        job_crud.touch_jobs(db, worker_id())
+        stale = job_crud.fail_stale_jobs(db, datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS))
+        if stale:
+            logger.warning(f"Marked {stale} interrupted job(s) as failed")
+    finally:
+        db.close()
+
+
+def start_job_runner(max_workers: int = JOB_WORKERS) -> None:
+    """
+    Gọi khi app khởi động (mỗi worker một lần): tạo thư mục lưu file, nhận worker_id mới,
+    đánh dấu failed job mồ côi từ tiến trình đã chết, tạo worker pool.
+    """
+    global _executor, _worker_id
+    os.makedirs(JOB_STORAGE_DIR, exist_ok=True)
+    _worker_id = None
+    heartbeat_jobs()
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+
+
+def shutdown_job_runner() -> None:
+    """Gọi khi app tắt: hủy các job còn trong hàng đợi, không chờ job đang chạy."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        os.makedirs(JOB_STORAGE_DIR, exist_ok=True)
+        _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job-worker")
+    return _executor
+
+
+def save_upload(file: UploadFile) -> str:
+    """Lưu file upload (có giới hạn dung lượng) vào thư mục job, làm input cho job."""
+    os.makedirs(JOB_STORAGE_DIR, exist_ok=True)
+    return spool_upload(file, dir=JOB_STORAGE_DIR)
+
+
+def user_params(current_user: AuthenticatedUser) -> Dict[str, Any]:
+    """Lưu thông tin người tạo job để handler kiểm tra quyền như khi chạy trong request."""
+    return {"user_id": current_user.user_id, "username": current_user.username, "roles": list(current_user.roles)}
+
+
+def submit_job(
+    db: Session,
+    job_type: str,
+    current_user: AuthenticatedUser,
+    params: Optional[Dict[str, Any]] = None,
+    input_file: Optional[str] = None,
+) -> Job:
+    """Tạo bản ghi job (queued) rồi đẩy vào worker pool."""
+    if job_type not in _HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+    params = {**(params or {}), "user": user_params(current_user)}
+    db_job = job_crud.create_job(
+        db, job_type, params=jsonable_encoder(params),
+        created_by=current_user.user_id, input_file=input_file, worker_id=worker_id(),
+    )
+    _get_executor().submit(_run_job, db_job.job_id)
+    return db_job
+
+
+def _run_job(job_id: str) -> None:
+    db = SessionLocal()
+    input_file = None
+    try:
+        db_job = job_crud.get_job(db, job_id)
+        if db_job is None:
+            return
+        input_file = db_job.input_file
+        handler = _HANDLERS[db_job.job_type]
+        ctx = JobContext(db, db_job)
+        job_crud.update_job(
+            db, job_id, status=JobStatus.running, started_at=datetime.utcnow(), heartbeat_at=datetime.utcnow()
+        )
+
+        try:
+            result = handler(ctx)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Job {job_id} ({db_job.job_type}) failed: {e}", exc_info=True)
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            job_crud.update_job(
+                db, job_id, status=JobStatus.failed, error=str(error), finished_at=datetime.utcnow()
+            )
+            return
+
+        job_crud.update_job(
+            db, job_id,
+            status=JobStatus.succeeded,
+            progress=100,
+            result=jsonable_encoder(result),
+            result_file=ctx.result_file,
+            finished_at=datetime.utcnow(),
+        )
+    except Exception as e:
+        logger.error(f"Job runner error for job {job_id}: {e}", exc_info=True)
+    finally:
+        db.close()
+        # File upload chỉ cần cho lần chạy này
+        if input_file and os.path.exists(input_file):
+            os.remove(input_file)
+
+
+# --- Handlers ---
+
+@job_handler("users_import")
+def _users_import(ctx: JobContext):
+    return import_users_from_path(ctx.db, ctx.input_file)
+
+
+@job_handler("tests_import")
+def _tests_import(ctx: JobContext):
+    return import_tests_from_path(ctx.db, ctx.input_file, ctx.params["class_id"], ctx.current_user)
+
+
+@job_handler("tuitions_generate")
+def _tuitions_generate(ctx: JobContext):
+    return tuition_service.create_tuition_for_all_students(
+        ctx.db, term=ctx.params["term"], due_date=date.fromisoformat(ctx.params["due_date"])
+    )
+
+
+@job_handler("payrolls_run")
+def _payrolls_run(ctx: JobContext):
+    return payroll_service.run_monthly_payroll(ctx.db)
+
+
+@job_handler("class_export")
+def _class_export(ctx: JobContext):
+    filename = export_class_to_file(ctx.db, ctx.params["class_id"], ctx.result_path(".xlsx"))
+    return {"filename": filename}
+
+
+@job_handler("class_reports_export")
+def _class_reports_export(ctx: JobContext):
+    class_ids = report_service.get_report_class_ids(
+        ctx.db, teacher_id=ctx.params.get("teacher_id"), class_ids=ctx.params.get("class_ids")
+    )
+    return export_class_reports_to_file(ctx.db, class_ids, ctx.result_path(".xlsx"), on_progress=ctx.set_progress)
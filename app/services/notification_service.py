@@ -1,7 +1,44 @@
 # app/services/notification_service.py
+from typing import Any, Dict, Optional
 from sqlalchemy.orm import Session
 from app.models.notification_model import Notification, NotificationType
 
+# Template nội dung thông báo hệ thống, render khi đọc (lazy)
+NOTIFICATION_TEMPLATES: Dict[str, str] = {
+    "attendance_absent": "Thông báo: Bạn đã vắng mặt trong buổi học ngày {date}.",
+    "attendance_absent_parent": "Thông báo: Con của bạn {student_name} đã vắng mặt trong buổi học ngày {date}.",
+    "attendance_late": "Thông báo: Bạn đã đi học muộn trong buổi học ngày {date}.",
+    "attendance_late_parent": "Thông báo: Con của bạn {student_name} đi học muộn trong buổi học ngày {date}.",
+    "tuition_created": (
+        "Học phí tháng {month} của học sinh {student_name} là "
+        "{amount:,.0f} VND. Hạn thanh toán {due_date}."
+    ),
+    "payroll_calculated": (
+        "Lương tháng {month}/{year} của bạn đã được tính. "
+        "Tổng lương: {total:,.2f}. "
+        "Thời gian: {sent_at}"
+    ),
+}
+
+
+def render_notification_content(
+    template: Optional[str],
+    params: Optional[Dict[str, Any]],
+    raw_content: Optional[str] = None,
+) -> str:
+    """
+    Build nội dung hiển thị của thông báo.
+    Không có template (hoặc template không hợp lệ) thì trả về nội dung thô.
+    """
+    fmt = NOTIFICATION_TEMPLATES.get(template) if template else None
+    if fmt is None:
+        return raw_content or ""
+    try:
+        return fmt.format(**(params or {}))
+    except (KeyError, ValueError):
+        return raw_content or ""
+
+
 def send_notification(
     db: Session,
     sender_id: int | None,
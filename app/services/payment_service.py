@@ -0,0 +1,112 @@
+# app/services/payment_service.py
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, func, case
+from sqlalchemy.orm import Session
+
+from app.models.tuition_model import Tuition, PaymentStatus, OPEN_TUITION
+from app.models.tuition_payment_model import TuitionPayment, PaymentEntryType
+from app.schemas.auth_schema import AuthenticatedUser
+from app.schemas.payment_schema import PaymentCreate
+from app.crud import balance_crud, finance_crud
+from app.crud.tuition_crud import tuition_status_for
+from app.services import stats_service
+
+# Nhóm tuổi nợ (aging) theo số ngày quá hạn: (nhãn, số ngày tối đa)
+AGING_BUCKETS = (("1-30", 30), ("31-60", 60), ("61-90", 90))
+
+
+def record_payment(db: Session, payment_in: PaymentCreate, current_user: AuthenticatedUser) -> TuitionPayment:
+    """
+    Ghi một bút toán thu/hoàn học phí và cập nhật trong cùng transaction:
+    tuitions.paid_amount + status, student/parent balances và revenue_monthly.
+    """
+    # Khóa dòng học phí để các lần thu đồng thời không vượt quá số nợ
+    tuition = db.query(Tuition).filter(Tuition.tuition_id == payment_in.tuition_id).with_for_update().first()
+    if not tuition:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tuition not found")
+
+    amount = payment_in.amount
+    paid_amount = Decimal(tuition.paid_amount or 0)
+    billed = Decimal(tuition.amount)
+    if payment_in.entry_type == PaymentEntryType.payment:
+        if paid_amount + amount > billed:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Số tiền thu vượt quá số còn nợ ({billed - paid_amount:,.2f})"
+            )
+        signed_amount = amount
+    else:
+        if amount > paid_amount:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Số tiền hoàn vượt quá số đã thu ({paid_amount:,.2f})"
+            )
+        signed_amount = -amount
+
+    paid_at = payment_in.paid_at or date.today()
+    db_payment = TuitionPayment(
+        tuition_id=tuition.tuition_id,
+        student_user_id=tuition.student_user_id,
+        entry_type=payment_in.entry_type,
+        amount=amount,
+        method=payment_in.method,
+        note=payment_in.note,
+        paid_at=paid_at,
+        created_by=current_user.user_id,
+    )
+    db.add(db_payment)
+
+    tuition.paid_amount = paid_amount + signed_amount
+    tuition.status = tuition_status_for(billed, tuition.paid_amount, tuition.due_date)
+    tuition.payment_date = paid_at if tuition.status == PaymentStatus.paid else None
+
+    balance_crud.apply_balance_changes(db, [(tuition.student_user_id, 0, signed_amount)])
+    balance_crud.apply_revenue_change(db, paid_at, payment_in.entry_type, amount)
+    db.flush()
+    # Tháng thu tiền (thực thu) và tháng đến hạn (số còn nợ quá hạn) của cube tài chính
+    finance_crud.refresh_finance_months(
+        db, [finance_crud.period_of(paid_at), finance_crud.period_of(tuition.due_date)]
+    )
+
+    db.commit()
+    db.refresh(db_payment)
+    stats_service.invalidate_stats()
+    return db_payment
+
+
+def get_aging_report(db: Session, as_of: Optional[date] = None) -> dict:
+    """
+    Công nợ theo tuổi nợ: current (chưa đến hạn), 1-30, 31-60, 61-90, 90+ ngày quá hạn.
+    Đọc số còn nợ từ snapshot tuitions.amount - tuitions.paid_amount (1 query GROUP BY),
+    chỉ trên các học phí còn nợ qua partial index ix_tuitions_open_due_date.
+    """
+    as_of = as_of or date.today()
+    outstanding = Tuition.amount - Tuition.paid_amount
+    bucket = case(
+        (Tuition.due_date >= as_of, "current"),
+        *[(Tuition.due_date >= as_of - timedelta(days=days), label) for label, days in AGING_BUCKETS],
+        else_="90+",
+    ).label("bucket")
+
+    rows = db.execute(
+        select(bucket, func.count(Tuition.tuition_id), func.sum(outstanding))
+        .where(OPEN_TUITION)
+        .group_by(bucket)
+    ).all()
+    found = {label: (count, Decimal(total or 0)) for label, count, total in rows}
+
+    labels = ["current", *[label for label, _ in AGING_BUCKETS], "90+"]
+    buckets = [
+        {"bucket": label, "tuition_count": found.get(label, (0, Decimal(0)))[0],
+         "outstanding": found.get(label, (0, Decimal(0)))[1]}
+        for label in labels
+    ]
+    return {
+        "as_of": as_of,
+        "total_outstanding": sum((b["outstanding"] for b in buckets), Decimal(0)),
+        "buckets": buckets,
+    }
@@ -6,14 +6,14 @@ from sqlalchemy.orm import Session
 # Import Models
 from app.models.teacher_model import Teacher
 from app.models.payroll_model import PaymentStatus, Payroll as PayrollModel # Cần import Model để bulk insert
-from app.models.notification_model import Notification as NotificationModel, NotificationType # Cần import Model
+from app.models.notification_model import Notification as NotificationModel, NotificationType, NotificationRefType # Cần import Model
 
 # Import Schemas
 from app.schemas.payroll_schema import PayrollCreate, PayrollUpdate, Payroll
 from app.schemas.notification_schema import NotificationCreate
 
 # Import CRUD
-from app.crud import payroll_crud, notification_crud, teacher_crud
+from app.crud import payroll_crud, notification_crud, teacher_crud, finance_crud
 
 # --- Helper Functions ---
 
@@ -21,13 +21,14 @@ def _get_current_utc_time() -> datetime:
     """Hàm helper để lấy giờ chuẩn, đảm bảo nhất quán"""
     return datetime.now(timezone.utc)
 
-def _create_notification_content(month: int, year: int, total: float, sent_at: datetime) -> str:
-    """Format nội dung thông báo để tái sử dụng"""
-    return (
-        f"Lương tháng {month}/{year} của bạn đã được tính. "
-        f"Tổng lương: {total:,.2f}. " # Thêm dấu phẩy ngăn cách hàng nghìn cho dễ đọc
-        f"Thời gian: {sent_at.strftime('%d/%m/%Y %H:%M')}" # Format ngày giờ dễ đọc hơn isoformat
-    )
+def _create_notification_params(month: int, year: int, total: float, sent_at: datetime) -> dict:
+    """Tham số cho template 'payroll_calculated' (nội dung được render khi đọc)"""
+    return {
+        "month": month,
+        "year": year,
+        "total": float(total or 0),
+        "sent_at": sent_at.strftime('%d/%m/%Y %H:%M'), # Format ngày giờ dễ đọc hơn isoformat
+    }
 
 # --- Main Services ---
 
@@ -38,8 +39,8 @@ def create_payroll(db: Session, teacher: Teacher, payroll_in: PayrollCreate) ->
     # 1. Tạo Payroll
     db_payroll = payroll_crud.create_payroll_record(db, payroll_in)
 
-    # 2. Tạo Notification
-    content = _create_notification_content(
+    # 2. Tạo Notification (tham chiếu tới payroll để cập nhật/xóa theo index)
+    params = _create_notification_params(
         db_payroll.month, 
         db_payroll.sent_at.year, 
         db_payroll.total, 
@@ -48,9 +49,12 @@ def create_payroll(db: Session, teacher: Teacher, payroll_in: PayrollCreate) ->
 
     notification_in = NotificationCreate(
         receiver_id=teacher.user_id,
-        content=content,
-        type="payroll", # Nên dùng Enum nếu có (NotificationType.payroll)
-        sent_at=db_payroll.sent_at,
+        template="payroll_calculated",
+        params=params,
+        type=NotificationType.payroll,
+        ref_type=NotificationRefType.payroll,
+        ref_id=db_payroll.payroll_id,
+        event_date=db_payroll.sent_at.date(),
         is_read=False
     )
     notification_crud.create_notification(db, notification_in)
@@ -80,24 +84,20 @@ def run_monthly_payroll(db: Session) -> List[Payroll]:
         # Lưu ý: Nếu teacher_crud.get_classes... thực hiện query DB, 
         # đoạn này vẫn bị N+1 Query. Để tối ưu triệt để, cần viết lại query 
         # lấy tổng số lớp của TẤT CẢ giáo viên trong 1 lần gọi (SQL Group By).
-        classes = teacher_crud.get_classes_taught_by_teacher(
-            db, teacher.user_id, month=month, year=year
-        )
+        classes = teacher_crud.get_classes_taught_by_teacher(db, teacher.user_id)
         total_classes = len(classes)
         
         # Sử dụng getattr hoặc 0.0 để an toàn hơn
         base_salary_per_class = teacher_crud.get_teacher_base_salary(db, teacher.user_id) or 0.0
         reward_bonus = teacher_crud.get_teacher_reward_bonus(db, teacher.user_id) or 0.0
         
-        total_salary = (total_classes * base_salary_per_class) + reward_bonus
 
         # Tạo ORM Object cho Payroll (chưa commit)
         payroll_orm = PayrollModel(
             teacher_user_id=teacher.user_id,
             month=month,
             total_base_salary=total_classes * base_salary_per_class,
-            reward_bonus=reward_bonus,
-            total=total_salary, # Giả định Model có cột total, nếu là computed property thì bỏ dòng này
+            reward_bonus=reward_bonus,  # total là cột Computed, DB tự tính
             sent_at=now,
             status=PaymentStatus.pending
         )
@@ -109,7 +109,7 @@ def run_monthly_payroll(db: Session) -> List[Payroll]:
 
     # 3. Tạo Notifications dựa trên Payrolls đã flush (đã có ID/Data)
     for payroll in payroll_objects:
-        content = _create_notification_content(
+        params = _create_notification_params(
             payroll.month, 
             year, # Dùng biến year local vì sent_at trong DB có thể lệch milisecond
             payroll.total, 
@@ -118,8 +118,12 @@ def run_monthly_payroll(db: Session) -> List[Payroll]:
         
         notif_orm = NotificationModel(
             receiver_id=payroll.teacher_user_id,
-            content=content,
-            type="payroll",
+            template="payroll_calculated",
+            params=params,
+            type=NotificationType.payroll,
+            ref_type=NotificationRefType.payroll,
+            ref_id=payroll.payroll_id,
+            event_date=now.date(),
             sent_at=now,
             is_read=False
         )
@@ -131,6 +135,9 @@ def run_monthly_payroll(db: Session) -> List[Payroll]:
     # 4. Bulk Insert Notifications
     db.add_all(notification_objects)
 
+    # Cập nhật cube tài chính của tháng lương trong cùng transaction
+    finance_crud.refresh_finance_month(db, year, month)
+
     # 5. Commit transaction duy nhất
     try:
         db.commit()
@@ -151,7 +158,7 @@ def update_payroll_with_notification(db: Session, payroll_id: int, payroll_updat
         raise HTTPException(status_code=404, detail="Payroll not found")
 
     # Create Notification
-    content = _create_notification_content(
+    params = _create_notification_params(
         db_payroll.month, 
         db_payroll.sent_at.year, 
         db_payroll.total, 
@@ -160,9 +167,12 @@ def update_payroll_with_notification(db: Session, payroll_id: int, payroll_updat
 
     notification_in = NotificationCreate(
         receiver_id=db_payroll.teacher_user_id,
-        content=content,
-        type="payroll",
-        sent_at=_get_current_utc_time(),
+        template="payroll_calculated",
+        params=params,
+        type=NotificationType.payroll,
+        ref_type=NotificationRefType.payroll,
+        ref_id=db_payroll.payroll_id,
+        event_date=_get_current_utc_time().date(),
         is_read=False
     )
     notification_crud.create_notification(db, notification_in)
@@ -0,0 +1,111 @@
+# app/services/policy_service.py
+"""
+Phân quyền theo dòng dữ liệu: biên dịch người dùng (user_id + roles) thành predicate SQL
+dùng chung cho mọi truy vấn, đẩy vào câu lệnh dưới dạng subquery (IN (SELECT ...))
+thay vì nạp danh sách id vào Python.
+
+Quy tắc (một người có nhiều vai trò thấy hợp của các phạm vi):
+- manager: toàn bộ.
+- teacher: các lớp mình dạy và học sinh của các lớp đó.
+- student: dữ liệu của chính mình, các lớp đang học (enrollment active).
+- parent: dữ liệu của con, các lớp con đang học.
+Người dùng không có vai trò nào ở trên không thấy gì; user=None (gọi nội bộ) thấy toàn bộ.
+"""
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select, or_, true, false
+from sqlalchemy.sql import ColumnElement, Select
+
+from app.models.class_model import Class
+from app.models.enrollment_model import Enrollment, EnrollmentStatus
+from app.models.schedule_model import Schedule
+from app.models.student_model import Student
+
+
+class Principal(NamedTuple):
+    """Người dùng đang truy vấn, khi chỉ có user_id + roles (không có AuthenticatedUser)."""
+    user_id: int
+    roles: Tuple[str, ...]
+
+
+def principal(user_id: Optional[int], roles: Optional[Iterable[str]]) -> Optional[Principal]:
+    """None khi không có ngữ cảnh người dùng (gọi nội bộ) -> không giới hạn."""
+    if user_id is None or roles is None:
+        return None
+    return Principal(user_id, tuple(roles))
+
+
+# ---- Subquery phạm vi theo từng vai trò ----
+def _teacher_classes(user_id: int) -> Select:
+    return select(Class.class_id).where(Class.teacher_user_id == user_id)
+
+
+def _teacher_students(user_id: int) -> Select:
+    return select(Enrollment.student_user_id).join(Class, Class.class_id == Enrollment.class_id)\
+        .where(Class.teacher_user_id == user_id)
+
+
+def _children(user_id: int) -> Select:
+    return select(Student.user_id).where(Student.parent_id == user_id)
+
+
+def _enrolled_classes(student_user_ids) -> Select:
+    return select(Enrollment.class_id).where(
+        Enrollment.student_user_id.in_(student_user_ids),
+        Enrollment.enrollment_status == EnrollmentStatus.active,
+    )
+
+
+def _is_unrestricted(user) -> bool:
+    return user is None or "manager" in (user.roles or [])
+
+
+def row_scope(
+    user,
+    class_column: Optional[ColumnElement] = None,
+    student_column: Optional[ColumnElement] = None,
+) -> ColumnElement:
+    """
+    Predicate cho bảng có cột class_id và/hoặc student_user_id.
+    Giáo viên được xét theo lớp, học sinh/phụ huynh theo học sinh khi bảng có cột tương ứng,
+    ngược lại dùng cột còn lại (vd. lịch học chỉ có class_id).
+    """
+    if class_column is None and student_column is None:
+        raise ValueError("row_scope cần ít nhất một cột class_id hoặc student_user_id")
+    if _is_unrestricted(user):
+        return true()
+
+    roles = user.roles or []
+    predicates = []
+    if "teacher" in roles:
+        if class_column is not None:
+            predicates.append(class_column.in_(_teacher_classes(user.user_id)))
+        else:
+            predicates.append(student_column.in_(_teacher_students(user.user_id)))
+    if "student" in roles:
+        if student_column is not None:
+            predicates.append(student_column == user.user_id)
+        else:
+            predicates.append(class_column.in_(_enrolled_classes([user.user_id])))
+    if "parent" in roles:
+        if student_column is not None:
+            predicates.append(student_column.in_(_children(user.user_id)))
+        else:
+            predicates.append(class_column.in_(_enrolled_classes(_children(user.user_id))))
+    return or_(*predicates) if predicates else false()
+
+
+def class_scope(user, class_column: ColumnElement = Class.class_id) -> ColumnElement:
+    """Predicate các lớp người dùng được xem."""
+    return row_scope(user, class_column=class_column)
+
+
+def student_scope(user, student_column: ColumnElement = Student.user_id) -> ColumnElement:
+    """Predicate các học sinh người dùng được xem."""
+    return row_scope(user, student_column=student_column)
+
+
+def schedule_scope(user) -> ColumnElement:
+    """Predicate các lịch học người dùng được xem (theo lớp của lịch)."""
+    return row_scope(user, class_column=Schedule.class_id)
+
@@ -14,6 +14,8 @@ from app.models.class_model import Class
 from app.models.role_model import Role
 from app.models.enrollment_model import Enrollment, EnrollmentStatus
 from app.models.association_tables import user_roles
+from app.services import stats_service, response_cache_service
+from app.crud import class_crud
 
 from app.schemas.register_schema import (
     RegisterRequest,
@@ -96,6 +98,7 @@ def register_single_user_service(db: Session, request: RegisterRequest):
             db.add(new_teacher)
 
         db.commit()
+        stats_service.invalidate_stats()
         db.refresh(new_user)
 
         return {
@@ -138,11 +141,12 @@ def register_parent_with_children_service(db: Session, request: ParentAndChildre
 
         db.execute(insert(user_roles).values(user_id=new_parent_user.user_id, role_id=parent_role.role_id))
 
-        new_parent = Parent(**request.model_dump(exclude={"children_info"}), user_id=new_parent_user.user_id)
+        new_parent = Parent(user_id=new_parent_user.user_id)
         db.add(new_parent)
         db.flush()
 
         child_ids = []
+        enrolled_class_ids = set()
 
         for student_info in request.children_info:
             student_username = generate_username_from_email(student_info.email)
@@ -164,10 +168,9 @@ def register_parent_with_children_service(db: Session, request: ParentAndChildre
 
             db.execute(insert(user_roles).values(user_id=new_student_user.user_id, role_id=student_role.role_id))
 
-            student_data = student_info.model_dump(exclude_unset=True)
-            class_id = student_data.pop("class_id", None)
+            class_id = student_info.class_id
 
-            new_student = Student(**student_data, user_id=new_student_user.user_id, parent_id=new_parent.user_id)
+            new_student = Student(user_id=new_student_user.user_id, parent_id=new_parent.user_id)
             db.add(new_student)
             db.flush()
 
@@ -182,13 +185,18 @@ def register_parent_with_children_service(db: Session, request: ParentAndChildre
                     student_user_id=new_student_user.user_id,
                     class_id=class_id,
                     enrollment_date=date.today(),
-                    status=EnrollmentStatus.active
+                    enrollment_status=EnrollmentStatus.active
                 )
                 db.add(enrollment)
+                enrolled_class_ids.add(class_id)
 
             child_ids.append(new_student.user_id)
 
+        # Sĩ số lớp thay đổi -> vô hiệu hóa báo cáo lớp/bảng điểm đã cache
+        class_crud.bump_data_versions(db, enrolled_class_ids)
+        response_cache_service.invalidate_tags(db, response_cache_service.ENROLLMENTS)
         db.commit()
+        stats_service.invalidate_stats()
         db.refresh(new_parent_user)
 
         return {
@@ -237,10 +245,9 @@ def register_student_with_existing_parent_service(db: Session, request: Register
 
         db.execute(insert(user_roles).values(user_id=new_student_user.user_id, role_id=student_role.role_id))
 
-        student_data = request.student_info.model_dump(exclude_unset=True)
-        class_id = student_data.pop("class_id", None)
+        class_id = request.student_info.class_id
 
-        new_student = Student(**student_data, user_id=new_student_user.user_id, parent_id=existing_parent.user_id)
+        new_student = Student(user_id=new_student_user.user_id, parent_id=existing_parent.user_id)
         db.add(new_student)
         db.flush()
 
@@ -254,11 +261,14 @@ def register_student_with_existing_parent_service(db: Session, request: Register
                 student_user_id=new_student_user.user_id,
                 class_id=class_id,
                 enrollment_date=date.today(),
-                status=EnrollmentStatus.active
+                enrollment_status=EnrollmentStatus.active
             )
             db.add(enrollment)
+            class_crud.bump_data_version(db, class_id)
 
+        response_cache_service.invalidate_tags(db, response_cache_service.ENROLLMENTS)
         db.commit()
+        stats_service.invalidate_stats()
 
         return {
             "message": "Đăng ký học sinh và liên kết với phụ huynh thành công.",
@@ -1,63 +1,51 @@
-﻿import logging
-from sqlalchemy import func, case, desc
+﻿import json
+import logging
+from itertools import groupby
+from sqlalchemy import func, case, desc, select, cast, Integer, Numeric
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import Iterator, List, Dict, Any, Optional
+from datetime import datetime
 
 from app.models.class_model import Class
 from app.models.enrollment_model import Enrollment
-from app.models.evaluation_model import Evaluation
+from app.models.evaluation_rollup_model import EvaluationRollup
 from app.models.test_model import Test
 from app.models.student_model import Student
 from app.models.user_model import User
-from app.models.attendance_model import Attendance
+from app.models.attendance_rollup_model import AttendanceRollup
 from app.models.teacher_model import Teacher
-from app.models.teacher_review_model import TeacherReview
 from app.models.payroll_model import Payroll
 
-from app.schemas.report_schema import TeacherOverview, TeacherReport, SalaryByMonth
+from app.schemas.report_schema import (
+    TeacherOverview, TeacherReport, SalaryByMonth,
+    FinanceReport, FinanceMonth, PayrollByTeacher, PayrollBySubject,
+)
+from app.crud import finance_crud, teacher_crud, teacher_rating_crud
+from app.database import SessionLocal
+from app.services.cache_service import TTLCache
 
 # Thiết lập logger
 logger = logging.getLogger(__name__)
 
+# Cache báo cáo lớp, key = (class_id, data_version). Báo cáo còn chứa dữ liệu ngoài lớp
+# (tên học sinh) không tăng data_version, nên vẫn giữ TTL như _transcript_cache
+_class_report_cache = TTLCache(maxsize=512, ttl=600)
+
 def get_teacher_overview(db: Session, teacher_user_id: int) -> TeacherOverview:
     """
-    Tổng quan giáo viên.
+    Tổng quan giáo viên, lấy từ số liệu hàng loạt của teacher_crud (1 query, không cache
+    để giáo viên thấy ngay thay đổi của mình).
     """
     try:
-        # 1. Lấy danh sách Class IDs
-        class_ids = [c.class_id for c in db.query(Class.class_id).filter(Class.teacher_user_id == teacher_user_id).all()]
-        
-        if not class_ids:
+        metrics = teacher_crud.get_teachers_metrics(db, [teacher_user_id]).get(teacher_user_id)
+        if metrics is None or not metrics.class_taught:
             return TeacherOverview(total_students=0, avg_study_point=100, avg_discipline_point=100, avg_gpa=0)
 
-        # 2. Tổng học sinh
-        total_students = db.query(func.count(func.distinct(Enrollment.student_user_id))) \
-            .filter(Enrollment.class_id.in_(class_ids)) \
-            .scalar() or 0
-
-        # 3. Điểm đánh giá trung bình (Cộng thêm 100)
-        eval_stats = db.query(
-            func.coalesce(func.avg(Evaluation.study_point), 0),
-            func.coalesce(func.avg(Evaluation.discipline_point), 0)
-        ).filter(Evaluation.class_id.in_(class_ids)).first()
-        
-        # Logic: Base 100 + Average Delta
-        raw_avg_study = float(eval_stats[0]) if eval_stats else 0
-        raw_avg_discipline = float(eval_stats[1]) if eval_stats else 0
-
-        avg_study_point = 100 + raw_avg_study
-        avg_discipline_point = 100 + raw_avg_discipline
-
-        # 4. GPA Trung bình
-        avg_gpa = db.query(func.coalesce(func.avg(Test.score), 0)) \
-            .filter(Test.teacher_user_id == teacher_user_id) \
-            .scalar()
-
         return TeacherOverview(
-            total_students=total_students,
-            avg_study_point=float(round(avg_study_point, 2)),
-            avg_discipline_point=float(round(avg_discipline_point, 2)),
-            avg_gpa=float(round(avg_gpa, 2)),
+            total_students=metrics.total_students,
+            avg_study_point=metrics.avg_study_point,
+            avg_discipline_point=metrics.avg_discipline_point,
+            avg_gpa=metrics.avg_gpa,
         )
 
     except Exception as e:
@@ -66,126 +54,234 @@ def get_teacher_overview(db: Session, teacher_user_id: int) -> TeacherOverview:
         return TeacherOverview(total_students=0, avg_study_point=100, avg_discipline_point=100, avg_gpa=0)
 
 
+# Số lớp mỗi lượt truy vấn khi chạy báo cáo hàng loạt
+REPORT_BATCH_SIZE = 200
+
+
+def _class_report_statement(*class_criteria):
+    """
+    Dựng câu lệnh (CTE + window function) cho báo cáo của các lớp thỏa class_criteria.
+    Mọi CTE đều gom theo class_id và window function phân vùng theo class_id, nên một câu lệnh
+    tính được báo cáo cho một lớp hoặc cả trăm lớp. Mỗi dòng là một học sinh kèm các giá trị
+    tổng hợp cấp lớp (sĩ số, trung bình, phân bố điểm); lớp không có học sinh trả về 1 dòng
+    với các cột học sinh là NULL.
+    """
+    cls = (
+        select(Class.class_id, Class.class_name, Class.data_version)
+        .where(*class_criteria)
+        .cte("cls")
+    )
+    roster = (
+        select(Enrollment.class_id, Enrollment.student_user_id, User.full_name)
+        .join(cls, cls.c.class_id == Enrollment.class_id)
+        .join(User, User.user_id == Enrollment.student_user_id)
+        .distinct()
+        .cte("roster")
+    )
+    gpa = (
+        select(Test.class_id, Test.student_user_id, func.avg(Test.score).label("gpa"))
+        .join(cls, cls.c.class_id == Test.class_id)
+        .group_by(Test.class_id, Test.student_user_id)
+        .cte("gpa")
+    )
+    ev = (
+        select(
+            EvaluationRollup.class_id,
+            EvaluationRollup.student_user_id,
+            (EvaluationRollup.total_study_point * 1.0 / EvaluationRollup.evaluation_count).label("avg_study"),
+            (EvaluationRollup.total_discipline_point * 1.0 / EvaluationRollup.evaluation_count).label("avg_discipline"),
+        )
+        .join(cls, cls.c.class_id == EvaluationRollup.class_id)
+        .where(EvaluationRollup.evaluation_count > 0)
+        .cte("ev")
+    )
+    att = (
+        select(
+            AttendanceRollup.class_id,
+            AttendanceRollup.student_user_id,
+            AttendanceRollup.total_count.label("total"),
+            AttendanceRollup.present_count,
+        )
+        .join(cls, cls.c.class_id == AttendanceRollup.class_id)
+        .cte("att")
+    )
+
+    def same_student(cte):
+        return (cte.c.class_id == roster.c.class_id) & (cte.c.student_user_id == roster.c.student_user_id)
+
+    # Điểm cuối cùng = 100 + Delta trung bình; chuyên cần = % buổi có mặt
+    per_student = (
+        select(
+            roster.c.class_id,
+            roster.c.student_user_id,
+            roster.c.full_name,
+            func.coalesce(gpa.c.gpa, 0).label("gpa"),
+            (100 + func.coalesce(ev.c.avg_study, 0)).label("study_point"),
+            (100 + func.coalesce(ev.c.avg_discipline, 0)).label("discipline_point"),
+            case(
+                (att.c.total > 0, att.c.present_count * 100.0 / att.c.total),
+                else_=0,
+            ).label("attendance"),
+        )
+        .select_from(roster)
+        .outerjoin(gpa, same_student(gpa))
+        .outerjoin(ev, same_student(ev))
+        .outerjoin(att, same_student(att))
+        .cte("per_student")
+    )
+
+    # round(numeric) làm tròn nửa lên (round(double precision) của PostgreSQL là nửa chẵn)
+    grade = cast(func.round(cast(per_student.c.gpa, Numeric)), Integer)
+    by_class = per_student.c.class_id
+    return (
+        select(
+            cls.c.class_id,
+            cls.c.class_name,
+            cls.c.data_version,
+            per_student.c.student_user_id,
+            per_student.c.full_name,
+            per_student.c.gpa,
+            per_student.c.study_point,
+            per_student.c.discipline_point,
+            per_student.c.attendance,
+            func.count(per_student.c.student_user_id).over(partition_by=by_class).label("total_students"),
+            func.avg(per_student.c.gpa).over(partition_by=by_class).label("avg_gpa"),
+            func.avg(per_student.c.study_point).over(partition_by=by_class).label("avg_study_point"),
+            func.avg(per_student.c.discipline_point).over(partition_by=by_class).label("avg_discipline_point"),
+            grade.label("grade"),
+            func.count(per_student.c.student_user_id).over(partition_by=[by_class, grade]).label("grade_count"),
+        )
+        .select_from(cls)
+        .outerjoin(per_student, per_student.c.class_id == cls.c.class_id)
+        .order_by(cls.c.class_id, per_student.c.student_user_id)
+    )
+
+
+def build_class_report_statement(class_id: int, teacher_id: int):
+    """Câu lệnh báo cáo một lớp; lớp không hợp lệ/không thuộc giáo viên không trả dòng nào."""
+    return _class_report_statement(Class.class_id == class_id, Class.teacher_user_id == teacher_id)
+
+
+def build_class_reports_statement(class_ids: List[int]):
+    """Câu lệnh báo cáo cho một lô lớp (dùng cho báo cáo toàn trường)."""
+    return _class_report_statement(Class.class_id.in_(class_ids))
+
+
+def _report_from_rows(rows) -> Dict[str, Any]:
+    """Map các dòng của một lớp (cùng class_id) sang dict của ClassReport."""
+    first = rows[0]
+    if first.student_user_id is None:
+        return {
+            "class_id": first.class_id, "class_name": first.class_name,
+            "total_students": 0, "avg_gpa": 0, "avg_study_point": 100,
+            "avg_discipline_point": 100, "grade_distribution": {}, "students": []
+        }
+
+    grade_distribution = {i: 0 for i in range(1, 11)}
+    students_data = []
+    for r in rows:
+        if r.grade is not None and 1 <= r.grade <= 10:
+            grade_distribution[r.grade] = r.grade_count
+        students_data.append({
+            "id": r.student_user_id,
+            "name": r.full_name,
+            "gpa": round(float(r.gpa), 2),
+            "study_point": round(float(r.study_point), 2),
+            "discipline_point": round(float(r.discipline_point), 2),
+            "attendance": round(float(r.attendance), 1)
+        })
+
+    return {
+        "class_id": first.class_id,
+        "class_name": first.class_name,
+        "total_students": first.total_students,
+        "avg_gpa": round(float(first.avg_gpa), 2),
+        "avg_study_point": round(float(first.avg_study_point), 2),
+        "avg_discipline_point": round(float(first.avg_discipline_point), 2),
+        "grade_distribution": grade_distribution,
+        "students": students_data
+    }
+
+
+def build_class_report(db: Session, class_id: int, teacher_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Chạy báo cáo lớp trong một round-trip và map kết quả sang dict của ClassReport.
+    Trả về None nếu lớp không tồn tại hoặc không thuộc giáo viên.
+    """
+    rows = db.execute(build_class_report_statement(class_id, teacher_id)).all()
+    if not rows:
+        return None
+    return _report_from_rows(rows)
+
+
+def get_report_class_ids(
+    db: Session, teacher_id: Optional[int] = None, class_ids: Optional[List[int]] = None
+) -> List[int]:
+    """Danh sách lớp cần báo cáo (tất cả, của một giáo viên, và/hoặc trong class_ids), theo class_id."""
+    stmt = select(Class.class_id).order_by(Class.class_id)
+    if teacher_id is not None:
+        stmt = stmt.where(Class.teacher_user_id == teacher_id)
+    if class_ids:
+        stmt = stmt.where(Class.class_id.in_(class_ids))
+    return list(db.execute(stmt).scalars())
+
+
+def iter_class_reports(
+    db: Session, class_ids: List[int], batch_size: int = REPORT_BATCH_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Sinh báo cáo của nhiều lớp theo từng lô: mỗi lô `batch_size` lớp là một câu lệnh,
+    kết quả được tách theo class_id. Báo cáo tính xong cũng được đưa vào cache của
+    get_class_report (key theo data_version).
+    """
+    for i in range(0, len(class_ids), batch_size):
+        rows = db.execute(build_class_reports_statement(class_ids[i:i + batch_size])).all()
+        for _, class_rows in groupby(rows, key=lambda r: r.class_id):
+            class_rows = list(class_rows)
+            report = _report_from_rows(class_rows)
+            _class_report_cache.set((report["class_id"], class_rows[0].data_version), report)
+            yield report
+
+
+def stream_class_reports_ndjson(class_ids: List[int]) -> Iterator[bytes]:
+    """
+    Luồng NDJSON (mỗi dòng một báo cáo lớp) cho StreamingResponse.
+    Dùng session riêng vì session của request đã đóng khi body bắt đầu được gửi.
+    """
+    db = SessionLocal()
+    try:
+        for report in iter_class_reports(db, class_ids):
+            yield (json.dumps(report, ensure_ascii=False) + "\n").encode("utf-8")
+    finally:
+        db.close()
+
+
 def get_class_report(db: Session, class_id: int, teacher_id: int):
     """
     Báo cáo lớp học.
+    Kết quả được cache theo (class_id, data_version): mọi thao tác ghi dữ liệu của lớp
+    đều tăng data_version nên cache tự hết hiệu lực.
     """
     try:
-        # 1. Validate Class
-        class_info = db.query(Class).filter(
+        # 1. Validate Class + lấy version dữ liệu (PK lookup)
+        data_version = db.query(Class.data_version).filter(
             Class.class_id == class_id,
             Class.teacher_user_id == teacher_id
-        ).first()
-        
-        if not class_info:
+        ).scalar()
+
+        if data_version is None:
             raise ValueError("Không tìm thấy lớp hoặc không có quyền truy cập.")
 
-        # 2. Lấy danh sách học sinh
-        students_query = db.query(User.user_id, User.full_name)\
-            .join(Enrollment, Enrollment.student_user_id == User.user_id)\
-            .filter(Enrollment.class_id == class_id).all()
-        
-        if not students_query:
-             return {
-                "class_id": class_info.class_id, "class_name": class_info.class_name,
-                "total_students": 0, "avg_gpa": 0, "avg_study_point": 100,
-                "avg_discipline_point": 100, "grade_distribution": {}, "students": []
-            }
-
-        student_ids = [s.user_id for s in students_query]
-        student_map = {s.user_id: s.full_name for s in students_query}
-
-        # --- BATCH QUERY 1: GPA ---
-        gpa_results = db.query(
-            Test.student_user_id, 
-            func.avg(Test.score).label('avg_score')
-        ).filter(
-            Test.class_id == class_id,
-            Test.student_user_id.in_(student_ids)
-        ).group_by(Test.student_user_id).all()
-        
-        gpa_map = {r.student_user_id: float(r.avg_score) for r in gpa_results}
+        cache_key = (class_id, data_version)
+        report = _class_report_cache.get(cache_key)
+        if report is None:
+            # 2. Tính toàn bộ báo cáo trong một câu lệnh
+            report = build_class_report(db, class_id, teacher_id)
+            if report is None:
+                raise ValueError("Không tìm thấy lớp hoặc không có quyền truy cập.")
+            _class_report_cache.set(cache_key, report)
 
-        # --- BATCH QUERY 2: Evaluation ---
-        eval_results = db.query(
-            Evaluation.student_user_id,
-            func.avg(Evaluation.study_point).label('avg_study'),
-            func.avg(Evaluation.discipline_point).label('avg_discipline')
-        ).filter(
-            Evaluation.class_id == class_id,
-            Evaluation.student_user_id.in_(student_ids)
-        ).group_by(Evaluation.student_user_id).all()
-
-        # Map delta: {student_id: (delta_study, delta_discipline)}
-        eval_map = {r.student_user_id: (float(r.avg_study), float(r.avg_discipline)) for r in eval_results}
-
-        # --- BATCH QUERY 3: Attendance ---
-        attendance_results = db.query(
-            Attendance.student_user_id,
-            func.count(Attendance.attendance_id).label('total'),
-            func.sum(case((Attendance.status == 'present', 1), else_=0)).label('present_count')
-        ).filter(
-            Attendance.class_id == class_id,
-            Attendance.student_user_id.in_(student_ids)
-        ).group_by(Attendance.student_user_id).all()
-
-        att_map = {}
-        for r in attendance_results:
-            total = r.total or 0
-            present = r.present_count or 0
-            att_map[r.student_user_id] = (present / total * 100) if total > 0 else 0
-
-        # --- TỔNG HỢP ---
-        students_data = []
-        grade_distribution = {i: 0 for i in range(1, 11)}
-        
-        total_gpa = 0
-        total_study = 0
-        total_discipline = 0
-
-        for s_id, s_name in student_map.items():
-            gpa = gpa_map.get(s_id, 0.0)
-            
-            # Lấy delta, mặc định 0
-            study_delta, discipline_delta = eval_map.get(s_id, (0.0, 0.0))
-            
-            # TÍNH ĐIỂM CUỐI CÙNG = 100 + Delta
-            study_score = 100 + study_delta
-            discipline_score = 100 + discipline_delta
-            
-            attendance = att_map.get(s_id, 0.0)
-
-            # Cộng dồn để tính trung bình lớp
-            total_gpa += gpa
-            total_study += study_score
-            total_discipline += discipline_score
-
-            grade_int = int(round(gpa))
-            if 1 <= grade_int <= 10:
-                grade_distribution[grade_int] += 1
-
-            students_data.append({
-                "id": s_id,
-                "name": s_name,
-                "gpa": round(gpa, 2),
-                "study_point": round(study_score, 2),
-                "discipline_point": round(discipline_score, 2),
-                "attendance": round(attendance, 1)
-            })
-
-        count = len(students_data)
-        
-        # Trả về kết quả
-        return {
-            "class_id": class_info.class_id,
-            "class_name": class_info.class_name,
-            "total_students": count,
-            "avg_gpa": round(total_gpa / count, 2) if count else 0,
-            "avg_study_point": round(total_study / count, 2) if count else 100,
-            "avg_discipline_point": round(total_discipline / count, 2) if count else 100,
-            "grade_distribution": grade_distribution,
-            "students": students_data
-        }
+        return report
 
     except Exception as e:
         logger.error(f"Failed to generate class report for class {class_id}: {e}", exc_info=True)
@@ -204,19 +300,9 @@ def get_teacher_report(db: Session, teacher_id: int, year: int) -> TeacherReport
         
         teacher_name = getattr(teacher, "teacher_code", str(teacher_id))
 
-        # 2. Review Distribution
-        review_counts = db.query(
-            func.floor(TeacherReview.rating).label("rating_group"),
-            func.count().label("count") 
-        ).filter(
-            TeacherReview.teacher_user_id == teacher_id
-        ).group_by(func.floor(TeacherReview.rating)).all()
-
-        review_distribution = {i: 0 for i in range(1, 6)}
-        for r in review_counts:
-            star = int(r.rating_group)
-            if 1 <= star <= 5:
-                review_distribution[star] = r.count
+        # 2. Review Distribution (đọc từ bảng tổng hợp teacher_rating_stats)
+        rating_stats = teacher_rating_crud.get_rating_stats(db, teacher_id)
+        review_distribution = rating_stats.distribution if rating_stats else {i: 0 for i in range(1, 6)}
 
         # 3. Salary by Month
         salary_rows = db.query(
@@ -224,7 +310,9 @@ def get_teacher_report(db: Session, teacher_id: int, year: int) -> TeacherReport
             func.sum(Payroll.total).label("total_salary")
         ).filter(
             Payroll.teacher_user_id == teacher_id,
-            func.extract('year', Payroll.sent_at) == year
+            # Khoảng thời gian thay cho extract(year) để dùng được index (teacher_user_id, sent_at)
+            Payroll.sent_at >= datetime(year, 1, 1),
+            Payroll.sent_at < datetime(year + 1, 1, 1)
         ).group_by(Payroll.month).all()
 
         salary_map = {row.month: float(row.total_salary or 0) for row in salary_rows}
@@ -247,4 +335,46 @@ def get_teacher_report(db: Session, teacher_id: int, year: int) -> TeacherReport
 
     except Exception as e:
         logger.error(f"Error generating teacher report for {teacher_id}: {e}", exc_info=True)
-        raise e
\ No newline at end of file
+        raise e
+
+
+def get_finance_report(db: Session, year: int, month: Optional[int] = None) -> FinanceReport:
+    """
+    Báo cáo tài chính (thu học phí vs chi lương) theo năm hoặc một tháng.
+    Đọc từ cube finance_monthly / payroll_monthly đã tính sẵn, không quét bảng gốc.
+    """
+    rows = finance_crud.get_finance_months(db, year, month)
+    months = [
+        FinanceMonth(
+            month=r.month,
+            tuition_billed=float(r.tuition_billed or 0),
+            tuition_count=r.tuition_count or 0,
+            tuition_overdue=float(r.tuition_overdue or 0),
+            tuition_collected=float(r.tuition_collected or 0),
+            payroll_total=float(r.payroll_total or 0),
+            payroll_count=r.payroll_count or 0,
+            net_amount=float(r.net_amount),
+        )
+        for r in rows
+    ]
+    total_collected = sum(m.tuition_collected for m in months)
+    total_payroll = sum(m.payroll_total for m in months)
+
+    return FinanceReport(
+        year=year,
+        month=month,
+        months=months,
+        total_billed=sum(m.tuition_billed for m in months),
+        total_collected=total_collected,
+        total_overdue=sum(m.tuition_overdue for m in months),
+        total_payroll=total_payroll,
+        net_amount=total_collected - total_payroll,
+        payroll_by_teacher=[
+            PayrollByTeacher(teacher_user_id=t_id, teacher_name=name, amount=float(amount or 0))
+            for t_id, name, amount in finance_crud.get_payroll_by_teacher(db, year, month)
+        ],
+        payroll_by_subject=[
+            PayrollBySubject(subject_id=s_id, subject_name=name, amount=float(amount or 0))
+            for s_id, name, amount in finance_crud.get_payroll_by_subject(db, year, month)
+        ],
+    )
@@ -0,0 +1,142 @@
+# app/services/response_cache_service.py
+"""
+Cache response cho các endpoint đọc nhiều, ít thay đổi (môn học, lớp học).
+
+- Key = route + query params + phạm vi người dùng (scope) + version của các tag dữ liệu.
+- Body JSON đã serialize được lưu cùng ETag; request có If-None-Match khớp -> 304 không body.
+- Version tag nằm ở bảng cache_tag_versions (chung cho mọi worker). Ghi dữ liệu (subject_crud,
+  class_crud, enrollment_crud...) gọi invalidate_tags() trước commit, cùng transaction: version tăng
+  đúng lúc dữ liệu mới hiện ra, mọi key cũ ở mọi worker tự hết hiệu lực, không cần quét/xóa từng key.
+- Mỗi lần đọc tốn 1 query theo khóa chính (version tag) thay cho truy vấn + serialize cả trang.
+- Body mặc định lưu LRU trong bộ nhớ tiến trình; có thể cắm backend dùng chung (vd. Redis) qua set_backend().
+"""
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Hashable, Iterable, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response, status
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.crud.crud_helper import upsert_insert
+from app.models.cache_tag_model import CacheTagVersion
+from app.services.cache_service import TTLCache
+
+# Thời gian sống tối đa của một response (giây), lưới an toàn cho các thao tác ghi không có hook
+# (ghi có hook được thấy ngay ở mọi worker qua version tag trong DB)
+RESPONSE_CACHE_TTL = 600
+
+# Tag dữ liệu dùng chung giữa hook ghi và các route đọc
+SUBJECTS = "subjects"
+CLASSES = "classes"
+ENROLLMENTS = "enrollments"
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+
+
+class CacheBackend(ABC):
+    """Giao diện backend lưu body; backend dùng chung tự serialize CachedResponse."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: CachedResponse, ttl: Optional[float]) -> None:
+        ...
+
+
+class InMemoryBackend(CacheBackend):
+    """LRU trong bộ nhớ tiến trình (TTLCache)."""
+
+    def __init__(self, maxsize: int = 2048, ttl: Optional[float] = RESPONSE_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: CachedResponse, ttl: Optional[float]) -> None:
+        # TTL cố định theo cấu hình của TTLCache
+        self._cache.set(key, value)
+
+
+_backend: CacheBackend = InMemoryBackend()
+
+
+def set_backend(backend: CacheBackend) -> None:
+    """Thay backend (gọi lúc khởi động, trước khi nhận request)."""
+    global _backend
+    _backend = backend
+
+
+def tag_versions(db: Session, tags: Tuple[str, ...]) -> Tuple[int, ...]:
+    """Version hiện tại của các tag (tag chưa từng ghi: 0)."""
+    found: Dict[str, int] = dict(
+        db.execute(select(CacheTagVersion.tag, CacheTagVersion.version).where(CacheTagVersion.tag.in_(tags))).all()
+    )
+    return tuple(found.get(tag, 0) for tag in tags)
+
+
+def invalidate_tags(db: Session, *tags: str) -> None:
+    """
+    Tăng version các tag trong transaction đang mở (gọi trước commit của thao tác ghi). Không commit.
+    """
+    stmt = upsert_insert(db, CacheTagVersion)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CacheTagVersion.tag],
+        set_={"version": CacheTagVersion.version + 1},
+    )
+    db.execute(stmt, [{"tag": tag, "version": 1} for tag in sorted(set(tags))])
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _cache_key(request: Request, scope: Hashable, tags: Tuple[str, ...], versions: Tuple[int, ...]) -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    tag_part = ",".join(f"{tag}:{version}" for tag, version in zip(tags, versions))
+    return f"{request.url.path}?{query}|{scope}|{tag_part}"
+
+
+def cached_json(
+    request: Request,
+    db: Session,
+    loader: Callable[[], Any],
+    adapter: TypeAdapter,
+    tags: Iterable[str],
+    scope: Hashable = "public",
+) -> Response:
+    """
+    Response JSON qua cache. `loader` chỉ chạy khi miss (có thể raise HTTPException, lỗi không được cache);
+    kết quả được validate/serialize bằng `adapter` (thay response_model của route).
+    `scope` phải phân biệt mọi người dùng nhận dữ liệu khác nhau từ cùng một URL.
+    Quyền truy cập vẫn do dependency của route kiểm tra trước khi vào đây.
+    """
+    tags = tuple(tags)
+    # Đọc version trước khi tải: ghi xen giữa sẽ tăng version nên bản tải cũ không bao giờ được đọc lại
+    key = _cache_key(request, scope, tags, tag_versions(db, tags))
+    cached = _backend.get(key)
+    if cached is None:
+        body = adapter.dump_json(adapter.validate_python(loader(), from_attributes=True))
+        cached = CachedResponse(_etag(body), body)
+        _backend.set(key, cached, RESPONSE_CACHE_TTL)
+
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
@@ -6,7 +6,8 @@ from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 
-from app.crud import schedule_crud, class_crud, parent_crud
+from app.crud import schedule_crud, class_crud
+from app.services import policy_service
 from app.models.schedule_model import Schedule, DayOfWeekEnum, ScheduleTypeEnum
 from app.schemas.auth_schema import AuthenticatedUser
 
@@ -146,69 +147,13 @@ def search_schedules_by_user_role(
 ) -> List[Schedule]:
     """
     Tìm kiếm schedules theo role.
-    Tối ưu: Sử dụng Set để loại bỏ trùng lặp class_ids.
+    Tối ưu: phạm vi lớp được xem là subquery (policy_service.schedule_scope) đẩy thẳng vào câu
+    tìm kiếm, không nạp danh sách class_id vào Python.
     """
-    target_class_ids: Optional[List[int]] = None
-
-    # 1. Xác định phạm vi Class IDs dựa trên Role
-    if "manager" in current_user.roles:
-        # Manager thấy hết -> target_class_ids là None (hoặc list chứa class_id input nếu có)
-        if class_id:
-            target_class_ids = [class_id]
-        else:
-            target_class_ids = None # Hàm search của CRUD sẽ hiểu None là lấy tất cả
-
-    elif "teacher" in current_user.roles:
-        teacher_classes = class_crud.get_classes_by_teacher_user_id(db, teacher_user_id=current_user.user_id)
-        # Dùng Set để unique, sau đó chuyển về list
-        valid_ids = {cls.class_id for cls in teacher_classes}
-        
-        # Nếu user request class_id cụ thể, phải check xem class đó có thuộc quyền giáo viên không
-        if class_id:
-            if class_id not in valid_ids:
-                return [] # Không có quyền xem lớp này
-            target_class_ids = [class_id]
-        else:
-            target_class_ids = list(valid_ids)
-
-    elif "student" in current_user.roles:
-        student_class_ids = set(schedule_crud.get_class_ids_for_student(db, student_user_id=current_user.user_id))
-        
-        if class_id:
-            if class_id not in student_class_ids:
-                return []
-            target_class_ids = [class_id]
-        else:
-            target_class_ids = list(student_class_ids)
-
-    elif "parent" in current_user.roles:
-        childrens = parent_crud.get_childrens(db, parent_user_id=current_user.user_id)
-        # Gom tất cả class ID của tất cả con cái vào 1 Set duy nhất
-        all_children_class_ids = set()
-        for child in childrens:
-            # Giả sử hàm này trả về list[int]
-            ids = schedule_crud.get_class_ids_for_student(db, student_user_id=child.user_id)
-            all_children_class_ids.update(ids)
-        
-        if class_id:
-            if class_id not in all_children_class_ids:
-                return []
-            target_class_ids = [class_id]
-        else:
-            target_class_ids = list(all_children_class_ids)
-    else:
-        # Role không xác định hoặc không có quyền
-        return []
-
-    # Nếu target_class_ids là empty list [] nghĩa là role đó không có lớp nào -> return luôn
-    if target_class_ids is not None and len(target_class_ids) == 0:
-        return []
-
-    # 2. Gọi CRUD để search
     return schedule_crud.search_schedules(
         db=db,
-        class_ids=target_class_ids if "manager" not in current_user.roles else None, # Manager pass None để search global, others pass list
-        class_id=class_id if "manager" in current_user.roles else None, # Manager filter riêng
+        class_id=class_id,
+        scope=policy_service.schedule_scope(current_user),
         schedule_type=schedule_type,
         day_of_week=day_of_week,
         date=date,
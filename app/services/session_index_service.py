@@ -0,0 +1,160 @@
+# app/services/session_index_service.py
+"""
+Chỉ mục buổi học trong ngày cho kiểm tra quyền điểm danh.
+
+(teacher_user_id, schedule_id, ngày) -> khung giờ được phép điểm danh, giữ trong bộ nhớ tiến trình
+cho hôm qua và hôm nay (buổi qua đêm), dựng lại lúc nửa đêm và sau mỗi thao tác ghi lịch học/lớp.
+Ngày ngoài chỉ mục (điểm danh bù, đồng bộ offline trễ) được tính từ DB bằng cùng một quy tắc.
+
+Mỗi tiến trình (worker) có chỉ mục riêng. Tra cứu trượt (lịch mới tạo/đổi ở worker khác) luôn
+hỏi lại DB nên không bao giờ từ chối nhầm; chỉ kết quả tìm thấy mới được giữ tới INDEX_MAX_AGE.
+"""
+import threading
+import time
+from datetime import date, timedelta, time as dt_time
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select, or_, and_
+from sqlalchemy.orm import Session
+
+from app.models.schedule_model import Schedule, ScheduleTypeEnum
+from app.models.class_model import Class
+from app.services.stats_service import WEEKDAY_MAP
+from app.services.cache_service import TTLCache
+
+# Tuổi tối đa của chỉ mục (giây) trước khi tự dựng lại
+INDEX_MAX_AGE = 300
+
+
+class SessionOwner(NamedTuple):
+    class_id: int
+    teacher_user_id: int
+
+
+class SessionWindow(NamedTuple):
+    """Khung giờ điểm danh của một buổi học (naive time, end < start là buổi qua đêm)."""
+    schedule_id: int
+    class_id: int
+    teacher_user_id: int
+    start_time: dt_time
+    end_time: dt_time
+
+    def contains(self, t: dt_time) -> bool:
+        if self.start_time <= self.end_time:
+            return self.start_time <= t <= self.end_time
+        # Trường hợp qua đêm
+        return t >= self.start_time or t <= self.end_time
+
+
+def _naive(t: dt_time) -> dt_time:
+    return t.replace(tzinfo=None) if t is not None and t.tzinfo is not None else t
+
+
+def _load_windows(
+    db: Session, days: Iterable[date], schedule_id: Optional[int] = None
+) -> Dict[Tuple[int, int, date], SessionWindow]:
+    """Buổi học diễn ra trong các ngày `days` (WEEKLY theo thứ, ONCE theo ngày), 1 query."""
+    days = list(days)
+    stmt = (
+        select(
+            Schedule.schedule_id, Schedule.schedule_type, Schedule.day_of_week, Schedule.date,
+            Schedule.start_time, Schedule.end_time, Class.class_id, Class.teacher_user_id,
+        )
+        .join(Class, Class.class_id == Schedule.class_id)
+        .where(or_(
+            and_(Schedule.schedule_type == ScheduleTypeEnum.WEEKLY,
+                 Schedule.day_of_week.in_({WEEKDAY_MAP[d.weekday()] for d in days})),
+            and_(Schedule.schedule_type == ScheduleTypeEnum.ONCE, Schedule.date.in_(days)),
+        ))
+    )
+    if schedule_id is not None:
+        stmt = stmt.where(Schedule.schedule_id == schedule_id)
+
+    windows = {}
+    for row in db.execute(stmt):
+        window = SessionWindow(
+            row.schedule_id, row.class_id, row.teacher_user_id, _naive(row.start_time), _naive(row.end_time)
+        )
+        for day in days:
+            if (row.schedule_type == ScheduleTypeEnum.ONCE and row.date == day) or (
+                row.schedule_type == ScheduleTypeEnum.WEEKLY and row.day_of_week == WEEKDAY_MAP[day.weekday()]
+            ):
+                windows[(row.teacher_user_id, row.schedule_id, day)] = window
+    return windows
+
+
+def _load_owner(db: Session, schedule_id: int) -> Optional[SessionOwner]:
+    row = db.execute(
+        select(Class.class_id, Class.teacher_user_id)
+        .join(Schedule, Schedule.class_id == Class.class_id)
+        .where(Schedule.schedule_id == schedule_id)
+    ).first()
+    return SessionOwner(row.class_id, row.teacher_user_id) if row else None
+
+
+class DailySessionIndex:
+    """
+    Chỉ mục (teacher, schedule, ngày) -> SessionWindow, thay thế nguyên khối khi dựng lại (thread-safe),
+    kèm cache schedule_id -> SessionOwner nạp theo từng id.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None  # (ngày gốc, thời điểm dựng, windows)
+        self._owners = TTLCache(maxsize=4096, ttl=INDEX_MAX_AGE)
+
+    def invalidate(self) -> None:
+        """Đánh dấu chỉ mục cũ; lần tra cứu sau sẽ dựng lại (gọi sau khi commit ghi lịch/lớp)."""
+        self._state = None
+        self._owners.clear()
+
+    def rebuild(self, db: Session, today: Optional[date] = None) -> int:
+        """Dựng lại chỉ mục cho hôm qua + hôm nay (1 query). Trả về số buổi trong chỉ mục."""
+        today = today or date.today()
+        windows = _load_windows(db, (today - timedelta(days=1), today))
+        self._state = (today, time.monotonic(), windows)
+        return len(windows)
+
+    def _current(self, db: Session):
+        state = self._state
+        today = date.today()
+        if state is None or state[0] != today or time.monotonic() - state[1] > INDEX_MAX_AGE:
+            with self._lock:
+                state = self._state
+                if state is None or state[0] != today or time.monotonic() - state[1] > INDEX_MAX_AGE:
+                    self.rebuild(db, today)
+                    state = self._state
+        return state
+
+    def owner(self, db: Session, schedule_id: int, refresh: bool = False) -> Optional[SessionOwner]:
+        """
+        Lớp + giáo viên của một lịch học (None nếu lịch không tồn tại trong DB).
+        refresh=True bỏ qua cache (dùng trước khi từ chối quyền dựa trên kết quả đã cache).
+        """
+        owner = None if refresh else self._owners.get(schedule_id)
+        if owner is None:
+            owner = _load_owner(db, schedule_id)
+            if owner is not None:
+                self._owners.set(schedule_id, owner)
+        return owner
+
+    def window(self, db: Session, teacher_user_id: int, schedule_id: int, day: date) -> Optional[SessionWindow]:
+        """Khung giờ của buổi học, hoặc None nếu giáo viên không có buổi này vào ngày `day`."""
+        today, _, windows = self._current(db)
+        if today - timedelta(days=1) <= day <= today:
+            window = windows.get((teacher_user_id, schedule_id, day))
+            if window is not None:
+                return window
+        # Ngoài chỉ mục hoặc trượt (chỉ mục có thể cũ hơn lịch trong DB): tính trực tiếp từ DB
+        return _load_windows(db, (day,), schedule_id=schedule_id).get((teacher_user_id, schedule_id, day))
+
+
+session_index = DailySessionIndex()
+
+
+def invalidate_session_index() -> None:
+    session_index.invalidate()
+
+
+def rebuild_session_index(db: Session) -> int:
+    return session_index.rebuild(db)
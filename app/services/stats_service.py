@@ -1,12 +1,16 @@
 from datetime import date
 from sqlalchemy.orm import Session
-from sqlalchemy import func, select, or_, and_
+from sqlalchemy import func, select, or_, and_, case
 
 from app.models.class_model import Class
 from app.models.teacher_model import Teacher
 from app.models.student_model import Student
 from app.models.schedule_model import Schedule, ScheduleTypeEnum, DayOfWeekEnum
+from app.models.enrollment_model import Enrollment, EnrollmentStatus
+from app.models.balance_model import StudentBalance
+from app.models.attendance_model import Attendance
 from app.schemas.stats_schema import Stats
+from app.services.cache_service import TTLCache
 
 # Map python weekday (0=Mon, 6=Sun) sang Enum của DB
 WEEKDAY_MAP = {
@@ -19,7 +23,17 @@ WEEKDAY_MAP = {
     6: DayOfWeekEnum.SUNDAY,
 }
 
-def get_stats(db: Session) -> Stats:
+# Cache số liệu dashboard: TTL ngắn + invalidate chủ động khi tạo/xóa lớp, giáo viên, học sinh, lịch
+STATS_CACHE_TTL_SECONDS = 30
+_stats_cache = TTLCache(maxsize=8, ttl=STATS_CACHE_TTL_SECONDS)
+
+
+def invalidate_stats() -> None:
+    """Xóa cache số liệu dashboard (gọi sau khi commit thao tác ghi liên quan)."""
+    _stats_cache.clear()
+
+
+def compute_stats(db: Session) -> Stats:
     """
     Truy vấn thống kê tổng quan (Optimized: 1 DB Round-trip).
     """
@@ -49,17 +63,44 @@ def get_stats(db: Session) -> Stats:
         )
     ).scalar_subquery()
 
-    # 3. Thực thi 1 lần duy nhất
+    # 3. Bộ đếm mở rộng (cùng round-trip)
+    sq_active_enrollments = select(func.count(Enrollment.enrollment_id)).where(
+        Enrollment.enrollment_status == EnrollmentStatus.active
+    ).scalar_subquery()
+    # Tổng công nợ đọc từ snapshot student_balances (đã trừ các khoản thu một phần);
+    # chỉ cộng số dư dương để học sinh trả thừa không bù trừ nợ của học sinh khác
+    balance_due = StudentBalance.total_billed - StudentBalance.total_paid
+    sq_pending_tuition = select(
+        func.coalesce(func.sum(case((balance_due > 0, balance_due), else_=0)), 0)
+    ).scalar_subquery()
+    sq_checked_sessions = select(func.count(func.distinct(Attendance.schedule_id))).where(
+        Attendance.attendance_date == today
+    ).scalar_subquery()
+
+    # 4. Thực thi 1 lần duy nhất
     # Câu SQL sinh ra sẽ dạng: SELECT (SELECT count...), (SELECT count...), ...
     result = db.execute(
-        select(sq_classes, sq_teachers, sq_students, sq_schedules)
+        select(
+            sq_classes, sq_teachers, sq_students, sq_schedules,
+            sq_active_enrollments, sq_pending_tuition, sq_checked_sessions,
+        )
     ).first()
 
-    # result là tuple (classes, teachers, students, schedules)
     # Sử dụng `or 0` để an toàn nếu DB trả về None
     return Stats(
         total_classes=result[0] or 0,
         total_teachers=result[1] or 0,
         total_students=result[2] or 0,
         total_schedules=result[3] or 0,
-    )
\ No newline at end of file
+        active_enrollments=result[4] or 0,
+        pending_tuition_total=float(result[5] or 0),
+        today_sessions_checked=result[6] or 0,
+    )
+
+
+def get_stats(db: Session) -> Stats:
+    """
+    Số liệu dashboard qua cache (TTL ngắn, single-flight khi cache miss).
+    """
+    # Key theo ngày để các bộ đếm "hôm nay" không dùng lại số liệu của hôm trước
+    return _stats_cache.get_or_load(date.today(), lambda: compute_stats(db))
@@ -0,0 +1,28 @@
+# app/services/teacher_metrics_service.py
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from app.crud import teacher_crud
+from app.schemas.teacher_schema import TeacherMetrics
+from app.services.cache_service import TTLCache
+
+# Cache theo từng giáo viên, TTL ngắn: số liệu trang danh sách chấp nhận trễ vài chục giây
+TEACHER_METRICS_TTL_SECONDS = 30
+_metrics_cache = TTLCache(maxsize=2048, ttl=TEACHER_METRICS_TTL_SECONDS)
+
+
+def get_teachers_metrics(db: Session, teacher_user_ids: List[int], use_cache: bool = True) -> List[TeacherMetrics]:
+    """
+    Số liệu của nhiều giáo viên (theo thứ tự teacher_user_ids, bỏ id không phải giáo viên).
+    Chỉ các giáo viên chưa có trong cache mới được tính, gộp chung một câu lệnh.
+    """
+    teacher_user_ids = list(dict.fromkeys(teacher_user_ids))
+    found = {tid: _metrics_cache.get(tid) for tid in teacher_user_ids} if use_cache else {}
+    missing = [tid for tid in teacher_user_ids if found.get(tid) is None]
+    if missing:
+        for tid, metrics in teacher_crud.get_teachers_metrics(db, missing).items():
+            _metrics_cache.set(tid, metrics)
+            found[tid] = metrics
+    return [found[tid] for tid in teacher_user_ids if found.get(tid) is not None]
+
@@ -0,0 +1,185 @@
+# app/services/transcript_service.py
+"""
+Bảng điểm (transcript) của học sinh: điểm kiểm tra theo lớp, GPA, điểm đánh giá và chuyên cần.
+Tính cho nhiều học sinh cùng lúc bằng một bộ query cố định (không phụ thuộc số học sinh/lớp):
+1. Version dữ liệu các lớp của học sinh (làm key cache).
+2. Học sinh + lớp + môn + giáo viên + rollup đánh giá/điểm danh (1 query JOIN).
+3. Toàn bộ bài kiểm tra của các học sinh (1 query).
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, and_
+from sqlalchemy.orm import Session, aliased
+
+from app.models.student_model import Student
+from app.models.user_model import User
+from app.models.class_model import Class
+from app.models.subject_model import Subject
+from app.models.enrollment_model import Enrollment, EnrollmentStatus
+from app.models.test_model import Test
+from app.models.evaluation_rollup_model import EvaluationRollup
+from app.models.attendance_rollup_model import AttendanceRollup
+from app.services.cache_service import TTLCache
+
+# Key chứa (class_id, data_version) của mọi lớp nên dữ liệu điểm luôn mới;
+# TTL chỉ để làm mới các thông tin ngoài lớp (tên học sinh/giáo viên)
+_transcript_cache = TTLCache(maxsize=4096, ttl=600)
+
+
+def _cache_keys(db: Session, student_user_ids: List[int]) -> Dict[int, tuple]:
+    """Key cache của từng học sinh: (student, ((class_id, data_version, status), ...))."""
+    versions = defaultdict(list)
+    for student_id, class_id, data_version, status in db.execute(
+        select(Enrollment.student_user_id, Class.class_id, Class.data_version, Enrollment.enrollment_status)
+        .join(Class, Class.class_id == Enrollment.class_id)
+        .where(Enrollment.student_user_id.in_(student_user_ids))
+    ):
+        versions[student_id].append((class_id, data_version, getattr(status, "value", status)))
+    return {sid: (sid, tuple(sorted(versions.get(sid, ())))) for sid in student_user_ids}
+
+
+def _build_transcripts(db: Session, student_user_ids: List[int]) -> Dict[int, dict]:
+    TeacherUser = aliased(User, name="teacher_user")
+    rows = db.execute(
+        select(
+            Student.user_id.label("student_user_id"),
+            User.full_name,
+            Enrollment.enrollment_status,
+            Class.class_id,
+            Class.class_name,
+            Subject.name.label("subject_name"),
+            TeacherUser.full_name.label("teacher_name"),
+            EvaluationRollup.total_study_point,
+            EvaluationRollup.total_discipline_point,
+            AttendanceRollup.present_count,
+            AttendanceRollup.total_count,
+        )
+        .join(User, User.user_id == Student.user_id)
+        .outerjoin(Enrollment, Enrollment.student_user_id == Student.user_id)
+        .outerjoin(Class, Class.class_id == Enrollment.class_id)
+        .outerjoin(Subject, Subject.subject_id == Class.subject_id)
+        .outerjoin(TeacherUser, TeacherUser.user_id == Class.teacher_user_id)
+        .outerjoin(EvaluationRollup, and_(
+            EvaluationRollup.student_user_id == Student.user_id,
+            EvaluationRollup.class_id == Class.class_id,
+        ))
+        .outerjoin(AttendanceRollup, and_(
+            AttendanceRollup.student_user_id == Student.user_id,
+            AttendanceRollup.class_id == Class.class_id,
+        ))
+        .where(Student.user_id.in_(student_user_ids))
+        .order_by(Student.user_id, Class.class_id)
+    ).all()
+
+    tests = defaultdict(list)
+    for t in db.execute(
+        select(Test.student_user_id, Test.class_id, Test.test_id, Test.test_name,
+               Test.test_type, Test.score, Test.exam_date)
+        .where(Test.student_user_id.in_(student_user_ids))
+        .order_by(Test.exam_date, Test.test_id)
+    ):
+        tests[(t.student_user_id, t.class_id)].append(t)
+
+    transcripts: Dict[int, dict] = {}
+    all_scores = defaultdict(list)
+    for r in rows:
+        transcript = transcripts.setdefault(r.student_user_id, {
+            "student_user_id": r.student_user_id,
+            "full_name": r.full_name,
+            "gpa": None,
+            "classes_enrolled": 0,
+            "classes": [],
+        })
+        if r.class_id is None:
+            continue
+        status = getattr(r.enrollment_status, "value", r.enrollment_status)
+        if status == EnrollmentStatus.active.value:
+            transcript["classes_enrolled"] += 1
+
+        class_tests = tests.get((r.student_user_id, r.class_id), [])
+        scores = [float(t.score) for t in class_tests]
+        all_scores[r.student_user_id].extend(scores)
+        by_type = defaultdict(list)
+        for t in class_tests:
+            by_type[getattr(t.test_type, "value", t.test_type) or "Other"].append(float(t.score))
+
+        # Điểm đánh giá: 100 + tổng delta, tối đa 100 (như evaluation summary của lớp)
+        transcript["classes"].append({
+            "class_id": r.class_id,
+            "class_name": r.class_name,
+            "subject_name": r.subject_name,
+            "teacher_name": r.teacher_name,
+            "enrollment_status": status,
+            "gpa": round(sum(scores) / len(scores), 2) if scores else None,
+            "scores_by_type": {k: round(sum(v) / len(v), 2) for k, v in by_type.items()},
+            "tests": [
+                {"test_id": t.test_id, "test_name": t.test_name,
+                 "test_type": getattr(t.test_type, "value", t.test_type),
+                 "score": float(t.score), "exam_date": t.exam_date}
+                for t in class_tests
+            ],
+            "study_point": min(100 + (r.total_study_point or 0), 100),
+            "discipline_point": min(100 + (r.total_discipline_point or 0), 100),
+            "attendance_total": r.total_count or 0,
+            "attendance_rate": round(r.present_count * 100.0 / r.total_count, 1) if r.total_count else None,
+        })
+
+    for sid, scores in all_scores.items():
+        if scores:
+            transcripts[sid]["gpa"] = round(sum(scores) / len(scores), 2)
+    return transcripts
+
+
+def get_transcripts(db: Session, student_user_ids: List[int]) -> List[dict]:
+    """
+    Bảng điểm của nhiều học sinh (theo thứ tự student_user_ids, bỏ qua id không phải học sinh).
+    Chỉ các học sinh chưa có trong cache mới được tính lại, và tính chung một lượt.
+    """
+    if not student_user_ids:
+        return []
+    keys = _cache_keys(db, student_user_ids)
+    found = {sid: _transcript_cache.get(key) for sid, key in keys.items()}
+    missing = [sid for sid, transcript in found.items() if transcript is None]
+    if missing:
+        for sid, transcript in _build_transcripts(db, missing).items():
+            _transcript_cache.set(keys[sid], transcript)
+            found[sid] = transcript
+    return [found[sid] for sid in student_user_ids if found.get(sid) is not None]
+
+
+def get_transcript(db: Session, student_user_id: int) -> Optional[dict]:
+    transcripts = get_transcripts(db, [student_user_id])
+    return transcripts[0] if transcripts else None
+
+
+def get_class_transcripts(db: Session, class_id: int) -> List[dict]:
+    """Bảng điểm (đầy đủ các lớp) của mọi học sinh trong lớp."""
+    student_ids = list(db.execute(
+        select(Enrollment.student_user_id)
+        .where(Enrollment.class_id == class_id)
+        .distinct()
+        .order_by(Enrollment.student_user_id)
+    ).scalars())
+    return get_transcripts(db, student_ids)
+
+
+def transcript_rows(transcripts: List[dict]) -> List[dict]:
+    """Dạng bảng phẳng: mỗi dòng một cặp học sinh - lớp (dùng cho Excel/in ấn)."""
+    return [
+        {
+            "student_user_id": t["student_user_id"],
+            "full_name": t["full_name"],
+            "class_id": c["class_id"],
+            "class_name": c["class_name"],
+            "subject_name": c["subject_name"],
+            "teacher_name": c["teacher_name"],
+            "test_count": len(c["tests"]),
+            "gpa": c["gpa"],
+            "study_point": c["study_point"],
+            "discipline_point": c["discipline_point"],
+            "attendance_rate": c["attendance_rate"],
+        }
+        for t in transcripts
+        for c in t["classes"]
+    ]
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session, aliased
-from sqlalchemy import func, select
+from fastapi import HTTPException, status
+from sqlalchemy import func, select, insert, update, literal
 from datetime import datetime, date, timezone
 from decimal import Decimal
 from typing import List
@@ -10,28 +11,38 @@ from app.models.student_model import Student
 from app.models.parent_model import Parent
 from app.models.user_model import User
 from app.models.class_model import Class
-from app.models.notification_model import Notification # Import Model trực tiếp để bulk insert
+from app.models.notification_model import Notification, NotificationType, NotificationRefType
 from app.schemas.tuition_schema import TuitionCreate
 from app.schemas.notification_schema import NotificationCreate
 from app.crud.notification_crud import create_notification
+from app.crud.crud_helper import upsert_insert, json_object
+from app.crud import balance_crud, finance_crud
+from app.services import stats_service
 
 # --- Helper ---
 def _get_utc_now():
     return datetime.now(timezone.utc)
 
+def _tuition_notification_params(student_name: str, amount, due_date: date) -> dict:
+    return {
+        "month": due_date.strftime("%m/%Y"),
+        "student_name": student_name,
+        "amount": float(amount),
+        "due_date": due_date.strftime("%d/%m/%Y"),
+    }
+
 def _send_tuition_notification(
-    db: Session, parent_user_id: int, student_name: str, amount: Decimal, due_date: date
+    db: Session, parent_user_id: int, tuition_id: int, student_name: str, amount: Decimal, due_date: date
 ):
     """Gửi thông báo lẻ (dùng cho create_tuition_record)"""
-    month_str = due_date.strftime("%m/%Y")
-    content = (
-        f"Học phí tháng {month_str} của học sinh {student_name} là "
-        f"{amount:,.0f} VND. Hạn thanh toán {due_date.strftime('%d/%m/%Y')}."
-    )
     notif_in = NotificationCreate(
         sender_id=None, # System notification
         receiver_id=parent_user_id,
-        content=content,
+        template="tuition_created",
+        params=_tuition_notification_params(student_name, amount, due_date),
+        ref_type=NotificationRefType.tuition,
+        ref_id=tuition_id,
+        event_date=date.today(),
         type="tuition",
         sent_at=_get_utc_now(),
         is_read=False,
@@ -77,6 +88,17 @@ def create_tuition_record(db: Session, tuition_in: TuitionCreate):
     
     student, parent, parent_user, student_user = result
 
+    # Mỗi học sinh chỉ có một học phí cho mỗi kỳ
+    exists = db.query(Tuition.tuition_id).filter(
+        Tuition.student_user_id == tuition_in.student_user_id,
+        Tuition.term == tuition_in.term,
+    ).first()
+    if exists:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Học sinh {tuition_in.student_user_id} đã có học phí kỳ {tuition_in.term}"
+        )
+
     # 2. Tạo Tuition
     tuition_record = Tuition(
         student_user_id=tuition_in.student_user_id,
@@ -88,11 +110,15 @@ def create_tuition_record(db: Session, tuition_in: TuitionCreate):
         updated_at=_get_utc_now(),
     )
     db.add(tuition_record)
+    db.flush()  # lấy tuition_id cho tham chiếu của thông báo
+    balance_crud.apply_balance_changes(db, [(tuition_in.student_user_id, tuition_in.amount, 0)])
     
     # 3. Gửi thông báo
     _send_tuition_notification(
-        db, parent_user.user_id, student_user.full_name, tuition_in.amount, tuition_in.due_date
+        db, parent_user.user_id, tuition_record.tuition_id, student_user.full_name,
+        tuition_in.amount, tuition_in.due_date
     )
+    finance_crud.refresh_finance_months(db, [finance_crud.period_of(tuition_in.due_date)])
     
     # Commit 1 lần cuối cùng
     db.commit()
@@ -100,92 +126,101 @@ def create_tuition_record(db: Session, tuition_in: TuitionCreate):
     return tuition_record
 
 
-def create_tuition_for_all_students(db: Session, term: int, due_date: date):
+def create_tuition_for_all_students(db: Session, term: int, due_date: date) -> dict:
     """
-    Tạo học phí hàng loạt (Batch Processing).
-    Đây là phần quan trọng nhất cần tối ưu.
+    Sinh học phí hàng loạt bằng câu lệnh tập hợp (set-based), idempotent theo kỳ:
+    1. INSERT INTO tuitions ... SELECT SUM(fee) ... GROUP BY học sinh,
+       ON CONFLICT (student_user_id, term) DO NOTHING RETURNING tuition_id
+       -> chạy lại cùng kỳ không tạo trùng, và biết chính xác các dòng vừa tạo.
+    2. Thông báo phụ huynh, số dư và tổng hợp tài chính chỉ dựa trên các tuition_id đó.
+    3. Trả về tóm tắt (số bản ghi tạo mới, tổng tiền) thay vì refresh từng ORM object.
     """
-    # Alias cho User để phân biệt User của Student và User của Parent
-    StudentUser = aliased(User, name="student_user")
-    ParentUser = aliased(User, name="parent_user")
-
-    # --- QUERY LỚN: Lấy tất cả dữ liệu cần thiết trong 1 lần truy vấn ---
-    # Chọn: ID học sinh, Tên học sinh, ID phụ huynh, Tổng tiền học phí
-    stmt = (
-        db.query(
-            Student.user_id.label("student_id"),
-            StudentUser.full_name.label("student_name"),
-            ParentUser.user_id.label("parent_id"),
-            func.sum(Class.fee).label("total_amount")
+    now = _get_utc_now().replace(tzinfo=None)
+
+    fees = (
+        select(
+            Enrollment.student_user_id,
+            func.sum(Class.fee),
+            literal(term, Tuition.term.type),
+            literal(due_date, Tuition.due_date.type),
+            literal(PaymentStatus.pending, Tuition.status.type),
+            literal(now, Tuition.created_at.type),
+            literal(now, Tuition.updated_at.type),
         )
-        .join(Enrollment, Student.user_id == Enrollment.student_user_id)
         .join(Class, Enrollment.class_id == Class.class_id)
-        .join(StudentUser, Student.user_id == StudentUser.user_id) # Join lấy tên HS
-        .join(Parent, Student.parent_id == Parent.user_id)       # Join lấy Parent
-        .join(ParentUser, Parent.user_id == ParentUser.user_id)    # Join lấy User Parent (để gửi noti)
-        .filter(Enrollment.enrollment_status == "active")
-        .group_by(Student.user_id, StudentUser.full_name, ParentUser.user_id)
-        .having(func.sum(Class.fee) > 0) # Chỉ lấy những em có học phí > 0
+        .where(Enrollment.enrollment_status == "active")
+        .group_by(Enrollment.student_user_id)
+        .having(func.sum(Class.fee) > 0)  # Chỉ lấy những em có học phí > 0
     )
-    
-    results = stmt.all()
-    
-    if not results:
-        return []
-
-    # --- PREPARE BATCH DATA ---
-    tuition_objects = []
-    notification_objects = []
-    
-    month_str = due_date.strftime("%m/%Y")
-    due_date_str = due_date.strftime('%d/%m/%Y')
-    now = _get_utc_now()
-
-    for row in results:
-        # 1. Tạo Tuition Object
-        tuition = Tuition(
-            student_user_id=row.student_id,
-            amount=row.total_amount,
-            term=term,
-            due_date=due_date,
-            status=PaymentStatus.pending,
-            created_at=now,
-            updated_at=now,
+    insert_tuitions = (
+        upsert_insert(db, Tuition)
+        .from_select(
+            ["student_user_id", "amount", "term", "due_date", "status", "created_at", "updated_at"],
+            fees,
         )
-        tuition_objects.append(tuition)
+        .on_conflict_do_nothing(index_elements=["student_user_id", "term"])
+        .returning(Tuition.tuition_id)
+    )
 
-        # 2. Tạo Notification Object (trực tiếp Model, không qua CRUD lẻ)
-        # Format content
-        content = (
-            f"Học phí tháng {month_str} của học sinh {row.student_name} là "
-            f"{row.total_amount:,.0f} VND. Hạn thanh toán {due_date_str}."
-        )
-        
-        notif = Notification(
-            receiver_id=row.parent_id,
-            content=content,
-            type="tuition",
-            sent_at=now,
-            is_read=False
+    StudentUser = aliased(User, name="student_user")
+    new_tuitions = (
+        select(
+            Student.parent_id,
+            literal(NotificationType.tuition, Notification.type.type),
+            literal(False, Notification.is_read.type),
+            literal(now, Notification.sent_at.type),
+            literal(NotificationRefType.tuition, Notification.ref_type.type),
+            Tuition.tuition_id,
+            literal(now.date(), Notification.event_date.type),
+            literal("tuition_created", Notification.template.type),
+            json_object(
+                db,
+                month=literal(due_date.strftime("%m/%Y")),
+                student_name=StudentUser.full_name,
+                amount=Tuition.amount,
+                due_date=literal(due_date.strftime("%d/%m/%Y")),
+            ),
         )
-        notification_objects.append(notif)
+        .join(Student, Student.user_id == Tuition.student_user_id)
+        .join(StudentUser, StudentUser.user_id == Tuition.student_user_id)
+        .where(Student.parent_id.isnot(None))
+    )
 
-    # --- BULK INSERT & COMMIT ---
     try:
-        # Thêm tất cả vào session
-        db.add_all(tuition_objects)
-        db.add_all(notification_objects)
-        
+        new_ids = db.execute(insert_tuitions).scalars().all()
+        if not new_ids:
+            db.commit()
+            return {"term": term, "created": 0, "total_amount": 0.0}
+        # Nhận diện theo RETURNING thay vì created_at == now (lượt chạy khác có thể trùng mốc thời gian)
+        is_new = Tuition.tuition_id.in_(new_ids)
+
+        db.execute(insert(Notification).from_select(
+            ["receiver_id", "type", "is_read", "sent_at", "ref_type", "ref_id", "event_date", "template", "params"],
+            new_tuitions.where(is_new),
+        ))
+        balance_crud.apply_billing_from_tuitions(db, is_new)
+        total_amount = db.execute(select(func.coalesce(func.sum(Tuition.amount), 0)).where(is_new)).scalar_one()
+        finance_crud.refresh_finance_month(db, due_date.year, due_date.month)
         db.commit()
-        
-        # Refresh để lấy ID (nếu cần trả về) - Lưu ý: với số lượng lớn thì việc refresh all có thể chậm
-        # Nếu chỉ cần trả về số lượng bản ghi thì không cần refresh.
-        # Ở đây ta refresh các bản ghi tuition để trả về đúng yêu cầu hàm cũ
-        for t in tuition_objects:
-            db.refresh(t)
-            
-        return tuition_objects
-
-    except Exception as e:
+    except Exception:
         db.rollback()
-        raise e
\ No newline at end of file
+        raise
+
+    stats_service.invalidate_stats()
+    return {"term": term, "created": len(new_ids), "total_amount": float(total_amount)}
+
+
+def update_overdue_tuitions(db: Session) -> int:
+    """
+    Chuyển các học phí pending đã quá hạn sang overdue (tác vụ chạy hằng đêm).
+    Trả về số bản ghi được cập nhật.
+    """
+    result = db.execute(
+        update(Tuition)
+        .where(Tuition.status == PaymentStatus.pending, Tuition.due_date < date.today())
+        .values(status=PaymentStatus.overdue, updated_at=_get_utc_now().replace(tzinfo=None))
+    )
+    db.commit()
+    if result.rowcount:
+        stats_service.invalidate_stats()
+    return result.rowcount
@@ -1,8 +1,17 @@
 # app/services/user_service.py
-from typing import Optional
+import base64
+import binascii
+import json
+import unicodedata
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import delete, select
-from app.models import Teacher, Manager, Student, Parent
+from app.models import Teacher, Manager, Student, Parent, User
+from app.crud import user_crud
+from app.schemas.auth_schema import AuthenticatedUser
+from app.schemas.user_schema import UserSearchHit, UserSearchPage
+from app.services import policy_service
 
 # Mapping giữa entity string và model + id field
 ENTITY_MODEL_MAP = {
@@ -33,3 +42,50 @@ def get_user_id(db: Session, entity: str, entity_id: int) -> Optional[int]:
     return db.execute(stmt).scalar_one_or_none()
 
 
+
+
+def fold_search_term(q: str) -> str:
+    """Chuẩn hóa từ khóa như f_unaccent(lower(...)) phía DB: chữ thường, bỏ dấu, đ -> d."""
+    decomposed = unicodedata.normalize("NFD", q.strip().lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).replace("đ", "d")
+
+
+def _encode_cursor(score: float, user_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([score, user_id]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        score, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), int(user_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor không hợp lệ.")
+
+
+def search_users(
+    db: Session,
+    current_user: AuthenticatedUser,
+    q: str,
+    role: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> UserSearchPage:
+    """
+    Tìm người dùng theo tên (không phân biệt dấu), email, số điện thoại; phân trang keyset theo (điểm, user_id).
+    Manager tìm toàn bộ; giáo viên chỉ tìm học sinh các lớp mình dạy (policy_service).
+    """
+    term = fold_search_term(q)
+    if not term:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Từ khóa tìm kiếm không được để trống.")
+
+    rows = user_crud.search_users(
+        db,
+        term,
+        scope=policy_service.student_scope(current_user, User.user_id),
+        role=role,
+        limit=limit + 1,
+        after=_decode_cursor(cursor) if cursor else None,
+    )
+    items = [UserSearchHit.model_validate(row._asdict()) for row in rows[:limit]]
+    next_cursor = _encode_cursor(items[-1].score, items[-1].user_id) if len(rows) > limit else None
+    return UserSearchPage(items=items, next_cursor=next_cursor)
@@ -0,0 +1,133 @@
+# benchmarks/_seed.py
+"""
+Helper dùng chung cho các benchmark: tạo engine và seed dữ liệu mẫu.
+
+Mặc định chạy trên SQLite in-memory; đặt BENCH_DATABASE_URL để chạy trên PostgreSQL
+(nên dùng DB riêng, các bảng sẽ bị drop/create lại).
+"""
+import os
+import random
+from datetime import date, time, timedelta
+
+# app.database yêu cầu biến môi trường Postgres khi import
+os.environ.setdefault("POSTGRES_USER", "bench")
+os.environ.setdefault("POSTGRES_PASSWORD", "bench")
+os.environ.setdefault("POSTGRES_DB", "bench")
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import *  # noqa: F401,F403 - đăng ký toàn bộ bảng vào metadata
+from app.models.user_model import User, GenderEnum
+from app.models.teacher_model import Teacher
+from app.models.subject_model import Subject
+from app.models.class_model import Class
+from app.models.student_model import Student
+from app.models.enrollment_model import Enrollment, EnrollmentStatus
+from app.models.schedule_model import Schedule, ScheduleTypeEnum, DayOfWeekEnum
+from app.models.test_model import Test, TestTypeEnum
+from app.models.evaluation_model import Evaluation, EvaluationType
+from app.models.attendance_model import Attendance, AttendanceStatus
+from rebuild_rollups import REBUILDERS
+
+
+def make_session_factory(database_url: str = None):
+    """Tạo engine mới (schema sạch) và trả về sessionmaker."""
+    database_url = database_url or os.getenv("BENCH_DATABASE_URL", "sqlite://")
+    if database_url.startswith("sqlite"):
+        engine = create_engine(
+            database_url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+    else:
+        engine = create_engine(database_url, pool_size=20, max_overflow=20)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _user_rows(start_id: int, count: int, prefix: str):
+    return [
+        {
+            "user_id": start_id + i,
+            "username": f"{prefix}{start_id + i}",
+            "email": f"{prefix}{start_id + i}@bench.local",
+            "password": "x",
+            "full_name": f"{prefix.title()} {start_id + i}",
+            "gender": GenderEnum.male,
+            "phone_number": f"09{start_id + i:08d}",
+            "date_of_birth": date(2008, 1, 1),
+        }
+        for i in range(count)
+    ]
+
+
+def seed_class(
+    db,
+    n_students: int,
+    class_id: int = 1,
+    tests_per_student: int = 3,
+    evaluations_per_student: int = 3,
+    sessions: int = 10,
+    seed: int = 42,
+):
+    """
+    Seed một lớp (1 giáo viên, n_students học sinh) kèm bài kiểm tra, đánh giá và điểm danh.
+    Trả về (teacher_user_id, class_id, schedule_id, danh sách student_user_id).
+    """
+    rnd = random.Random(seed)
+    teacher_id = class_id * 1_000_000
+    first_student_id = teacher_id + 1
+
+    db.execute(insert(User), _user_rows(teacher_id, 1, "teacher"))
+    db.execute(insert(Teacher), [{"user_id": teacher_id, "base_salary_per_class": 100.0, "reward_bonus": 0.0}])
+    db.execute(insert(Subject), [{"subject_id": class_id, "name": f"Subject {class_id}"}])
+    db.execute(insert(Class), [{
+        "class_id": class_id, "class_name": f"Class {class_id}", "teacher_user_id": teacher_id,
+        "subject_id": class_id, "capacity": n_students, "class_size": n_students, "fee": 1000,
+    }])
+    db.execute(insert(Schedule), [{
+        "schedule_id": class_id, "class_id": class_id, "room": "A1",
+        "schedule_type": ScheduleTypeEnum.WEEKLY, "day_of_week": DayOfWeekEnum.MONDAY,
+        "start_time": time(0, 0), "end_time": time(23, 59),
+    }])
+
+    student_ids = list(range(first_student_id, first_student_id + n_students))
+    db.execute(insert(User), _user_rows(first_student_id, n_students, "student"))
+    db.execute(insert(Student), [{"user_id": s} for s in student_ids])
+    db.execute(insert(Enrollment), [
+        {"student_user_id": s, "class_id": class_id, "enrollment_date": date(2025, 1, 1),
+         "enrollment_status": EnrollmentStatus.active}
+        for s in student_ids
+    ])
+
+    start = date(2025, 1, 6)
+    db.execute(insert(Test), [
+        {"test_name": f"Test {k}", "student_user_id": s, "class_id": class_id, "teacher_user_id": teacher_id,
+         "score": round(rnd.uniform(2, 10), 2), "exam_date": start + timedelta(days=k),
+         "test_type": TestTypeEnum.Other}
+        for s in student_ids for k in range(tests_per_student)
+    ])
+    if evaluations_per_student:
+        db.execute(insert(Evaluation), [
+            {"student_user_id": s, "teacher_user_id": teacher_id, "class_id": class_id,
+             "evaluation_type": EvaluationType.study, "evaluation_date": start + timedelta(days=k),
+             "study_point": rnd.randint(-5, 5), "discipline_point": rnd.randint(-5, 5),
+             "evaluation_content": "bench"}
+            for s in student_ids for k in range(evaluations_per_student)
+        ])
+    statuses = [AttendanceStatus.present] * 8 + [AttendanceStatus.late, AttendanceStatus.absent]
+    if sessions:
+        db.execute(insert(Attendance), [
+            {"student_user_id": s, "schedule_id": class_id, "class_id": class_id,
+             "attendance_date": start + timedelta(weeks=k), "status": rnd.choice(statuses)}
+            for s in student_ids for k in range(sessions)
+        ])
+    db.commit()
+    # Đồng bộ các bảng rollup với dữ liệu vừa seed
+    for rebuild in REBUILDERS.values():
+        rebuild(db)
+    return teacher_id, class_id, class_id, student_ids
@@ -0,0 +1,145 @@
+# benchmarks/attendance_batch_benchmark.py
+"""
+Tải điểm danh toàn trường: N request gửi đồng thời, mỗi request điểm danh một lớp
+cho một hoặc nhiều buổi. So sánh đường cũ (gọi create_batch_attendance cho từng buổi)
+với create_multi_batch_attendance (kiểm tra quyền một query, một INSERT ... RETURNING).
+
+Chạy từ thư mục gốc:
+    python -m benchmarks.attendance_batch_benchmark [--submissions 500] [--classes 50] [--students 30]
+
+Trên SQLite (mặc định) các request được tuần tự hóa bằng lock vì SQLite chỉ có một writer;
+đặt BENCH_DATABASE_URL tới PostgreSQL để đo đồng thời thật.
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import date, time as dt_time, timedelta
+
+from benchmarks._seed import make_session_factory, seed_class
+
+from sqlalchemy import event, func, select
+
+from app.models.attendance_model import Attendance, AttendanceStatus
+from app.models.evaluation_model import Evaluation
+from app.models.notification_model import Notification
+from app.schemas.attendance_schema import AttendanceBatchCreate, AttendanceInitialRecord, AttendanceMultiBatchCreate
+from app.schemas.auth_schema import AuthenticatedUser
+from app.services import attendance_service
+
+
+def _sessions(class_id, student_ids, first_day: date, count: int, rnd):
+    return [
+        AttendanceBatchCreate(
+            schedule_id=class_id,
+            class_id=class_id,
+            attendance_date=first_day + timedelta(weeks=k),
+            records=[
+                AttendanceInitialRecord(
+                    student_user_id=s,
+                    status=AttendanceStatus.absent if rnd.random() < 0.1 else AttendanceStatus.present,
+                    checkin_time=dt_time(10, 0),
+                )
+                for s in student_ids
+            ],
+        )
+        for k in range(count)
+    ]
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run(mode, SessionLocal, classes, args, first_day: date):
+    """Gửi args.submissions request đồng thời; trả về (thời gian tổng, latency ms, số câu SQL)."""
+    rnd = random.Random(7)
+    engine = SessionLocal.kw["bind"]
+    lock = threading.Lock() if engine.dialect.name == "sqlite" else None
+    statements = [0]
+
+    def count_statement(*_):
+        statements[0] += 1
+
+    payloads = []
+    for i in range(args.submissions):
+        teacher_id, class_id, student_ids = classes[i % len(classes)]
+        day = first_day + timedelta(weeks=(i // len(classes)) * args.sessions_per_submission)
+        user = AuthenticatedUser(user_id=teacher_id, username=f"teacher{teacher_id}", roles=["teacher"])
+        payloads.append((user, _sessions(class_id, student_ids, day, args.sessions_per_submission, rnd)))
+
+    def submit(payload):
+        user, sessions = payload
+        start = time.perf_counter()
+        with lock or nullcontext():
+            db = SessionLocal()
+            try:
+                if mode == "multi":
+                    attendance_service.create_multi_batch_attendance(
+                        db, AttendanceMultiBatchCreate(sessions=sessions), user
+                    )
+                else:
+                    for session in sessions:
+                        attendance_service.create_batch_attendance(db, session, user)
+            finally:
+                db.close()
+        return (time.perf_counter() - start) * 1000
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        latencies = list(pool.map(submit, payloads))
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count_statement)
+    return elapsed, latencies, statements[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--submissions", type=int, default=500)
+    parser.add_argument("--classes", type=int, default=50)
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--sessions-per-submission", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=32)
+    args = parser.parse_args()
+
+    SessionLocal = make_session_factory()
+    db = SessionLocal()
+    classes = []
+    for class_id in range(1, args.classes + 1):
+        teacher_id, _, _, student_ids = seed_class(
+            db, args.students, class_id=class_id, tests_per_student=1, evaluations_per_student=0, sessions=0
+        )
+        classes.append((teacher_id, class_id, student_ids))
+    db.close()
+
+    # Lịch seed là WEEKLY thứ Hai: mỗi buổi là một thứ Hai khác nhau
+    weeks_per_mode = (args.submissions // args.classes + 1) * args.sessions_per_submission
+    print(f"{'mode':>6} | {'total s':>8} | {'req/s':>7} | {'p50/p95/max ms':>22} | {'SQL/request':>11}")
+    for i, mode in enumerate(("single", "multi")):
+        first_day = date(2024, 1, 1) + timedelta(weeks=i * weeks_per_mode)
+        elapsed, latencies, statements = run(mode, SessionLocal, classes, args, first_day)
+        print(
+            f"{mode:>6} | {elapsed:>8.2f} | {args.submissions / elapsed:>7.1f} | "
+            f"{statistics.median(latencies):>6.1f}/{_percentile(latencies, 0.95):>6.1f}/{max(latencies):>7.1f} | "
+            f"{statements / args.submissions:>11.1f}"
+        )
+
+    db = SessionLocal()
+    expected = 2 * args.submissions * args.sessions_per_submission * args.students
+    written = db.execute(select(func.count()).select_from(Attendance)).scalar()
+    assert written == expected, (written, expected)
+    absent = db.execute(
+        select(func.count()).select_from(Attendance).where(Attendance.status == AttendanceStatus.absent)
+    ).scalar()
+    assert db.execute(select(func.count()).select_from(Evaluation)).scalar() == absent
+    assert db.execute(select(func.count()).select_from(Notification)).scalar() >= absent
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
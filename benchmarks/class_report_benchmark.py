@@ -0,0 +1,124 @@
+# benchmarks/class_report_benchmark.py
+"""
+So sánh báo cáo lớp: đường cũ (5 query + tổng hợp bằng Python) với báo cáo
+một câu lệnh CTE (report_service.build_class_report) và bản có cache theo data_version.
+
+Chạy từ thư mục gốc:
+    python -m benchmarks.class_report_benchmark [--sizes 50 500 5000] [--repeat 20]
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks._seed import make_session_factory, seed_class
+
+from sqlalchemy import func, case
+
+from app.models.class_model import Class
+from app.models.enrollment_model import Enrollment
+from app.models.evaluation_model import Evaluation
+from app.models.test_model import Test
+from app.models.user_model import User
+from app.models.attendance_model import Attendance
+from app.services import report_service
+
+
+def legacy_class_report(db, class_id: int, teacher_id: int):
+    """Bản sao đường cũ của get_class_report (5 query, tổng hợp bằng Python) để đối chiếu."""
+    class_info = db.query(Class).filter(
+        Class.class_id == class_id, Class.teacher_user_id == teacher_id
+    ).first()
+    students_query = db.query(User.user_id, User.full_name)\
+        .join(Enrollment, Enrollment.student_user_id == User.user_id)\
+        .filter(Enrollment.class_id == class_id).all()
+    student_ids = [s.user_id for s in students_query]
+    student_map = {s.user_id: s.full_name for s in students_query}
+
+    gpa_map = {r.student_user_id: float(r.avg_score) for r in db.query(
+        Test.student_user_id, func.avg(Test.score).label('avg_score')
+    ).filter(Test.class_id == class_id, Test.student_user_id.in_(student_ids))
+     .group_by(Test.student_user_id).all()}
+
+    eval_map = {r.student_user_id: (float(r.avg_study), float(r.avg_discipline)) for r in db.query(
+        Evaluation.student_user_id,
+        func.avg(Evaluation.study_point).label('avg_study'),
+        func.avg(Evaluation.discipline_point).label('avg_discipline')
+    ).filter(Evaluation.class_id == class_id, Evaluation.student_user_id.in_(student_ids))
+     .group_by(Evaluation.student_user_id).all()}
+
+    att_map = {}
+    for r in db.query(
+        Attendance.student_user_id,
+        func.count(Attendance.attendance_id).label('total'),
+        func.sum(case((Attendance.status == 'present', 1), else_=0)).label('present_count')
+    ).filter(Attendance.class_id == class_id, Attendance.student_user_id.in_(student_ids))\
+     .group_by(Attendance.student_user_id).all():
+        att_map[r.student_user_id] = (r.present_count / r.total * 100) if r.total else 0
+
+    students_data = []
+    grade_distribution = {i: 0 for i in range(1, 11)}
+    total_gpa = total_study = total_discipline = 0
+    for s_id, s_name in student_map.items():
+        gpa = gpa_map.get(s_id, 0.0)
+        study_delta, discipline_delta = eval_map.get(s_id, (0.0, 0.0))
+        study_score, discipline_score = 100 + study_delta, 100 + discipline_delta
+        total_gpa += gpa
+        total_study += study_score
+        total_discipline += discipline_score
+        grade_int = int(round(gpa))
+        if 1 <= grade_int <= 10:
+            grade_distribution[grade_int] += 1
+        students_data.append({
+            "id": s_id, "name": s_name, "gpa": round(gpa, 2),
+            "study_point": round(study_score, 2), "discipline_point": round(discipline_score, 2),
+            "attendance": round(att_map.get(s_id, 0.0), 1),
+        })
+    count = len(students_data)
+    return {
+        "class_id": class_info.class_id, "class_name": class_info.class_name,
+        "total_students": count, "avg_gpa": round(total_gpa / count, 2),
+        "avg_study_point": round(total_study / count, 2),
+        "avg_discipline_point": round(total_discipline / count, 2),
+        "grade_distribution": grade_distribution, "students": students_data,
+    }
+
+
+def _timeit(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'students':>8} | {'legacy p50/max ms':>18} | {'cte p50/max ms':>15} | {'cached p50/max ms':>18}")
+    for size in args.sizes:
+        SessionLocal = make_session_factory()
+        db = SessionLocal()
+        teacher_id, class_id, _, _ = seed_class(db, size)
+
+        legacy = legacy_class_report(db, class_id, teacher_id)
+        new = report_service.build_class_report(db, class_id, teacher_id)
+        # Chuyên cần/điểm có thể lệch ở chữ số làm tròn cuối do khác kiểu số của DB
+        assert legacy["total_students"] == new["total_students"]
+        assert abs(legacy["avg_gpa"] - new["avg_gpa"]) < 0.02
+
+        legacy_t = _timeit(lambda: legacy_class_report(db, class_id, teacher_id), args.repeat)
+        cte_t = _timeit(lambda: report_service.build_class_report(db, class_id, teacher_id), args.repeat)
+        cached_t = _timeit(lambda: report_service.get_class_report(db, class_id, teacher_id), args.repeat)
+        print(
+            f"{size:>8} | {legacy_t[0]:>8.2f}/{legacy_t[1]:<9.2f} | {cte_t[0]:>7.2f}/{cte_t[1]:<7.2f} "
+            f"| {cached_t[0]:>8.2f}/{cached_t[1]:<9.2f}"
+        )
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/list_serialization_benchmark.py
+"""
+Latency p50/p99 của trang danh sách 1.000 dòng (bài kiểm tra, đánh giá) qua HTTP (TestClient):
+- legacy: route trả model, FastAPI validate lại theo response_model rồi json.dumps.
+- fast: fast_json_service.list_response (TypeAdapter.dump_json, không validate lần hai).
+Kèm thời gian map Row -> model: vòng lặp model_validate(row._asdict()) so với rows_to_models.
+
+Chạy từ thư mục gốc:
+    python -m benchmarks.list_serialization_benchmark [--rows 1000] [--repeat 200]
+"""
+import argparse
+import statistics
+import time
+from typing import List
+
+from benchmarks._seed import make_session_factory, seed_class
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.models.test_model import Test
+from app.schemas.auth_schema import AuthenticatedUser
+from app.schemas.evaluation_schema import EvaluationView
+from app.schemas.test_schema import Test as TestSchema, TestBase
+from app.crud import test_crud
+from app.services import evaluation_service, fast_json_service
+
+MANAGER = AuthenticatedUser(user_id=1, username="manager", roles=["manager"])
+
+
+def build_app(SessionLocal, rows: int) -> FastAPI:
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def load_tests(db):
+        return test_crud.get_all_tests(db, MANAGER, skip=0, limit=rows)
+
+    def load_evaluations(db):
+        return evaluation_service.get_all_evaluations_with_names(db, skip=0, limit=rows)
+
+    app = FastAPI()
+
+    @app.get("/legacy/tests", response_model=List[TestSchema])
+    def legacy_tests(db=Depends(get_db)):
+        return load_tests(db)
+
+    @app.get("/fast/tests", response_model=List[TestSchema])
+    def fast_tests(db=Depends(get_db)):
+        return fast_json_service.list_response(TestBase, load_tests(db))
+
+    @app.get("/legacy/evaluations", response_model=List[EvaluationView])
+    def legacy_evaluations(db=Depends(get_db)):
+        return load_evaluations(db)
+
+    @app.get("/fast/evaluations", response_model=List[EvaluationView])
+    def fast_evaluations(db=Depends(get_db)):
+        return fast_json_service.list_response(EvaluationView, load_evaluations(db))
+
+    return app
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), _percentile(samples, 0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    SessionLocal = make_session_factory()
+    db = SessionLocal()
+    per_student = 10
+    seed_class(
+        db, args.rows // per_student, tests_per_student=per_student,
+        evaluations_per_student=per_student, sessions=0,
+    )
+    db.close()
+
+    client = TestClient(build_app(SessionLocal, args.rows))
+    print(f"{'endpoint':>12} | {'legacy p50/p99 ms':>18} | {'fast p50/p99 ms':>16} | {'speedup p50':>11}")
+    for name in ("tests", "evaluations"):
+        legacy, fast = client.get(f"/legacy/{name}"), client.get(f"/fast/{name}")
+        assert legacy.json() == fast.json() and len(fast.json()) == args.rows, name
+        legacy_p50, legacy_p99 = measure(lambda: client.get(f"/legacy/{name}"), args.repeat)
+        fast_p50, fast_p99 = measure(lambda: client.get(f"/fast/{name}"), args.repeat)
+        print(
+            f"{name:>12} | {legacy_p50:>8.2f}/{legacy_p99:>8.2f} | {fast_p50:>7.2f}/{fast_p99:>7.2f} | "
+            f"{legacy_p50 / fast_p50:>10.2f}x"
+        )
+
+    # Chỉ riêng bước map Row -> model (không DB, không HTTP)
+    db = SessionLocal()
+    rows = db.execute(
+        select(
+            Test.test_id, Test.test_name, Test.student_user_id, Test.class_id, Test.teacher_user_id,
+            Test.score, Test.exam_date, Test.test_type,
+        ).limit(args.rows)
+    ).all()
+    db.close()
+    loop_p50, _ = measure(lambda: [TestBase.model_validate(row._asdict()) for row in rows], args.repeat)
+    batch_p50, _ = measure(lambda: fast_json_service.rows_to_models(TestBase, rows), args.repeat)
+    print(f"map {len(rows)} rows: model_validate loop {loop_p50:.2f} ms, rows_to_models {batch_p50:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,13 @@ from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from apscheduler.schedulers.asyncio import AsyncIOScheduler # type: ignore
 from apscheduler.triggers.cron import CronTrigger # type: ignore
+from apscheduler.triggers.interval import IntervalTrigger # type: ignore
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.api import api_router
 from app.database import Base, engine, SessionLocal
 from app.models import *
-from app.services import tuition_service
+from app.services import tuition_service, job_service, session_index_service
+from app.crud import finance_crud
 import os
 from starlette.middleware.sessions import SessionMiddleware
 import logging
@@ -26,12 +28,32 @@ async def run_overdue_tuitions_task():
     db = SessionLocal()
     try:
         tuition_service.update_overdue_tuitions(db)
+        # Trạng thái quá hạn thay đổi theo ngày -> tính lại cube tài chính các tháng còn công nợ
+        finance_crud.refresh_open_finance_months(db)
         print("Tác vụ cập nhật học phí quá hạn đã chạy thành công.")
     except Exception as e:
         print(f"Lỗi khi chạy tác vụ cập nhật học phí: {e}")
     finally:
         db.close()
 
+async def rebuild_session_index_task():
+    """Dựng lại chỉ mục buổi học trong ngày (quyền điểm danh) khi sang ngày mới."""
+    db = SessionLocal()
+    try:
+        count = session_index_service.rebuild_session_index(db)
+        print(f"Đã dựng lại chỉ mục buổi học trong ngày ({count} buổi).")
+    except Exception as e:
+        print(f"Lỗi khi dựng chỉ mục buổi học: {e}")
+    finally:
+        db.close()
+
+async def job_heartbeat_task():
+    """Gia hạn heartbeat các job chạy nền của worker này và dọn job mồ côi của worker đã chết."""
+    try:
+        job_service.heartbeat_jobs()
+    except Exception as e:
+        print(f"Lỗi khi cập nhật heartbeat job: {e}")
+
 # Hàm lifespan event handler
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -43,14 +65,31 @@ async def lifespan(app: FastAPI):
         id="overdue_tuition_job",
         name="Update Overdue Tuitions"
     )
+    scheduler.add_job(
+        rebuild_session_index_task,
+        trigger=CronTrigger(hour=0, minute=0),
+        id="session_index_job",
+        name="Rebuild Daily Session Index"
+    )
+    scheduler.add_job(
+        job_heartbeat_task,
+        trigger=IntervalTrigger(seconds=job_service.JOB_HEARTBEAT_SECONDS),
+        id="job_heartbeat_job",
+        name="Background Job Heartbeat"
+    )
     scheduler.start()
     print("Scheduler đã được khởi động.")
     
     # Tạo tất cả các bảng trong cơ sở dữ liệu
     Base.metadata.create_all(bind=engine)
+
+    # Khởi động worker pool cho các job chạy nền
+    job_service.start_job_runner()
     
     yield # Điểm này ứng dụng sẽ chạy
     
+    job_service.shutdown_job_runner()
+
     # Tắt scheduler khi ứng dụng tắt
     # Tương tự @app.on_event("shutdown")
     scheduler.shutdown()
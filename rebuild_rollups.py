@@ -0,0 +1,43 @@
+"""
+Dựng lại các bảng tổng hợp (rollup) từ dữ liệu gốc để sửa sai lệch.
+
+Cách dùng:
+    python rebuild_rollups.py            # dựng lại tất cả
+    python rebuild_rollups.py evaluation # chỉ dựng lại rollup chỉ định
+"""
+import sys
+
+from app.database import SessionLocal
+from app.models import *  # noqa: F401,F403 - đăng ký toàn bộ model
+from app.crud import evaluation_rollup_crud, attendance_rollup_crud, balance_crud, finance_crud, teacher_rating_crud
+
+# Tên rollup -> hàm dựng lại (nhận db session, trả về số dòng)
+REBUILDERS = {
+    "evaluation": evaluation_rollup_crud.rebuild_evaluation_rollups,
+    "attendance": attendance_rollup_crud.rebuild_attendance_rollups,
+    "balances": balance_crud.rebuild_balances,
+    # Sau "balances" vì cube đọc tuitions.paid_amount
+    "finance": finance_crud.rebuild_finance,
+    "teacher_ratings": teacher_rating_crud.rebuild_teacher_rating_stats,
+}
+
+
+def rebuild_rollups(names=None):
+    names = names or list(REBUILDERS)
+    unknown = [name for name in names if name not in REBUILDERS]
+    if unknown:
+        raise SystemExit(f"Rollup không hợp lệ: {unknown}. Hãy dùng: {list(REBUILDERS)}")
+
+    db = SessionLocal()
+    try:
+        for name in names:
+            print(f"Đang dựng lại rollup: {name}...")
+            rows = REBUILDERS[name](db)
+            print(f"  -> {rows} dòng")
+    finally:
+        db.close()
+    print("Hoàn tất!")
+
+
+if __name__ == "__main__":
+    rebuild_rollups(sys.argv[1:])
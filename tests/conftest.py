@@ -0,0 +1,32 @@
+import os
+
+# app.database đọc cấu hình Postgres khi import; test chạy trên SQLite in-memory
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("POSTGRES_DB", "test")
+
+import pytest
+
+from benchmarks._seed import make_session_factory, seed_class
+
+
+@pytest.fixture
+def session_factory():
+    """sessionmaker trên SQLite in-memory với schema mới cho mỗi test."""
+    return make_session_factory("sqlite://")
+
+
+@pytest.fixture
+def db(session_factory):
+    """Session của session_factory."""
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def seeded_class(db):
+    """Một lớp 3 học sinh (lịch thứ Hai hằng tuần), chưa có điểm danh: (teacher_id, class_id, schedule_id, student_ids)."""
+    return seed_class(db, 3, class_id=1, tests_per_student=1, evaluations_per_student=0, sessions=0)
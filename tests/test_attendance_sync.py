@@ -0,0 +1,109 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.models.attendance_model import Attendance, AttendanceStatus
+from app.models.evaluation_model import Evaluation
+from app.models.notification_model import Notification
+from app.schemas.attendance_schema import AttendanceSyncDelta, AttendanceSyncRequest
+from app.schemas.auth_schema import AuthenticatedUser
+from app.services import attendance_service
+from app.services.session_index_service import invalidate_session_index
+
+# Lịch mẫu là WEEKLY thứ Hai, 00:00 - 23:59
+MONDAY = date(2025, 1, 6)
+RECORDED_AT = datetime(2025, 1, 6, 10, 0)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_session_index():
+    invalidate_session_index()
+    yield
+    invalidate_session_index()
+
+
+@pytest.fixture
+def teacher(seeded_class):
+    return AuthenticatedUser(user_id=seeded_class[0], username="teacher", roles=["teacher"])
+
+
+def _delta(seeded_class, seq, student_user_id, status, day=MONDAY):
+    return AttendanceSyncDelta(
+        seq=seq, schedule_id=seeded_class[2], student_user_id=student_user_id, attendance_date=day,
+        status=status, recorded_at=datetime.combine(day, RECORDED_AT.time()),
+    )
+
+
+def _sync(db, teacher, deltas=(), since=None, limit=1000):
+    return attendance_service.sync_attendance(
+        db, AttendanceSyncRequest(device_id="tablet-1", deltas=list(deltas), since=since, limit=limit), teacher
+    )
+
+
+def _count(db, column):
+    return db.scalar(select(func.count(column)))
+
+
+def test_replaying_the_same_queue_is_idempotent(db, seeded_class, teacher):
+    students = seeded_class[3]
+    deltas = [
+        _delta(seeded_class, 1, students[0], AttendanceStatus.absent),
+        _delta(seeded_class, 2, students[1], AttendanceStatus.present),
+    ]
+
+    first = _sync(db, teacher, deltas)
+    replay = _sync(db, teacher, deltas)
+
+    assert (first.last_seq, first.applied, first.rejected) == (2, 2, [])
+    assert (replay.last_seq, replay.applied, replay.rejected) == (2, 0, [])
+    assert _count(db, Attendance.attendance_id) == 2
+    assert _count(db, Evaluation.evaluation_id) == 1
+    assert _count(db, Notification.notification_id) == 1
+
+
+def test_invalid_delta_is_rejected_without_blocking_the_queue(db, seeded_class, teacher):
+    students = seeded_class[3]
+    deltas = [
+        _delta(seeded_class, 1, students[0], AttendanceStatus.present),
+        _delta(seeded_class, 2, 999999, AttendanceStatus.absent),
+        # Thứ Ba: lịch chỉ có buổi thứ Hai
+        _delta(seeded_class, 3, students[1], AttendanceStatus.present, day=MONDAY + timedelta(days=1)),
+    ]
+
+    result = _sync(db, teacher, deltas)
+
+    assert (result.last_seq, result.applied) == (3, 1)
+    assert [r.seq for r in result.rejected] == [2, 3]
+    assert _count(db, Attendance.attendance_id) == 1
+
+    # Thiết bị gửi lại cả hàng đợi: seq đã lưu nên không bị kẹt, không áp dụng lại
+    retry = _sync(db, teacher, deltas)
+    assert (retry.last_seq, retry.applied, retry.rejected) == (3, 0, [])
+
+
+def test_change_set_pages_by_watermark(db, seeded_class, teacher):
+    students = seeded_class[3]
+    deltas = [
+        _delta(seeded_class, seq, student, AttendanceStatus.present, day=MONDAY + timedelta(weeks=week))
+        for seq, (week, student) in enumerate(((w, s) for w in range(2) for s in students), start=1)
+    ]
+    _sync(db, teacher, deltas)
+    # Change set bỏ qua bản ghi mới ghi trong SYNC_SETTLE; lùi updated_at để chúng đủ "ổn định"
+    db.execute(update(Attendance).values(updated_at=datetime.utcnow() - timedelta(hours=1)))
+    db.commit()
+
+    seen, since, pages = [], None, 0
+    while True:
+        page = _sync(db, teacher, since=since, limit=4)
+        pages += 1
+        seen.extend(change.attendance_id for change in page.changes)
+        since = page.watermark
+        if not page.has_more:
+            break
+
+    assert pages == 2
+    assert sorted(seen) == sorted(db.scalars(select(Attendance.attendance_id)).all())
+    assert len(seen) == len(set(seen)) == len(deltas)
+    # Trang cuối trả watermark hiện tại: gọi lại không có thay đổi mới
+    assert _sync(db, teacher, since=since, limit=4).changes == []
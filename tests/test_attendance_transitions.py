@@ -0,0 +1,138 @@
+from datetime import date, time
+
+import pytest
+from sqlalchemy import delete, event, func, select
+
+from app.crud import attendance_rollup_crud, evaluation_rollup_crud
+from app.models.attendance_model import AttendanceStatus
+from app.models.attendance_rollup_model import AttendanceRollup
+from app.models.evaluation_model import Evaluation
+from app.models.evaluation_rollup_model import EvaluationRollup
+from app.models.notification_model import Notification
+from app.schemas.attendance_schema import AttendanceBatchCreate, AttendanceInitialRecord
+from app.schemas.auth_schema import AuthenticatedUser
+from app.services import attendance_service
+from app.services.session_index_service import invalidate_session_index
+
+# Lịch mẫu là WEEKLY thứ Hai, 00:00 - 23:59
+MONDAY = date(2025, 1, 6)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_session_index():
+    invalidate_session_index()
+    yield
+    invalidate_session_index()
+
+
+def _mark(db, seeded_class, status):
+    teacher_id, class_id, schedule_id, student_ids = seeded_class
+    attendance_service.create_batch_attendance(
+        db,
+        AttendanceBatchCreate(
+            schedule_id=schedule_id, class_id=class_id, attendance_date=MONDAY,
+            records=[AttendanceInitialRecord(student_user_id=student_ids[0], status=status, checkin_time=time(10, 0))],
+        ),
+        AuthenticatedUser(user_id=teacher_id, username="teacher", roles=["teacher"]),
+    )
+
+
+def _penalty_state(db, student_id):
+    evaluations = db.execute(
+        select(Evaluation.study_point, Evaluation.discipline_point).where(Evaluation.student_user_id == student_id)
+    ).all()
+    notifications = db.execute(
+        select(Notification.template).where(Notification.receiver_id == student_id)
+    ).scalars().all()
+    return sorted(evaluations), sorted(notifications)
+
+
+def _rollups(db, student_id):
+    attendance = db.get(AttendanceRollup, (student_id, 1))
+    evaluation = db.get(EvaluationRollup, (student_id, 1))
+    return (
+        (attendance.present_count, attendance.late_count, attendance.absent_count, attendance.total_count),
+        (evaluation.evaluation_count, evaluation.total_study_point, evaluation.total_discipline_point)
+        if evaluation else (0, 0, 0),
+    )
+
+
+def _assert_rollups_match_rebuild(db, student_id):
+    incremental = _rollups(db, student_id)
+    attendance_rollup_crud.rebuild_attendance_rollups(db)
+    evaluation_rollup_crud.rebuild_evaluation_rollups(db)
+    db.commit()
+    db.expire_all()
+    assert _rollups(db, student_id) == incremental
+    return incremental
+
+
+def test_status_transitions_keep_penalties_and_rollups_in_sync(db, seeded_class):
+    student_id = seeded_class[3][0]
+
+    _mark(db, seeded_class, AttendanceStatus.present)
+    assert _penalty_state(db, student_id) == ([], [])
+    assert _assert_rollups_match_rebuild(db, student_id) == ((1, 0, 0, 1), (0, 0, 0))
+
+    _mark(db, seeded_class, AttendanceStatus.absent)
+    assert _penalty_state(db, student_id) == ([(-5, -5)], ["attendance_absent"])
+    assert _assert_rollups_match_rebuild(db, student_id) == ((0, 0, 1, 1), (1, -5, -5))
+
+    _mark(db, seeded_class, AttendanceStatus.late)
+    assert _penalty_state(db, student_id) == ([(-2, -2)], ["attendance_late"])
+    assert _assert_rollups_match_rebuild(db, student_id) == ((0, 1, 0, 1), (1, -2, -2))
+
+    _mark(db, seeded_class, AttendanceStatus.present)
+    assert _penalty_state(db, student_id) == ([], [])
+    assert _assert_rollups_match_rebuild(db, student_id) == ((1, 0, 0, 1), (0, 0, 0))
+
+
+def test_resending_same_status_changes_nothing(db, seeded_class):
+    student_id = seeded_class[3][0]
+
+    _mark(db, seeded_class, AttendanceStatus.absent)
+    _mark(db, seeded_class, AttendanceStatus.absent)
+
+    assert _penalty_state(db, student_id) == ([(-5, -5)], ["attendance_absent"])
+    assert _assert_rollups_match_rebuild(db, student_id) == ((0, 0, 1, 1), (1, -5, -5))
+
+
+def test_switch_without_linked_evaluation_creates_only_the_evaluation(db, seeded_class):
+    student_id = seeded_class[3][0]
+    _mark(db, seeded_class, AttendanceStatus.absent)
+    # Đánh giá tự động bị xóa tay: bản ghi vẫn có thông báo nhưng không còn đánh giá liên kết
+    db.execute(delete(Evaluation).where(Evaluation.student_user_id == student_id))
+    evaluation_rollup_crud.rebuild_evaluation_rollups(db)
+    db.commit()
+
+    _mark(db, seeded_class, AttendanceStatus.late)
+
+    assert _penalty_state(db, student_id) == ([(-2, -2)], ["attendance_late"])
+    assert db.scalar(select(func.count(Notification.notification_id))) == 1
+    assert _assert_rollups_match_rebuild(db, student_id) == ((0, 1, 0, 1), (1, -2, -2))
+
+
+
+def test_concurrent_first_submissions_of_a_session_count_once(db, seeded_class, session_factory):
+    student_id = seeded_class[3][0]
+    first, second = session_factory(), session_factory()
+    raced = []
+
+    # Request thứ nhất ghi xong và commit ngay trước câu upsert của request thứ hai,
+    # tức là sau mọi thao tác đọc mà request thứ hai đã làm
+    @event.listens_for(second.get_bind(), "before_cursor_execute")
+    def _race(conn, cursor, statement, *args):
+        if not raced and statement.startswith("INSERT INTO attendances"):
+            raced.append(True)
+            _mark(first, seeded_class, AttendanceStatus.absent)
+
+    try:
+        _mark(second, seeded_class, AttendanceStatus.absent)
+    finally:
+        event.remove(second.get_bind(), "before_cursor_execute", _race)
+        first.close()
+        second.close()
+
+    assert raced
+    assert _penalty_state(db, student_id) == ([(-5, -5)], ["attendance_absent"])
+    assert _assert_rollups_match_rebuild(db, student_id) == ((0, 0, 1, 1), (1, -5, -5))
@@ -0,0 +1,58 @@
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app.crud import teacher_rating_crud, teacher_review_crud
+from app.models.teacher_rating_stats_model import TeacherRatingStats
+from app.schemas.teacher_review_schema import TeacherReviewCreate, TeacherReviewUpdate
+from benchmarks._seed import seed_class
+
+
+def _rating_stats(db):
+    """{teacher_user_id: (review_count, rating_sum, star_1..star_5)}, bỏ dòng toàn 0 (rebuild không tạo)."""
+    db.expire_all()
+    stats = {}
+    for row in db.scalars(select(TeacherRatingStats)):
+        counters = (
+            row.review_count, Decimal(row.rating_sum), row.star_1, row.star_2, row.star_3, row.star_4, row.star_5
+        )
+        if any(counters):
+            stats[row.teacher_user_id] = counters
+    return stats
+
+
+def _assert_stats_match_rebuild(db):
+    incremental = _rating_stats(db)
+    teacher_rating_crud.rebuild_teacher_rating_stats(db)
+    assert _rating_stats(db) == incremental
+    return incremental
+
+
+def test_review_writes_keep_rating_stats_in_sync(db, seeded_class):
+    teacher_id, _, _, student_ids = seeded_class
+    other_teacher_id = seed_class(db, 1, class_id=2, tests_per_student=1, evaluations_per_student=0, sessions=0)[0]
+
+    reviews = [
+        teacher_review_crud.create_teacher_review(
+            db, TeacherReviewCreate(teacher_user_id=teacher_id, rating=rating), student_id
+        )
+        for student_id, rating in zip(student_ids, (5, 4.5, 3))
+    ]
+    assert _assert_stats_match_rebuild(db) == {teacher_id: (3, Decimal("12.5"), 0, 0, 1, 1, 1)}
+
+    # Sửa điểm: 4.5 -> 2 (chuyển sang cột sao khác)
+    teacher_review_crud.update_teacher_review(db, reviews[1], TeacherReviewUpdate(rating=2))
+    assert _assert_stats_match_rebuild(db) == {teacher_id: (3, Decimal("10"), 0, 1, 1, 0, 1)}
+
+    # Chuyển review sang giáo viên khác (TeacherReviewUpdate không có teacher_user_id, nhánh này vẫn được crud xử lý)
+    teacher_review_crud.update_teacher_review(
+        db, reviews[0], TeacherReviewCreate(teacher_user_id=other_teacher_id, rating=1)
+    )
+    assert _assert_stats_match_rebuild(db) == {
+        teacher_id: (2, Decimal("5"), 0, 1, 1, 0, 0),
+        other_teacher_id: (1, Decimal("1"), 1, 0, 0, 0, 0),
+    }
+
+    teacher_review_crud.delete_teacher_review(db, reviews[0])
+    teacher_review_crud.delete_teacher_review(db, reviews[2])
+    assert _assert_stats_match_rebuild(db) == {teacher_id: (1, Decimal("2"), 0, 1, 0, 0, 0)}
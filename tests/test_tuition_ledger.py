@@ -0,0 +1,105 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.crud import balance_crud, tuition_crud
+from app.models.tuition_model import PaymentStatus
+from app.models.tuition_payment_model import PaymentEntryType
+from app.schemas.auth_schema import AuthenticatedUser
+from app.schemas.payment_schema import PaymentCreate
+from app.schemas.tuition_schema import TuitionCreate, TuitionUpdate
+from app.services import payment_service
+
+MANAGER = AuthenticatedUser(user_id=1, username="manager", roles=["manager"])
+PAID_AT = date(2025, 3, 10)
+
+
+@pytest.fixture
+def tuition(db, seeded_class):
+    student_id = seeded_class[3][0]
+    return tuition_crud.create_tuition(db, TuitionCreate(
+        student_user_id=student_id, amount=1000, term=1, due_date=date.today() + timedelta(days=30),
+    ))
+
+
+def _pay(db, tuition, amount, entry_type=PaymentEntryType.payment):
+    return payment_service.record_payment(db, PaymentCreate(
+        tuition_id=tuition.tuition_id, amount=Decimal(amount), entry_type=entry_type, paid_at=PAID_AT,
+    ), MANAGER)
+
+
+def _revenue(db):
+    row = next(r for r in balance_crud.get_revenue_monthly(db, PAID_AT.year) if r.month == PAID_AT.month)
+    return row.collected_amount, row.refunded_amount, row.payment_count
+
+
+def _assert_consistent(db, tuition, paid, status):
+    db.refresh(tuition)
+    balance = balance_crud.get_student_balance(db, tuition.student_user_id)
+    assert tuition.paid_amount == Decimal(paid)
+    assert tuition.status == status
+    assert balance.total_billed == tuition.amount
+    assert balance.total_paid == tuition.paid_amount
+    assert balance.outstanding == tuition.amount - tuition.paid_amount
+
+
+def test_partial_payment_keeps_tuition_open(db, tuition):
+    _pay(db, tuition, "400")
+
+    _assert_consistent(db, tuition, "400", PaymentStatus.pending)
+    assert tuition.payment_date is None
+    assert _revenue(db) == (Decimal("400"), Decimal("0"), 1)
+
+
+def test_full_payment_then_refund_reopens_tuition(db, tuition):
+    _pay(db, tuition, "400")
+    _pay(db, tuition, "600")
+    _assert_consistent(db, tuition, "1000", PaymentStatus.paid)
+    assert tuition.payment_date == PAID_AT
+
+    _pay(db, tuition, "250", PaymentEntryType.refund)
+
+    _assert_consistent(db, tuition, "750", PaymentStatus.pending)
+    assert tuition.payment_date is None
+    assert _revenue(db) == (Decimal("1000"), Decimal("250"), 2)  # payment_count chỉ đếm lần thu
+
+
+def test_overpayment_and_overrefund_are_rejected(db, tuition):
+    _pay(db, tuition, "900")
+
+    with pytest.raises(HTTPException):
+        _pay(db, tuition, "200")
+    db.rollback()
+    with pytest.raises(HTTPException):
+        _pay(db, tuition, "901", PaymentEntryType.refund)
+    db.rollback()
+
+    _assert_consistent(db, tuition, "900", PaymentStatus.pending)
+    assert _revenue(db) == (Decimal("900"), Decimal("0"), 1)
+
+
+def test_lowering_amount_to_paid_amount_marks_tuition_paid(db, tuition):
+    _pay(db, tuition, "600")
+
+    tuition_crud.update_tuition(db, tuition.tuition_id, TuitionUpdate(amount=600))
+
+    _assert_consistent(db, tuition, "600", PaymentStatus.paid)
+    assert tuition.payment_date == PAID_AT
+
+
+def test_tuition_update_rejects_manual_status():
+    with pytest.raises(ValidationError):
+        TuitionUpdate(status="paid")
+
+
+def test_aging_report_reads_only_open_tuitions(db, tuition):
+    _pay(db, tuition, "250")
+
+    report = payment_service.get_aging_report(db)
+
+    assert report["total_outstanding"] == Decimal("750")
+    current = next(b for b in report["buckets"] if b["bucket"] == "current")
+    assert (current["tuition_count"], current["outstanding"]) == (1, Decimal("750"))